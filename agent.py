@@ -0,0 +1,112 @@
+"""
+Headless Desert Eagle agent: collects the metrics of this machine and pushes
+them to a central dashboard over TCP, without importing Dash or Plotly.
+
+    python agent.py dashboard.example.com:7071 --name web-01
+
+The dashboard accepts agents when started with DESERT_EAGLE_AGENT_PORT set,
+on loopback only unless DESERT_EAGLE_AGENT_ADDRESS opens it to a network.
+"""
+import argparse
+import socket
+import threading
+import time
+from modules.collectors import METRIC_COLLECTORS, create_collector_pool, snapshot_metrics
+from modules.fleet import AGENT_PORT
+from modules.sampler import Sampler
+from modules.wire import SnapshotEncoder
+
+
+CONNECT_TIMEOUT = 5  # Seconds to wait for the dashboard to accept or read
+RETRY_INTERVAL = 10  # Seconds between two connection attempts
+
+
+class AgentConnection:
+    """
+    Connection to the dashboard that sends every sampler snapshot. Samples
+    taken while the dashboard is unreachable are dropped, and the connection
+    is retried every RETRY_INTERVAL seconds with a fresh encoder.
+    """
+
+    def __init__(self, address, host, timeout=CONNECT_TIMEOUT, retry_interval=RETRY_INTERVAL):
+        """
+        :param address: (host, port) of the dashboard.
+        :param host: Name this machine is shown under.
+        :param timeout: Socket timeout in seconds.
+        :param retry_interval: Seconds between two connection attempts.
+        """
+        self.address = address
+        self.host = host
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._socket = None
+        self._encoder = None
+        self._retry_at = 0
+
+    def send(self, snapshot, timestamp):
+        """
+        Encode a snapshot and send it. Meant to be used as a sampler listener.
+        :param snapshot: Dictionary returned by the sampler.
+        :param timestamp: Sample time in seconds since the epoch.
+        """
+        if self._socket is None:
+            if time.monotonic() < self._retry_at:
+                return
+            try:
+                self._socket = socket.create_connection(self.address, self.timeout)
+            except OSError as e:
+                print(f"Error connecting to {self.address[0]}:{self.address[1]}: {e}")
+                self._retry_at = time.monotonic() + self.retry_interval
+                return
+            self._encoder = SnapshotEncoder()
+            frames = self._encoder.hello(self.host)
+        else:
+            frames = b""
+
+        frames += self._encoder.encode(timestamp, snapshot_metrics(snapshot))
+        try:
+            self._socket.sendall(frames)
+        except OSError as e:
+            print(f"Error sending to {self.address[0]}:{self.address[1]}: {e}")
+            self.close()
+            self._retry_at = time.monotonic() + self.retry_interval
+
+    def close(self):
+        """
+        Close the connection; the next snapshot reconnects.
+        """
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    if not host:
+        return value, AGENT_PORT
+    return host.strip("[]"), int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push this machine's metrics to a dashboard.")
+    parser.add_argument("dashboard", help=f"host[:port] of the dashboard (default port {AGENT_PORT})")
+    parser.add_argument("--name", default=socket.gethostname(), help="name shown for this machine")
+    parser.add_argument("--interval", type=float, default=1, help="seconds between two samples")
+    args = parser.parse_args()
+
+    connection = AgentConnection(parse_address(args.dashboard), args.name)
+    collectors = create_collector_pool(METRIC_COLLECTORS)
+    sampler = Sampler(collectors.collect, interval=args.interval, listeners=[connection.send])
+    sampler.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        collectors.shutdown()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
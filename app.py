@@ -1,23 +1,94 @@
-from dash import Dash, dcc, html, Input, Output
+import atexit
+import json
+import os
+import math
+import socket
+import time
+import numpy as np
+from dash import Dash, Patch, ctx, dcc, html, no_update, Input, Output, State
 import dash_bootstrap_components as dbc
-import plotly.express as px
-from utils.network_util import generate_chart_section, generate_table_section
-from modules.system_stats import (
-    get_cpu_usage,
-    get_disk_usage,
-    get_memory_usage,
+from flask import Response, request
+from utils.chart_util import (
+    create_chart,
+    create_heatmap_chart,
+    create_history_chart,
+    create_matrix_heatmap,
+    get_history_extension,
+    update_dark_theme_graph,
 )
-from modules.network_stats import (
-    get_active_connections,
-    get_network_io,
-    get_network_speed,
-    get_device_info as device_info,
+from utils.table_util import build_filter, build_mask, get_page_count, select_page, sort_key
+from utils.fleet_util import FLEET_TABLE_COLUMNS, create_percentile_table, generate_fleet_section
+from utils.network_util import (
+    create_connection_summary,
+    create_partition_rows,
+    create_process_modal,
+    create_sparkline,
+    generate_chart_section,
+    generate_history_section,
+    generate_table_section,
 )
-from modules.process_stats import get_all_processes
+from modules.collectors import (
+    COLLECT_TIMEOUT,
+    DEVICE_INTERVAL,
+    PROCESS_INTERVAL,
+    create_collector_pool,
+    snapshot_metrics,
+)
+from modules.process_stats import (
+    get_process_history,
+    is_process_pinned,
+    pin_process,
+    query_processes,
+)
+from modules.api import (
+    ApiError,
+    EncodedResponse,
+    GZIP_MIN_SIZE,
+    JSON_TYPE,
+    ResponseCache,
+    choose_content_type,
+    series_payload,
+)
+from modules.export import EXPORT_FORMATS, ExportError, iter_export, open_stores, parse_time
+from modules.exposition import CONTENT_TYPE, MetricsExposition
+from modules.fleet import FLEET_PERCENTILES, AgentServer, FleetStore, summarize
+from modules.sampler import Sampler
+from modules.storage import DiskStore, query_stores
+from modules.stream import SnapshotStream
+from modules.timeseries import TimeSeriesStore
 from utils.system_util import create_dashboard_cards, create_app_bar, create_footer
 
 
 BYTES_IN_GB = 1024 * 1024 * 1024
+BITS_IN_MBIT = 1000 * 1000
+SAMPLE_INTERVAL = 1  # Seconds between two background samples
+HISTORY_POINTS = 1000  # Roughly the pixel width of a history chart
+HEATMAP_POINTS = 400  # Columns of the per-core heatmap, kept low for many cores
+# Per-device metrics (cores, interfaces, disks, partitions) can number in
+# the hundreds on large hosts, so memory only keeps their last hour raw and
+# a day of rollups; longer ranges are read from the disk store
+DEVICE_METRICS = ("cpu.*.percent", "network.*.*", "disk.io.*", "partition.*")
+DEVICE_HISTORY = 60 * 60  # Seconds of raw samples kept in memory
+DEVICE_ROLLUP_TIERS = ((10, 6 * 60 * 6), (60, 24 * 60))  # 10s for 6h, 1m for a day
+PROCESS_TABLE_ROWS = 15  # Rows per page of the process and connection tables
+CONNECTION_MAX_AGE = 2  # Seconds a connection listing is shared between viewers
+HISTORY_INTERVAL = 5  # Seconds between two updates of the history charts
+API_RANGE = 60 * 60  # Seconds of history returned when a query gives no start
+API_MAX_POINTS = 10000  # Upper bound on the points of one history query
+API_MIN_STEP = 1  # Seconds; samples are never closer than this
+API_MAX_TIME = 2 ** 40  # Latest timestamp accepted, far beyond any sample
+FLEET_INTERVAL = 5  # Seconds between two updates of the fleet view
+FLEET_TABLE_ROWS = 25  # Rows per page of the fleet host table
+FLEET_STALE_AFTER = 30  # Seconds without a snapshot before a host is stale
+LOCAL_HOST = socket.gethostname()  # Name this dashboard's own host is shown under
+# "poll" has every viewer request updates, "stream" pushes them over SSE
+UPDATE_MODE = os.environ.get("DESERT_EAGLE_UPDATE_MODE", "poll")
+DATA_DIR = os.environ.get("DESERT_EAGLE_DATA", "data")  # Where history is persisted
+# TCP port accepting headless agents (see agent.py); unset keeps it closed
+AGENT_PORT = os.environ.get("DESERT_EAGLE_AGENT_PORT")
+# Address the agent port listens on; agents are not authenticated, so it is
+# only opened to the network (e.g. "0.0.0.0") when that network is trusted
+AGENT_ADDRESS = os.environ.get("DESERT_EAGLE_AGENT_ADDRESS", "127.0.0.1")
 
 # The line `app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.BOOTSTRAP])` is
 # initializing a Dash application.
@@ -26,18 +97,200 @@ app = Dash(
     external_stylesheets=[dbc.themes.DARKLY, dbc.icons.BOOTSTRAP],
 )
 
+# History charts as chart ID: (title, y axis title, [(label, color, metric)]).
+# "{interface}" and "{disk}" in a metric are replaced by the network
+# interface and the disk picked in the history section.
+HISTORY_CHARTS = {
+    "cpu-history": ("CPU Usage", "Percent", [("CPU", "#0d6efd", "cpu.percent")]),
+    "cpu-breakdown-history": (
+        "CPU Time Breakdown",
+        "Percent",
+        [
+            ("User", "#0d6efd", "cpu.user"),
+            ("System", "#FFA500", "cpu.system"),
+            ("I/O Wait", "#6F42C1", "cpu.iowait"),
+            ("Steal", "#DC3545", "cpu.steal"),
+            ("IRQ", "#20C997", "cpu.irq"),
+        ],
+    ),
+    "network-history": (
+        "Network Speed",
+        "Bytes/sec",
+        [
+            ("Upload", "#FFA500", "network.upload_speed"),
+            ("Download", "#0d6efd", "network.download_speed"),
+        ],
+    ),
+    "interface-history": (
+        "Interface Throughput",
+        "Bits/sec",
+        [
+            ("Sent", "#FFA500", "network.{interface}.sent_bps"),
+            ("Received", "#0d6efd", "network.{interface}.recv_bps"),
+        ],
+    ),
+    "interface-errors": (
+        "Interface Errors and Drops",
+        "Per second",
+        [
+            ("Errors", "#DC3545", "network.{interface}.errors"),
+            ("Drops", "#FFA500", "network.{interface}.drops"),
+        ],
+    ),
+    "memory-breakdown-history": (
+        "Memory Breakdown",
+        "Bytes",
+        [
+            ("Used", "#FFA500", "memory.used"),
+            ("Cached", "#0d6efd", "memory.cached"),
+            ("Buffers", "#6F42C1", "memory.buffers"),
+            ("Slab", "#DC3545", "memory.slab"),
+            ("Available", "#20C997", "memory.available"),
+        ],
+    ),
+    "swap-history": (
+        "Swap Activity",
+        "Bytes/sec",
+        [
+            ("Swap In", "#0d6efd", "swap.in_rate"),
+            ("Swap Out", "#FFA500", "swap.out_rate"),
+        ],
+    ),
+    "pressure-history": (
+        "Pressure Stall (10s average)",
+        "Percent of time stalled",
+        [
+            ("CPU (some)", "#0d6efd", "pressure.cpu.some"),
+            ("Memory (some)", "#FFA500", "pressure.memory.some"),
+            ("Memory (full)", "#DC3545", "pressure.memory.full"),
+            ("IO (some)", "#20C997", "pressure.io.some"),
+            ("IO (full)", "#6F42C1", "pressure.io.full"),
+        ],
+    ),
+    "disk-throughput-history": (
+        "Disk Throughput",
+        "Bytes/sec",
+        [
+            ("Read", "#0d6efd", "disk.io.{disk}.read_bps"),
+            ("Write", "#FFA500", "disk.io.{disk}.write_bps"),
+        ],
+    ),
+    "disk-iops-history": (
+        "Disk IOPS",
+        "Requests/sec",
+        [
+            ("Read", "#0d6efd", "disk.io.{disk}.read_iops"),
+            ("Write", "#FFA500", "disk.io.{disk}.write_iops"),
+        ],
+    ),
+    "disk-latency-history": (
+        "Disk Latency",
+        "Milliseconds",
+        [
+            ("Read", "#0d6efd", "disk.io.{disk}.read_latency"),
+            ("Write", "#FFA500", "disk.io.{disk}.write_latency"),
+        ],
+    ),
+    "disk-busy-history": (
+        "Disk Utilization",
+        "Percent busy",
+        [("Busy", "#DC3545", "disk.io.{disk}.busy_percent")],
+    ),
+}
+
+
+def create_snapshot_figures():
+    """
+    Build the snapshot charts once for the layout. Later ticks only patch
+    their data, so layout and theme are never sent again.
+    :return: Dictionary of chart ID to figure.
+    """
+    return {
+        "network-speed": update_dark_theme_graph(
+            create_chart(
+                chart_type="bar",
+                title="Network Speed",
+                labels={"x": "Network", "y": "Speed (Mbps)"},
+                x=["Upload", "Download"],
+                y=[0, 0],
+            )
+        ),
+        "network-io": update_dark_theme_graph(
+            create_chart(
+                chart_type="bar",
+                title="Network I/O",
+                labels={"x": "Network I/O", "y": "Bytes"},
+                x=["Bytes Sent", "Bytes Received"],
+                y=[0, 0],
+            )
+        ),
+        "memory-pie": update_dark_theme_graph(
+            create_chart(
+                chart_type="pie",
+                title="Memory Usage",
+                labels=["Used", "Cache/Buffers", "Free"],
+                values=[0, 0, 0],
+            ),
+            showlegend=True,
+        ),
+        "disk-pie": update_dark_theme_graph(
+            create_chart(
+                chart_type="pie",
+                title="Disk Usage",
+                labels=["Used", "Free"],
+                values=[0, 0],
+            ),
+            showlegend=True,
+        ),
+    }
+
+
 # Page contents
 content = html.Div(
     children=[
-        create_app_bar(),
+        create_app_bar(UPDATE_MODE),
         html.Hr(),
-        create_dashboard_cards(),
-        generate_chart_section(),
-        generate_table_section(),
+        dbc.Tabs(
+            [
+                dbc.Tab(
+                    [
+                        create_dashboard_cards(),
+                        generate_chart_section(create_snapshot_figures()),
+                        generate_history_section(),
+                        generate_table_section(PROCESS_TABLE_ROWS),
+                    ],
+                    label="This Host",
+                    style={"paddingTop": "2rem"},
+                ),
+                dbc.Tab(generate_fleet_section(FLEET_TABLE_ROWS), label="Fleet"),
+            ],
+        ),
+        create_process_modal(),
         create_footer(),
+        # Each panel refreshes on its own schedule
         dcc.Interval(
             id="interval-component",
-            interval=15000,  # Refresh every 15000ms (15 seconds)
+            interval=SAMPLE_INTERVAL * 1000,  # CPU, memory, disk and network
+            n_intervals=0,
+        ),
+        dcc.Interval(
+            id="history-interval",
+            interval=HISTORY_INTERVAL * 1000,
+            n_intervals=0,
+        ),
+        dcc.Interval(
+            id="fleet-interval",
+            interval=FLEET_INTERVAL * 1000,
+            n_intervals=0,
+        ),
+        dcc.Interval(
+            id="device-interval",
+            interval=DEVICE_INTERVAL * 1000,
+            n_intervals=0,
+        ),
+        dcc.Interval(
+            id="process-interval",
+            interval=PROCESS_INTERVAL * 1000,
             n_intervals=0,
         ),
     ],
@@ -55,143 +308,69 @@ app.layout = dbc.Container(
 )
 
 
-def create_chart(chart_type, title=None, labels=None, values=None, x=None, y=None):
-    colors = ["#FFA500", "#0d6efd"]
+# Every collector, the process list sized to one page of the process table
+collectors = create_collector_pool(timeout=COLLECT_TIMEOUT, process_rows=PROCESS_TABLE_ROWS)
 
-    if chart_type == "pie":
-        return px.pie(
-            names=labels,
-            values=values,
-            title=title,
-            color=labels,
-            color_discrete_map={label: color for label, color in zip(labels, colors)},
-        )
-    elif chart_type == "bar":
-        return px.bar(
-            x=x,
-            y=y,
-            labels=labels,
-            title=title,
-            color=x,
-            color_discrete_map={label: color for label, color in zip(x, colors)},
-        )
-    else:
-        raise ValueError("Unsupported chart type")
 
-
-# Update graph layout to ensure dark theme even when empty
-def update_dark_theme_graph(fig, showlegend=False):
+def fetch_all_data():
     """
-    Update the graph's layout to match the dark theme, including empty state.
-    :param fig: The plotly figure object.
-    :return: The updated figure object with dark theme settings.
+    Run every collector that is due concurrently.
+    :return: Dictionary of collector name to data, plus the "stale" set of
+             collectors that fell back to their last known value.
     """
-    fig.update_layout(
-        paper_bgcolor="#303030",  # Dark background for the paper
-        plot_bgcolor="#222222",  # Dark plot background
-        title_font_color="white",  # White title color
-        font=dict(color="white"),  # White font color for labels and text
-        xaxis=dict(
-            title_font=dict(color="white"),  # X-axis title font color
-            tickfont=dict(color="white"),  # X-axis tick color
-        ),
-        yaxis=dict(
-            title_font=dict(color="white"),  # Y-axis title font color
-            tickfont=dict(color="white"),  # Y-axis tick color
-        ),
-        # Handle empty state
-        showlegend=showlegend,  # Optional: hide legend if not needed
-        margin=dict(l=0, r=0, t=30, b=30),  # Tighten margins
-        # In case of empty data, make sure background remains dark
-        annotations=(
-            [
-                {
-                    "text": "No Data Available",
-                    "xref": "paper",
-                    "yref": "paper",
-                    "showarrow": False,
-                    "font": {"size": 20, "color": "white"},
-                    "align": "center",
-                }
-            ]
-            if not fig.data
-            else []
-        ),
-    )
-    return fig
+    return collectors.collect()
 
 
-def fetch_all_data():
-    try:
-        return (
-            device_info(),
-            get_cpu_usage(),
-            get_memory_usage(),
-            get_disk_usage(),
-            get_network_speed(),
-            get_network_io(),
-            get_active_connections(),
-            get_all_processes(),
-        )
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return [None] * 7
+# History of every numeric metric, fed by the sampler: recent samples in
+# memory, and everything on disk so it survives restarts
+history = TimeSeriesStore()
+for pattern in DEVICE_METRICS:
+    history.set_retention(pattern, DEVICE_HISTORY, DEVICE_ROLLUP_TIERS)
+disk_history = DiskStore(DATA_DIR)
+atexit.register(disk_history.close)
 
 
-# Callback to update dashboard data every 15 seconds
-@app.callback(
-    [
-        Output("model", "children"),
-        Output("device-name", "children"),
-        Output("ip-address", "children"),
-        Output("battery-percentage", "children"),
-        Output("os-name", "children"),
-        Output("os-arch", "children"),
-        Output("cpu-usage", "children"),
-        Output("memory-usage", "children"),
-        Output("disk-usage", "children"),
-        Output("cpu-used", "children"),
-        Output("memory-used", "children"),
-        Output("disk-used", "children"),
-        Output("network-speed", "figure"),
-        Output("network-io", "figure"),
-        Output("memory-pie", "figure"),
-        Output("disk-pie", "figure"),
-        Output("process-table", "children"),
-        Output("connection-table", "children"),
-    ],
-    [Input("interval-component", "n_intervals")],
-)
-def render_page_content(n_intervals):
-    """
-    Callback function to update the dashboard every `interval-component`.
-    Retrieves system metrics, updates graphs, and tables dynamically.
-    """
-    # Collect data from system metrics functions
-    (
-        device_info_data,
-        cpu_usage,
-        memory_data,
-        disk_data,
-        network_speed,
-        network_io,
-        connections,
-        processes,
-    ) = fetch_all_data()
-
-    model = device_info_data.get("model", "N/A")
-    device_name = device_info_data.get("device_name", "Unknown")
-    ip_address = device_info_data.get("ip_address", "0.0.0.0")
-    battery = device_info_data.get("battery_percentage", 0)
-    battery_percentage = f"{battery}%" if battery is not None else "N/A"
-    os_name = device_info_data.get("os_name", "Unknown")
-    os_arch = device_info_data.get("os_arch", "Unknown")
-    cpu_used = device_info_data.get("cpu_used", 0)
-    cpu_data = f"{cpu_usage or 0}%"
+# History of the hosts pushing their metrics from agent.py
+fleet = FleetStore(path=DATA_DIR)
+atexit.register(fleet.close)
+if AGENT_PORT:
+    agent_server = AgentServer((AGENT_ADDRESS, int(AGENT_PORT)), fleet, LOCAL_HOST).start()
+
+
+def record_history(snapshot, timestamp):
+    metrics = snapshot_metrics(snapshot)
+    history.record(timestamp, metrics)
+    disk_history.record(timestamp, metrics)
+    # Its history is already kept above, so only its latest readings
+    fleet.record(LOCAL_HOST, timestamp, metrics, history=False)
+
+
+def query_history(name, start, end, max_points=HISTORY_POINTS, closed=False):
+    """
+    Get a metric over a time range, from memory where the in-memory history
+    reaches and from disk before that.
+    """
+    return query_stores(history, disk_history, name, start, end, max_points, closed)
+
+
+def get_usage_data(snapshot):
+    """
+    Format the usage panel data of a snapshot, shared by the polling
+    callback and the streaming mode.
+    :param snapshot: Dictionary returned by fetch_all_data().
+    :return: Dictionary of card texts and chart values.
+    """
+    cpu_usage = snapshot["cpu_usage"]
+    memory_data = snapshot["memory"]
+    disk_data = snapshot["disk"]
+    network_speed = snapshot["network_speed"]
+    network_io = snapshot["network_io"]
 
     # Memory data
     memory_used = memory_data.get("used", 0)
     memory_free = memory_data.get("free", 0)
+    # Cache and buffers are reclaimable, so they are not counted as used
+    memory_cache = memory_data.get("cached", 0) + memory_data.get("buffers", 0)
     memory_total = memory_data.get("total", 0)
     memory_percent = memory_data.get("percent", 0)
     memory_used_gb = (
@@ -211,110 +390,831 @@ def render_page_content(n_intervals):
         else "N/A"
     )
 
-    # Network Speed Graph
-    network_speed_fig = create_chart(
-        chart_type="bar",
-        title="Network Speed",
-        labels={"x": "Network", "y": "Speed (Mbps)"},
-        x=["Upload", "Download"],
-        y=[
-            network_speed.get("upload_speed", 0),
-            network_speed.get("download_speed", 0),
+    return {
+        "cpu_usage": f"{cpu_usage or 0}%",
+        "memory_usage": f"{memory_percent}%",
+        "disk_usage": f"{disk_percent}%",
+        "memory_used": memory_used_gb,
+        "disk_used": disk_used_gb,
+        # Speeds are measured in bytes/sec and charted in Mbps
+        "network_speed": [
+            (network_speed.get("upload_speed") or 0) * 8 / BITS_IN_MBIT,
+            (network_speed.get("download_speed") or 0) * 8 / BITS_IN_MBIT,
         ],
-    )
-
-    network_speed_fig = update_dark_theme_graph(network_speed_fig)
-
-    # Network I/O Graph
-    network_io_fig = create_chart(
-        chart_type="bar",
-        title="Network I/O",
-        labels={"x": "Network I/O", "y": "Bytes"},
-        x=["Bytes Sent", "Bytes Received"],
-        y=[
+        "network_io": [
             network_io.get("bytes_sent", 0),
             network_io.get("bytes_received", 0),
         ],
+        "memory": [memory_used, memory_cache, memory_free],
+        "disk": [disk_used, disk_free],
+    }
+
+
+# Streaming mode: every snapshot is pushed once to all connected viewers
+snapshot_stream = SnapshotStream(
+    lambda snapshot, timestamp: dict(get_usage_data(snapshot), time=timestamp)
+)
+
+# Prometheus page, rendered once per sample for any number of scrapers
+exposition = MetricsExposition()
+
+# A single background sampler feeds every open dashboard
+sampler = Sampler(
+    fetch_all_data,
+    interval=SAMPLE_INTERVAL,
+    listeners=[record_history, snapshot_stream.publish, exposition.publish],
+).start()
+
+# Flask server used by gunicorn (see Procfile)
+server = app.server
+
+
+@server.route("/stream")
+def stream_snapshots():
+    """
+    Server-Sent Events endpoint for the streaming mode. Viewers beyond the
+    stream limit get 503, and assets/stream.js falls back to polling.
+    """
+    if not snapshot_stream.acquire():
+        return Response("Too many streams, poll instead", status=503, mimetype="text/plain")
+    response = Response(
+        snapshot_stream.events(),
+        mimetype="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+    # Called when the server closes the response, e.g. once the viewer left
+    response.call_on_close(snapshot_stream.release)
+    return response
+
+
+@server.route("/metrics")
+def export_metrics():
+    """
+    Prometheus scrape endpoint serving the page rendered from the latest
+    sample.
+    """
+    return Response(exposition.body(), content_type=CONTENT_TYPE)
 
-    # Update layout for dark theme
-    network_io_fig = update_dark_theme_graph(network_io_fig)
 
-    # Memory Usage
-    memory_usage_fig = create_chart(
-        chart_type="pie",
-        title="Memory Usage",
-        labels=["Used", "Free"],
-        values=[memory_used, memory_free],
+# Encoded API responses shared by every client until the next sample
+api_responses = ResponseCache()
+
+
+def api_response(encoded):
+    """
+    Send an encoded API response, gzip-compressed when the client accepts
+    it, or 304 Not Modified when the client's copy is current.
+    :param encoded: EncodedResponse to send.
+    :return: Flask Response.
+    """
+    body, etag = encoded.body, encoded.etag
+    compress = len(body) >= GZIP_MIN_SIZE and request.accept_encodings.quality("gzip") > 0
+    if compress:
+        # Each encoding of a resource needs its own entity tag
+        body, etag = encoded.gzipped(), etag + "-gzip"
+    response = Response(body, content_type=encoded.content_type)
+    if compress:
+        response.content_encoding = "gzip"
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response.make_conditional(request)
+
+
+def api_error(error):
+    return Response(
+        json.dumps({"error": str(error)}), status=error.status, content_type=JSON_TYPE
     )
 
-    # Update layout for dark theme
-    memory_usage_fig = update_dark_theme_graph(memory_usage_fig, showlegend=True)
 
-    # Disk Usage
-    disk_usage_fig = create_chart(
-        chart_type="pie",
-        title="Disk Usage",
-        labels=["Used", "Free"],
-        values=[disk_used, disk_free],
+def get_float_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+    if not math.isfinite(number):
+        raise ApiError(400, f"{name} must be a finite number of seconds, not {value!r}")
+    return number
+
+
+@server.route("/api/snapshot")
+def api_snapshot():
+    """
+    Latest metrics of this host, or of the agent given by "host", as JSON
+    or MessagePack.
+    """
+    try:
+        content_type = choose_content_type(request.args.get("format"), request.accept_mimetypes)
+        host = request.args.get("host", LOCAL_HOST)
+        if host == LOCAL_HOST:
+            snapshot, timestamp = sampler.get_snapshot()
+            stale = sorted(snapshot["stale"])
+            build_metrics = lambda: snapshot_metrics(snapshot)
+        else:
+            latest = fleet.latest().get(host)
+            if latest is None:
+                raise ApiError(404, f"Unknown host {host!r}")
+            timestamp, metrics = latest
+            stale = []
+            build_metrics = lambda: metrics
+    except ApiError as e:
+        return api_error(e)
+
+    encoded = api_responses.get(
+        (host, content_type),
+        timestamp,
+        lambda: EncodedResponse(
+            {"host": host, "time": timestamp, "metrics": build_metrics(), "stale": stale},
+            content_type,
+        ),
     )
+    return api_response(encoded)
 
-    # Update layout for dark theme
-    disk_usage_fig = update_dark_theme_graph(disk_usage_fig, showlegend=True)
 
-    # Sort by CPU usage (descending) and limit to top 15
-    process_rows = [
-        html.Tr(
-            [
-                html.Td(proc.get("pid", "N/A")),
-                html.Td(proc.get("name", "Unknown")),
-                html.Td(proc.get("username", "Unknown")),
-                html.Td(proc.get("status", "N/A")),
-                html.Td(f"{proc.get('cpu_percent', 0):.1f}%"),
-                html.Td(f"{proc.get('memory_percent', 0):.1f}%"),
-            ]
-        )
-        for proc in sorted(
-            processes, key=lambda x: x.get("cpu_percent", 0), reverse=True
-        )[:15]
-    ]
+@server.route("/api/series")
+def api_series():
+    """
+    History of one metric over a time range, from the store that feeds the
+    charts. Takes "metric", and optionally "from" and "to" in seconds since
+    the epoch, "step" in seconds between points and "host".
+    """
+    try:
+        content_type = choose_content_type(request.args.get("format"), request.accept_mimetypes)
+        metric = request.args.get("metric")
+        if not metric:
+            raise ApiError(400, "metric is required")
+        host = request.args.get("host", LOCAL_HOST)
+        if host != LOCAL_HOST and host not in fleet.hosts():
+            raise ApiError(404, f"Unknown host {host!r}")
+        end = get_float_arg("to", sampler.get_snapshot()[1])
+        start = get_float_arg("from", end - API_RANGE)
+        step = get_float_arg("step", None)
+        if end < start:
+            raise ApiError(400, "from must not be after to")
+        if start < 0 or end > API_MAX_TIME:
+            raise ApiError(400, f"from and to must be between 0 and {API_MAX_TIME}")
+        if step is not None and step < API_MIN_STEP:
+            raise ApiError(400, f"step must be at least {API_MIN_STEP} second")
+    except ApiError as e:
+        return api_error(e)
 
-    # Limit to the first 15 connections
-    connections_rows = [
-        html.Tr(
-            [
-                html.Td(conn.get("local_address", "N/A")),
-                html.Td(conn.get("remote_address", "N/A")),
-                html.Td(conn.get("status", "Unknown")),
-                html.Td(conn.get("type", "Unknown")),
-            ]
+    max_points = API_MAX_POINTS
+    if step is not None:
+        max_points = min(max(math.ceil((end - start) / step), 1), API_MAX_POINTS)
+    if host == LOCAL_HOST:
+        result = query_history(metric, start, end, max_points)
+    else:
+        result = fleet.query(host, metric, start, end, max_points)
+    payload = series_payload(metric, host, start, end, result)
+    return api_response(EncodedResponse(payload, content_type))
+
+
+@server.route("/api/export")
+def api_export():
+    """
+    Download of the stored history as CSV or Parquet, streamed in chunks.
+    Takes "format", and optionally repeated "metric" patterns (e.g.
+    "cpu.*") and "host" names, and "from" and "to" in seconds since the
+    epoch or ISO 8601.
+    """
+    format = request.args.get("format", "csv")
+    # Hosts seen before a restart are only on disk; the live stores of this
+    # process also export the samples they have not written out yet
+    stores = open_stores(DATA_DIR, LOCAL_HOST)
+    stores.update(fleet.disk_stores())
+    stores[LOCAL_HOST] = disk_history
+    try:
+        chunks = iter_export(
+            stores,
+            format,
+            request.args.getlist("metric"),
+            request.args.getlist("host"),
+            parse_time(request.args.get("from")),
+            parse_time(request.args.get("to")),
         )
-        for conn in connections[:15]
+    except ExportError as e:
+        return api_error(ApiError(400, str(e)))
+    return Response(
+        chunks,
+        content_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="desert-eagle.{format}"'},
+    )
+
+
+# Callback to update the device panel every `device-interval`
+@app.callback(
+    [
+        Output("model", "children"),
+        Output("device-name", "children"),
+        Output("ip-address", "children"),
+        Output("battery-percentage", "children"),
+        Output("os-name", "children"),
+        Output("os-arch", "children"),
+        Output("cpu-used", "children"),
+    ],
+    [Input("device-interval", "n_intervals")],
+)
+def render_device_info(n_intervals):
+    """
+    Callback function to update the device information card.
+    """
+    snapshot, _ = sampler.get_snapshot()
+    device_info_data = snapshot["device_info"]
+
+    battery = device_info_data.get("battery_percentage", 0)
+    return [
+        device_info_data.get("model", "N/A"),
+        device_info_data.get("device_name", "Unknown"),
+        device_info_data.get("ip_address", "0.0.0.0"),
+        f"{battery}%" if battery is not None else "N/A",
+        device_info_data.get("os_name", "Unknown"),
+        device_info_data.get("os_arch", "Unknown"),
+        device_info_data.get("cpu_used", 0),
     ]
 
+
+# Callback to update the usage cards and snapshot charts every `interval-component`
+@app.callback(
+    [
+        Output("cpu-usage", "children"),
+        Output("memory-usage", "children"),
+        Output("disk-usage", "children"),
+        Output("memory-used", "children"),
+        Output("disk-used", "children"),
+        Output("network-speed", "figure"),
+        Output("network-io", "figure"),
+        Output("memory-pie", "figure"),
+        Output("disk-pie", "figure"),
+    ],
+    [Input("interval-component", "n_intervals")],
+)
+def render_usage(n_intervals):
+    """
+    Callback function to update the CPU, memory, disk and network panels
+    from the latest sampler snapshot.
+    """
+    snapshot, _ = sampler.get_snapshot()
+    usage = get_usage_data(snapshot)
+
+    # The figures live in the layout; only send their new data points.
+    # px.bar puts each bar in its own trace, px.pie keeps one trace.
+    network_speed_fig = Patch()
+    network_speed_fig["data"][0]["y"] = usage["network_speed"][:1]
+    network_speed_fig["data"][1]["y"] = usage["network_speed"][1:]
+
+    network_io_fig = Patch()
+    network_io_fig["data"][0]["y"] = usage["network_io"][:1]
+    network_io_fig["data"][1]["y"] = usage["network_io"][1:]
+
+    memory_usage_fig = Patch()
+    memory_usage_fig["data"][0]["values"] = usage["memory"]
+
+    disk_usage_fig = Patch()
+    disk_usage_fig["data"][0]["values"] = usage["disk"]
+
     return [
-        model,
-        device_name,
-        ip_address,
-        battery_percentage,
-        os_name,
-        os_arch,
-        cpu_data,
-        f"{memory_percent}%",
-        f"{disk_percent}%",
-        cpu_used,
-        memory_used_gb,
-        disk_used_gb,
+        usage["cpu_usage"],
+        usage["memory_usage"],
+        usage["disk_usage"],
+        usage["memory_used"],
+        usage["disk_used"],
         network_speed_fig,
         network_io_fig,
         memory_usage_fig,
         disk_usage_fig,
-        process_rows,
-        connections_rows,
     ]
 
 
-# server = app.server
+# In streaming mode the usage panel is fed by the server-sent events
+# instead of `interval-component` (see assets/stream.js)
+app.clientside_callback(
+    """
+    function(mode) {
+        if (mode === "stream") {
+            window.desertEagleStream.open("%s");
+            return true;
+        }
+        window.desertEagleStream.close();
+        return false;
+    }
+    """
+    % app.get_relative_path("/stream"),
+    Output("interval-component", "disabled"),
+    [Input("update-mode", "value")],
+)
+
+
+def get_sort(sort_by, default):
+    # Column and direction of a single-column DataTable sort_by value
+    if not sort_by:
+        return default, True
+    return sort_by[0]["column_id"], sort_by[0]["direction"] == "desc"
+
+
+def get_process_value(record, column):
+    # The trend column filters and sorts like the CPU usage it draws
+    if column == "cpu_trend":
+        column = "cpu_percent"
+    return getattr(record, column, None)
+
+
+# Callback to update the process table every `process-interval`, or when
+# the page, sort order or filter changes
+@app.callback(
+    [
+        Output("process-table", "data"),
+        Output("process-table", "page_count"),
+    ],
+    [
+        Input("process-interval", "n_intervals"),
+        Input("process-table", "page_current"),
+        Input("process-table", "page_size"),
+        Input("process-table", "sort_by"),
+        Input("process-table", "filter_query"),
+    ],
+)
+def render_processes(n_intervals, page_current, page_size, sort_by, filter_query):
+    """
+    Callback function to update the process table. Filtering, sorting and
+    paging run on the tracked processes, and only the visible page is
+    converted and sent to the browser.
+    """
+    column, descending = get_sort(sort_by, "cpu_percent")
+    predicate = build_filter(filter_query, get_process_value)
+    offset = (page_current or 0) * page_size
+    processes, total = query_processes(
+        lambda records: select_page(
+            records,
+            predicate,
+            lambda record: sort_key(get_process_value(record, column)),
+            descending,
+            offset,
+            page_size,
+        )
+    )
+
+    rows = [
+        {
+            "pid": proc.get("pid", "N/A"),
+            "name": proc.get("name", "Unknown"),
+            "username": proc.get("username", "Unknown"),
+            "status": proc.get("status", "N/A"),
+            "cpu_percent": f"{proc.get('cpu_percent', 0):.1f}%",
+            "memory_percent": f"{proc.get('memory_percent') or 0:.1f}%",
+            "cpu_trend": create_sparkline(proc.get("cpu_trend", [])),
+        }
+        for proc in processes
+    ]
+    return rows, get_page_count(total, page_size)
+
+
+# Callback to open the drill-down of a clicked process row
+@app.callback(
+    [
+        Output("selected-process", "data"),
+        Output("process-modal", "is_open"),
+        Output("process-table", "active_cell"),
+    ],
+    [Input("process-table", "active_cell")],
+    [State("process-table", "data")],
+    prevent_initial_call=True,
+)
+def select_process(active_cell, rows):
+    """
+    Callback function to remember the clicked process and open its view.
+    The clicked cell is cleared so the same row can be clicked again.
+    """
+    if not active_cell or active_cell["row"] >= len(rows or []):
+        return no_update, no_update, no_update
+    return rows[active_cell["row"]]["pid"], True, None
+
+
+def process_series(data, column):
+    # Shape one process history column like a history query result
+    return {
+        "resolution": PROCESS_INTERVAL,
+        "time": data["time"],
+        "min": data[column],
+        "max": data[column],
+        "avg": data[column],
+    }
+
+
+# Callback to draw the drill-down charts of the selected process
+@app.callback(
+    [
+        Output("process-modal-title", "children"),
+        Output("process-pin", "children"),
+        Output("process-cpu-chart", "figure"),
+        Output("process-memory-chart", "figure"),
+        Output("process-io-chart", "figure"),
+        Output("process-threads-chart", "figure"),
+    ],
+    [
+        Input("selected-process", "data"),
+        Input("process-pin", "n_clicks"),
+        Input("process-interval", "n_intervals"),
+    ],
+    [State("process-modal", "is_open")],
+    prevent_initial_call=True,
+)
+def render_process_detail(pid, pin_clicks, n_intervals, is_open):
+    """
+    Callback function to update the process drill-down while it is open.
+    The pin button keeps recording the process even when it is idle.
+    """
+    if pid is None or not is_open:
+        return [no_update] * 6
+    if ctx.triggered_id == "process-pin":
+        pin_process(pid, not is_process_pinned(pid))
+
+    pin_label = "Unpin" if is_process_pinned(pid) else "Pin"
+    data = get_process_history(pid)
+    if data is None:
+        return [f"PID {pid}: no history yet", pin_label] + [no_update] * 4
+
+    charts = [
+        ("CPU Usage", "Percent", [("CPU", "#0d6efd", "cpu_percent")]),
+        ("Memory (RSS)", "Bytes", [("RSS", "#0d6efd", "rss")]),
+        (
+            "Disk I/O",
+            "Bytes/sec",
+            [("Read", "#0d6efd", "read_rate"), ("Write", "#FFA500", "write_rate")],
+        ),
+        ("Threads", "Threads", [("Threads", "#0d6efd", "num_threads")]),
+    ]
+    figures = [
+        update_dark_theme_graph(
+            create_history_chart(
+                title,
+                [(label, color, process_series(data, column)) for label, color, column in series],
+                y_title,
+            ),
+            showlegend=len(series) > 1,
+        )
+        for title, y_title, series in charts
+    ]
+    return [f"{data['name']} (PID {pid})", pin_label] + figures
+
+
+# Callback to list connections when the page loads, on refresh, or when
+# the page, sort order or filter changes
+@app.callback(
+    [
+        Output("connection-table", "data"),
+        Output("connection-table", "page_count"),
+        Output("connection-summary", "children"),
+    ],
+    [
+        Input("connection-refresh", "n_clicks"),
+        Input("connection-table", "page_current"),
+        Input("connection-table", "page_size"),
+        Input("connection-table", "sort_by"),
+        Input("connection-table", "filter_query"),
+    ],
+)
+def render_connections(n_clicks, page_current, page_size, sort_by, filter_query):
+    """
+    Callback function to update the connection table. Connections are only
+    collected on demand, and viewers refreshing together share one listing.
+    Only the rows of the visible page are decoded into dictionaries.
+    """
+    listing = collectors.refresh("connections", max_age=CONNECTION_MAX_AGE)
+    column, descending = get_sort(sort_by, None)
+    rows, total = select_page(
+        listing.rows,
+        build_filter(filter_query, listing.value),
+        (lambda row: sort_key(listing.value(row, column))) if column else None,
+        descending,
+        (page_current or 0) * page_size,
+        page_size,
+    )
+    return (
+        [listing.to_dict(row) for row in rows],
+        get_page_count(total, page_size),
+        create_connection_summary(listing.summary()),
+    )
+
+
+# Callback to draw the history charts for the selected range, then extend
+# them with new points on every tick
+@app.callback(
+    [Output(chart_id, "figure") for chart_id in HISTORY_CHARTS]
+    + [Output(chart_id, "extendData") for chart_id in HISTORY_CHARTS]
+    + [Output("history-cursor", "data")],
+    [
+        Input("history-range", "value"),
+        Input("history-interface", "value"),
+        Input("history-disk", "value"),
+        Input("history-interval", "n_intervals"),
+    ],
+    [State("history-cursor", "data")],
+)
+def render_history(history_range, interface, disk, n_intervals, cursor):
+    """
+    Callback function to update the history charts. Each query picks the
+    rollup tier that fills the chart width without exceeding it. A range,
+    interface or disk change redraws the charts; a tick only appends the
+    points after the cursor, the last point each chart already has.
+    """
+    _, timestamp = sampler.get_snapshot()
+    start = timestamp - history_range
+    redraw = (
+        ctx.triggered_id in ("history-range", "history-interface", "history-disk")
+        or not cursor
+        or cursor.get("range") != history_range
+        or cursor.get("interface") != interface
+        or cursor.get("disk") != disk
+    )
+
+    figures = []
+    extensions = []
+    charts = {}
+    for chart_id, (title, y_title, series) in HISTORY_CHARTS.items():
+        # Only final points are drawn, so appended points never change later
+        results = [
+            query_history(
+                metric.format(interface=interface, disk=disk), start, timestamp, closed=True
+            )
+            for _, _, metric in series
+        ]
+        last = max((float(r["time"][-1]) for r in results if len(r["time"])), default=None)
+
+        if redraw:
+            fig = create_history_chart(
+                title,
+                [(label, color, r) for (label, color, _), r in zip(series, results)],
+                y_title,
+            )
+            figures.append(update_dark_theme_graph(fig, showlegend=len(series) > 1))
+            extensions.append(no_update)
+            resolution = max(r["resolution"] for r in results)
+            charts[chart_id] = {
+                "time": last,
+                "points": min(math.ceil(history_range / resolution), HISTORY_POINTS),
+            }
+        else:
+            chart = cursor["charts"][chart_id]
+            extension = get_history_extension(results, chart["points"], chart["time"])
+            figures.append(no_update)
+            extensions.append(extension if extension is not None else no_update)
+            charts[chart_id] = {
+                "time": last if last is not None else chart["time"],
+                "points": chart["points"],
+            }
+
+    cursor = {"range": history_range, "interface": interface, "disk": disk, "charts": charts}
+    return figures + extensions + [cursor]
+
+
+# Callback to redraw the per-core heatmap for the selected range
+@app.callback(
+    Output("cpu-heatmap", "figure"),
+    [
+        Input("history-range", "value"),
+        Input("history-interval", "n_intervals"),
+    ],
+)
+def render_cpu_heatmap(history_range, n_intervals):
+    """
+    Callback function to update the per-core usage heatmap. Cores are
+    aligned on the columns of the first core; a core without a sample in a
+    column leaves its cell empty.
+    """
+    snapshot, timestamp = sampler.get_snapshot()
+    start = timestamp - history_range
+    results = [
+        query_history(f"cpu.{core}.percent", start, timestamp, HEATMAP_POINTS)
+        for core in range(len(snapshot["per_cpu"] or []))
+    ]
+    times = results[0]["time"] if results else np.empty(0)
+    z = np.full((len(results), len(times)), np.nan)
+    for row, result in zip(z, results):
+        columns = np.searchsorted(times, result["time"])
+        found = columns < len(times)
+        found[found] = times[columns[found]] == result["time"][found]
+        row[columns[found]] = result["avg"][found]
+    fig = create_heatmap_chart(
+        "Per-Core CPU Usage", times, [f"CPU {core}" for core in range(len(results))], z, "%"
+    )
+    return update_dark_theme_graph(fig)
+
+
+def get_busiest_options(loads, selected, unit):
+    """
+    Build selector options labelled with the current load of each item.
+    :param loads: Dictionary of item name to its current load.
+    :param selected: Currently selected item.
+    :param unit: Unit appended to each load.
+    :return: Tuple of (options, selected item): the selection is kept while
+             the item exists, otherwise the busiest item is selected.
+    """
+    options = [
+        {"label": f"{name} ({load:.2f} {unit})", "value": name}
+        for name, load in sorted(loads.items())
+    ]
+    if selected not in loads and loads:
+        selected = max(loads, key=loads.get)
+    return options, selected
+
+
+# Callback to list the network interfaces, keeping the selected one while
+# it exists and otherwise selecting the busiest
+@app.callback(
+    [
+        Output("history-interface", "options"),
+        Output("history-interface", "value"),
+    ],
+    [Input("history-interval", "n_intervals")],
+    [State("history-interface", "value")],
+)
+def render_interfaces(n_intervals, selected):
+    """
+    Callback function to update the interface selector with current rates.
+    """
+    snapshot, _ = sampler.get_snapshot()
+    loads = {
+        name: (rates["sent_bps"] + rates["recv_bps"]) / BITS_IN_MBIT
+        for name, rates in (snapshot["interfaces"] or {}).items()
+    }
+    return get_busiest_options(loads, selected, "Mbps")
+
+
+# Callback to list the disks, keeping the selected one while it exists and
+# otherwise selecting the busiest
+@app.callback(
+    [
+        Output("history-disk", "options"),
+        Output("history-disk", "value"),
+    ],
+    [Input("history-interval", "n_intervals")],
+    [State("history-disk", "value")],
+)
+def render_disks(n_intervals, selected):
+    """
+    Callback function to update the disk selector with current IOPS.
+    """
+    snapshot, _ = sampler.get_snapshot()
+    loads = {
+        name: rates["read_iops"] + rates["write_iops"]
+        for name, rates in (snapshot["disk_io"] or {}).items()
+    }
+    return get_busiest_options(loads, selected, "IOPS")
+
+
+# Callback to update the usage of every mounted partition
+@app.callback(
+    Output("partition-table", "children"),
+    [Input("history-interval", "n_intervals")],
+)
+def render_partitions(n_intervals):
+    """
+    Callback function to update the partition table.
+    """
+    snapshot, _ = sampler.get_snapshot()
+    return create_partition_rows(snapshot["partitions"] or [])
+
+
+# Fleet matrix columns: FLEET_COLUMNS of modules.fleet
+FLEET_LABELS = ["CPU", "Memory", "Disk", "Upload", "Download"]
+FLEET_PERCENT_COLUMNS = 3  # CPU, memory and disk are percentages
+# Factor from each fleet matrix column to the unit it is shown and filtered
+# in: percentages as they are, byte rates in Mbps
+FLEET_DISPLAY_SCALES = np.array(
+    [1.0] * FLEET_PERCENT_COLUMNS
+    + [8 / BITS_IN_MBIT] * (len(FLEET_LABELS) - FLEET_PERCENT_COLUMNS)
+)
+
+
+def format_fleet_value(column, value):
+    """
+    Format one reading of the fleet matrix.
+    :param column: Index of the column in FLEET_COLUMNS.
+    :param value: Reading; NaN when the host does not report it.
+    :return: Formatted string.
+    """
+    if math.isnan(value):
+        return "N/A"
+    if column < FLEET_PERCENT_COLUMNS:
+        return f"{value:.1f}%"
+    return f"{value * FLEET_DISPLAY_SCALES[column]:.2f} Mbps"
+
+
+# Callback to update the fleet-wide cards, percentiles and heatmap
+@app.callback(
+    [
+        Output("fleet-hosts", "children"),
+        Output("fleet-stale", "children"),
+        Output("fleet-cpu", "children"),
+        Output("fleet-cpu-tail", "children"),
+        Output("fleet-memory", "children"),
+        Output("fleet-memory-tail", "children"),
+        Output("fleet-disk", "children"),
+        Output("fleet-disk-tail", "children"),
+        Output("fleet-percentiles", "children"),
+        Output("fleet-heatmap", "figure"),
+    ],
+    [Input("fleet-interval", "n_intervals")],
+)
+def render_fleet(n_intervals):
+    """
+    Callback function to update the fleet overview. Percentiles are computed
+    over the columns of the host x metric matrix, and the heatmap shows the
+    percentage readings of every host, busiest CPU first.
+    """
+    hosts, times, matrix = fleet.matrix()
+    stale = int(np.count_nonzero(time.time() - times > FLEET_STALE_AFTER))
+    stats = summarize(matrix)
+
+    cards = []
+    for column in range(FLEET_PERCENT_COLUMNS):
+        median, p90, p99 = (format_fleet_value(column, v) for v in stats[:3, column])
+        cards += [median, f"{p90} / {p99}"]
+
+    headers = [f"p{p}" for p in FLEET_PERCENTILES] + ["Max"]
+    rows = [
+        [format_fleet_value(column, value) for value in stats[:, column]]
+        for column in range(matrix.shape[1])
+    ]
+
+    # NaN sorts last, so hosts without a CPU reading go to the bottom
+    order = np.argsort(-matrix[:, 0], kind="stable")
+    fig = create_matrix_heatmap(
+        "Usage by Host",
+        FLEET_LABELS[:FLEET_PERCENT_COLUMNS],
+        hosts[order].tolist(),
+        matrix[order, :FLEET_PERCENT_COLUMNS],
+        "%",
+    )
+    fig.update_layout(height=max(300, 20 * len(hosts)))
+    return [
+        str(len(hosts)),
+        str(stale),
+        *cards,
+        create_percentile_table(FLEET_LABELS, headers, rows),
+        update_dark_theme_graph(fig),
+    ]
+
+
+# Callback to update the fleet host table
+@app.callback(
+    [
+        Output("fleet-table", "data"),
+        Output("fleet-table", "page_count"),
+    ],
+    [
+        Input("fleet-interval", "n_intervals"),
+        Input("fleet-table", "page_current"),
+        Input("fleet-table", "page_size"),
+        Input("fleet-table", "sort_by"),
+        Input("fleet-table", "filter_query"),
+    ],
+)
+def render_fleet_table(n_intervals, page_current, page_size, sort_by, filter_query):
+    """
+    Callback function to update the fleet host table. Filtering and sorting
+    run on whole columns of the fleet matrix, and only the visible page is
+    formatted and sent to the browser.
+    """
+    hosts, times, matrix = fleet.matrix()
+    ages = time.time() - times
+    columns = {"host": hosts, "age": ages}
+    # Filtered in the units shown, e.g. "{upload} > 10" means 10 Mbps
+    for index, (column, _) in enumerate(FLEET_TABLE_COLUMNS[1:-1]):
+        columns[column] = matrix[:, index] * FLEET_DISPLAY_SCALES[index]
+
+    mask = build_mask(filter_query, columns)
+    rows = np.arange(len(hosts)) if mask is None else np.flatnonzero(mask)
+    column, descending = get_sort(sort_by, "cpu")
+    values = columns.get(column, hosts)[rows]
+    if values.dtype.kind == "f":
+        # Negating keeps NaN last in both directions
+        order = np.argsort(-values if descending else values, kind="stable")
+    else:
+        order = np.argsort(values, kind="stable")
+        if descending:
+            order = order[::-1]
+    offset = (page_current or 0) * page_size
+    page = rows[order[offset : offset + page_size]]
+
+    data = [
+        {
+            "host": str(hosts[row]),
+            **{
+                column: format_fleet_value(index, matrix[row, index])
+                for index, (column, _) in enumerate(FLEET_TABLE_COLUMNS[1:-1])
+            },
+            "age": f"{ages[row]:.0f}s ago",
+        }
+        for row in page
+    ]
+    return data, get_page_count(len(rows), page_size)
+
+
 # main
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,56 @@
+// Streaming mode: apply the snapshots pushed by the server over
+// Server-Sent Events, without a callback request per update.
+window.desertEagleStream = (function () {
+    var source = null;
+
+    function setText(id, text) {
+        dash_clientside.set_props(id, { children: text });
+    }
+
+    function restyle(id, update, traces) {
+        var graph = document.querySelector("#" + id + " .js-plotly-plot");
+        if (graph && window.Plotly) {
+            window.Plotly.restyle(graph, update, traces);
+        }
+    }
+
+    function apply(usage) {
+        setText("cpu-usage", usage.cpu_usage);
+        setText("memory-usage", usage.memory_usage);
+        setText("disk-usage", usage.disk_usage);
+        setText("memory-used", usage.memory_used);
+        setText("disk-used", usage.disk_used);
+
+        // Same trace layout as the figures built in the page layout
+        restyle("network-speed", { y: [[usage.network_speed[0]], [usage.network_speed[1]]] }, [0, 1]);
+        restyle("network-io", { y: [[usage.network_io[0]], [usage.network_io[1]]] }, [0, 1]);
+        restyle("memory-pie", { values: [usage.memory] }, [0]);
+        restyle("disk-pie", { values: [usage.disk] }, [0]);
+    }
+
+    return {
+        open: function (url) {
+            if (source) {
+                return;
+            }
+            source = new EventSource(url);
+            source.onmessage = function (event) {
+                apply(JSON.parse(event.data));
+            };
+            source.onerror = function () {
+                // The server turns streams away past its limit (503), which
+                // closes the source for good; poll like the polling mode
+                if (source && source.readyState === EventSource.CLOSED) {
+                    source = null;
+                    dash_clientside.set_props("interval-component", { disabled: false });
+                }
+            };
+        },
+        close: function () {
+            if (source) {
+                source.close();
+                source = null;
+            }
+        },
+    };
+})();
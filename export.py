@@ -0,0 +1,62 @@
+"""
+Export the metric history kept by the dashboard to CSV or Parquet, reading
+it in chunks so weeks of history never have to fit in memory.
+
+    python export.py -o cpu.parquet --metric "cpu.*" --from 2026-10-01 --to 2026-10-08
+
+The history is read from DESERT_EAGLE_DATA, like the dashboard. Parquet
+needs pyarrow; CSV is written to stdout when no output file is given.
+"""
+import argparse
+import os
+import socket
+import sys
+from modules.export import EXPORT_FORMATS, ExportError, iter_export, open_stores, parse_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored metric history.")
+    parser.add_argument("-o", "--output", help="file to write, stdout if omitted")
+    parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, help="output format, from the file extension by default"
+    )
+    parser.add_argument(
+        "--metric", action="append", help="metric name or pattern such as 'cpu.*'; repeatable"
+    )
+    parser.add_argument("--host", action="append", help="host to export; repeatable")
+    parser.add_argument("--from", dest="start", help="start, in epoch seconds or ISO 8601")
+    parser.add_argument("--to", dest="end", help="end, in epoch seconds or ISO 8601")
+    parser.add_argument(
+        "--data", default=os.environ.get("DESERT_EAGLE_DATA", "data"), help="data directory"
+    )
+    parser.add_argument(
+        "--name", default=socket.gethostname(), help="name of the dashboard's own host"
+    )
+    args = parser.parse_args()
+
+    format = args.format
+    if format is None:
+        extension = os.path.splitext(args.output or "")[1].lstrip(".")
+        format = extension if extension in EXPORT_FORMATS else "csv"
+    try:
+        chunks = iter_export(
+            open_stores(args.data, args.name),
+            format,
+            args.metric,
+            args.host,
+            parse_time(args.start),
+            parse_time(args.end),
+        )
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    except ExportError as e:
+        parser.exit(1, f"Error exporting: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
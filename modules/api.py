@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import math
+import threading
+from modules.timeseries import ROLLUP_COLUMNS
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; JSON is always available
+    msgpack = None
+
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+GZIP_MIN_SIZE = 1024  # Smaller bodies are sent as they are
+GZIP_LEVEL = 6
+
+
+class ApiError(Exception):
+    """
+    Raised when an API request cannot be answered.
+    """
+
+    def __init__(self, status, message):
+        """
+        :param status: HTTP status code of the response.
+        :param message: Reason sent to the client.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+def choose_content_type(requested, accept):
+    """
+    Pick the encoding of a response.
+    :param requested: Value of the "format" query parameter, if any.
+    :param accept: Request Accept header object, whose quality() gives the
+                   weight of a MIME type.
+    :return: JSON_TYPE or MSGPACK_TYPE.
+    :raise ApiError: If MessagePack is asked for but not installed, or the
+                     format is unknown.
+    """
+    if requested is None:
+        wants_msgpack = accept.quality(MSGPACK_TYPE) > accept.quality(JSON_TYPE)
+        return MSGPACK_TYPE if wants_msgpack and msgpack is not None else JSON_TYPE
+    if requested == "json":
+        return JSON_TYPE
+    if requested == "msgpack":
+        if msgpack is None:
+            raise ApiError(406, "MessagePack is not available, install msgpack")
+        return MSGPACK_TYPE
+    raise ApiError(400, f"Unknown format {requested!r}")
+
+
+class EncodedResponse:
+    """
+    Body of an API response in one encoding, with its entity tag and its
+    gzip-compressed form made on first use.
+    """
+
+    def __init__(self, payload, content_type):
+        """
+        :param payload: JSON-serialisable payload.
+        :param content_type: JSON_TYPE or MSGPACK_TYPE.
+        """
+        if content_type == MSGPACK_TYPE:
+            self.body = msgpack.packb(payload)
+        else:
+            self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.content_type = content_type
+        self.etag = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        self._gzipped = None
+
+    def gzipped(self):
+        """
+        :return: Bytes of the gzip-compressed body.
+        """
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, GZIP_LEVEL)
+        return self._gzipped
+
+
+class ResponseCache:
+    """
+    Latest encoded version of a few API resources, so every client polling
+    the same resource between two samples shares one encoding.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._responses = {}
+
+    def get(self, key, version, build):
+        """
+        :param key: Hashable resource key, including the content type.
+        :param version: Value that changes when the resource does, e.g. the
+                        sample time.
+        :param build: Callable returning the EncodedResponse of the resource.
+        :return: The cached EncodedResponse if its version matches, or a
+                 freshly built one.
+        """
+        with self._lock:
+            cached = self._responses.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        response = build()
+        with self._lock:
+            self._responses[key] = (version, response)
+        return response
+
+
+def _to_list(values):
+    # NaN is not valid JSON, so empty readings become None
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+def series_payload(metric, host, start, end, result):
+    """
+    Build the payload of a history query.
+    :param metric: Metric name.
+    :param host: Host the metric belongs to.
+    :param start: Start of the range in seconds since the epoch.
+    :param end: End of the range in seconds since the epoch.
+    :param result: Dictionary returned by a TimeSeriesStore query.
+    :return: Dictionary with the query, the "resolution" in seconds, and one
+             list per entry of ROLLUP_COLUMNS aligned on "time".
+    """
+    payload = {
+        "metric": metric,
+        "host": host,
+        "from": start,
+        "to": end,
+        "resolution": float(result["resolution"]),
+        "time": result["time"].tolist(),
+    }
+    payload.update({column: _to_list(result[column]) for column in ROLLUP_COLUMNS})
+    return payload
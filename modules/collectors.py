@@ -0,0 +1,159 @@
+from modules.sampler import CollectorPool
+from modules.system_stats import (
+    CPU_TIME_BREAKDOWN,
+    get_cpu_usage,
+    get_disk_io_rates,
+    get_disk_usage,
+    get_memory_usage,
+    get_partition_usage,
+    get_per_cpu_usage,
+    get_pressure,
+    get_swap_usage,
+)
+from modules.connection_stats import ConnectionListing, get_connection_listing
+from modules.network_stats import (
+    get_interface_rates,
+    get_network_io,
+    get_network_speed,
+    get_device_info,
+)
+from modules.process_stats import get_top_processes
+
+
+COLLECT_TIMEOUT = 2  # Seconds a collector may run before it is reported stale
+DEVICE_INTERVAL = 180  # Seconds between two refreshes of the device information
+PROCESS_INTERVAL = 5  # Seconds between two refreshes of the process list
+PROCESS_ROWS = 15  # Top processes kept in each snapshot
+
+# Per-interface rates recorded as "network.<interface>.<rate>" metrics
+INTERFACE_RATES = ("sent_bps", "recv_bps", "sent_pps", "recv_pps", "errors", "drops")
+# Per-disk rates recorded as "disk.io.<device>.<rate>" metrics
+DISK_IO_RATES = (
+    "read_bps", "write_bps", "read_iops", "write_iops",
+    "read_latency", "write_latency", "busy_percent",
+)
+
+# Collectors whose readings snapshot_metrics() turns into metrics
+METRIC_COLLECTORS = (
+    "cpu_usage",
+    "per_cpu",
+    "memory",
+    "swap",
+    "pressure",
+    "disk",
+    "partitions",
+    "disk_io",
+    "network_speed",
+    "network_io",
+    "interfaces",
+)
+
+
+def create_collector_pool(names=None, timeout=COLLECT_TIMEOUT, process_rows=PROCESS_ROWS):
+    """
+    Create the pool running every collector, each with the value it reports
+    before its first success.
+    :param names: Names of the collectors to run, or None for all of them.
+    :param timeout: Deadline in seconds for every collector.
+    :param process_rows: Number of top processes in each snapshot.
+    :return: CollectorPool.
+    """
+    collectors = {
+        "device_info": get_device_info,
+        "cpu_usage": get_cpu_usage,
+        "per_cpu": get_per_cpu_usage,
+        "memory": get_memory_usage,
+        "swap": get_swap_usage,
+        "pressure": get_pressure,
+        "disk": get_disk_usage,
+        "partitions": get_partition_usage,
+        "disk_io": get_disk_io_rates,
+        "network_speed": get_network_speed,
+        "network_io": get_network_io,
+        "interfaces": get_interface_rates,
+        "connections": get_connection_listing,
+        "processes": lambda: get_top_processes(process_rows),
+    }
+    # Everything else is collected on every sample
+    intervals = {
+        "device_info": DEVICE_INTERVAL,
+        "processes": PROCESS_INTERVAL,
+        "connections": None,  # Only collected when asked for
+    }
+    defaults = {
+        "device_info": {},
+        "cpu_usage": None,
+        "per_cpu": [],
+        "memory": {},
+        "swap": {},
+        "pressure": {},
+        "disk": {},
+        "partitions": [],
+        "disk_io": {},
+        "network_speed": {},
+        "network_io": {},
+        "interfaces": {},
+        "connections": ConnectionListing([], raw=False),
+        "processes": [],
+    }
+    if names is not None:
+        collectors = {name: collectors[name] for name in names}
+    return CollectorPool(
+        collectors,
+        timeout=timeout,
+        intervals={name: v for name, v in intervals.items() if name in collectors},
+        defaults={name: v for name, v in defaults.items() if name in collectors},
+    )
+
+
+def snapshot_metrics(snapshot):
+    """
+    Flatten the numeric readings of a snapshot into metric names.
+    :param snapshot: Dictionary returned by CollectorPool.collect(); readings
+                     of collectors that did not run are skipped.
+    :return: Dictionary of metric name to value.
+    """
+    memory = snapshot.get("memory") or {}
+    swap = snapshot.get("swap") or {}
+    disk = snapshot.get("disk") or {}
+    network_speed = snapshot.get("network_speed") or {}
+    network_io = snapshot.get("network_io") or {}
+    metrics = {
+        "cpu.percent": snapshot.get("cpu_usage"),
+        "memory.percent": memory.get("percent"),
+        "memory.used": memory.get("used"),
+        "memory.available": memory.get("available"),
+        "memory.cached": memory.get("cached"),
+        "memory.buffers": memory.get("buffers"),
+        "memory.slab": memory.get("slab"),
+        "swap.percent": swap.get("percent"),
+        "swap.used": swap.get("used"),
+        "swap.in_rate": swap.get("swap_in"),
+        "swap.out_rate": swap.get("swap_out"),
+        "disk.percent": disk.get("percent"),
+        "disk.used": disk.get("used"),
+        "network.upload_speed": network_speed.get("upload_speed"),
+        "network.download_speed": network_speed.get("download_speed"),
+        "network.bytes_sent": network_io.get("bytes_sent"),
+        "network.bytes_received": network_io.get("bytes_received"),
+    }
+    for resource, stalls in (snapshot.get("pressure") or {}).items():
+        for kind, averages in stalls.items():
+            metrics[f"pressure.{resource}.{kind}"] = averages["avg10"]
+    cores = snapshot.get("per_cpu") or []
+    for core, usage in enumerate(cores):
+        metrics[f"cpu.{core}.percent"] = usage["percent"]
+    if cores:
+        # Every core accounts the same wall time, so the CPU-wide share of
+        # each mode is the average over the cores
+        for name, _ in CPU_TIME_BREAKDOWN:
+            metrics[f"cpu.{name}"] = sum(usage[name] for usage in cores) / len(cores)
+    for interface, rates in (snapshot.get("interfaces") or {}).items():
+        for rate in INTERFACE_RATES:
+            metrics[f"network.{interface}.{rate}"] = rates.get(rate)
+    for partition in snapshot.get("partitions") or []:
+        metrics[f"partition.{partition['mountpoint']}.percent"] = partition["percent"]
+    for device, rates in (snapshot.get("disk_io") or {}).items():
+        for rate in DISK_IO_RATES:
+            metrics[f"disk.io.{device}.{rate}"] = rates.get(rate)
+    return metrics
@@ -0,0 +1,395 @@
+import heapq
+import os
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+import psutil as ps
+
+
+# /proc/net tables read on Linux as (file name, type, address family)
+PROC_NET_TABLES = (
+    ("tcp", "TCP", socket.AF_INET),
+    ("tcp6", "TCP", socket.AF_INET6),
+    ("udp", "UDP", socket.AF_INET),
+    ("udp6", "UDP", socket.AF_INET6),
+)
+# Kernel socket states as written in the `st` column, named like psutil
+TCP_STATES = {
+    "01": "ESTABLISHED",
+    "02": "SYN_SENT",
+    "03": "SYN_RECV",
+    "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2",
+    "06": "TIME_WAIT",
+    "07": "CLOSE",
+    "08": "CLOSE_WAIT",
+    "09": "LAST_ACK",
+    "0A": "LISTEN",
+    "0B": "CLOSING",
+    "0C": "NEW_SYN_RECV",
+}
+# Unconnected UDP sockets have no state, like psutil's "NONE"
+UDP_STATES = {"01": "ESTABLISHED"}
+SUMMARY_TOP = 5  # Remote hosts, local ports and processes listed in a summary
+OWNER_RESCAN_INTERVAL = 60  # Seconds between full rescans for unowned sockets
+
+# Fields of a connection row
+ROW_TYPE, ROW_FAMILY, ROW_LOCAL, ROW_REMOTE, ROW_STATUS, ROW_INODE, ROW_PID = range(7)
+
+
+def _decode_host(host, family):
+    # /proc/net writes addresses as host-order 32-bit words in hex
+    words = [socket.ntohl(int(host[i : i + 8], 16)) for i in range(0, len(host), 8)]
+    return socket.inet_ntop(family, struct.pack(f"!{len(words)}I", *words))
+
+
+def _decode_address(address, family):
+    # Hex "host:port" to (ip, port), None for the unspecified address
+    host, _, port = address.rpartition(":")
+    port = int(port, 16)
+    if port == 0 and not host.strip("0"):
+        return None
+    return _decode_host(host, family), port
+
+
+def _format_address(address):
+    if address is None:
+        return None
+    ip, port = address
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+
+
+def _count(item):
+    return item[1]
+
+
+def _read_proc_net(path="/proc/net"):
+    """
+    Read the socket tables of /proc/net without decoding any address.
+    :return: List of (type, family, local, remote, status, inode, pid) rows
+             with hex addresses and no pid, or None if the tables cannot be
+             read.
+    """
+    rows = []
+    found = False
+    for name, kind, family in PROC_NET_TABLES:
+        try:
+            with open(f"{path}/{name}", "rb") as f:
+                lines = f.read().decode("ascii").splitlines()[1:]
+        except OSError:
+            continue
+        found = True
+        states = TCP_STATES if kind == "TCP" else UDP_STATES
+        for line in lines:
+            fields = line.split(None, 10)
+            status = states.get(fields[3])
+            if status is None:
+                continue  # Unconnected UDP sockets are not connections
+            rows.append((kind, family, fields[1], fields[2], status, fields[9], None))
+    return rows if found else None
+
+
+def _read_psutil():
+    # Portable fallback, with addresses already decoded
+    return [
+        (
+            "TCP" if conn.type == socket.SOCK_STREAM else "UDP",
+            conn.family,
+            tuple(conn.laddr) if conn.laddr else None,
+            tuple(conn.raddr) if conn.raddr else None,
+            conn.status,
+            None,
+            conn.pid,
+        )
+        for conn in ps.net_connections(kind="inet")  # Limit to internet connections (TCP/UDP)
+        if conn.status not in {"NONE"}  # Exclude irrelevant connections
+    ]
+
+
+class SocketOwnerIndex:
+    """
+    Map socket inodes to the processes holding them, from the fd links in
+    /proc/<pid>/fd. The index is kept between refreshes: a process is only
+    listed again when its number of open fds changed, and only fds it did
+    not have before are resolved. Sockets still unowned after that trigger
+    a full rescan at most every OWNER_RESCAN_INTERVAL, which catches fd
+    numbers that were closed and reused.
+    """
+
+    def __init__(self, proc="/proc", rescan_interval=OWNER_RESCAN_INTERVAL):
+        """
+        :param proc: Mount point of procfs.
+        :param rescan_interval: Minimum seconds between two full rescans.
+        """
+        self.proc = proc
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._fds = {}  # pid -> {fd: socket inode or None}
+        self._fd_counts = {}  # pid -> open fd count at the last listing
+        self._names = {}  # pid -> process name
+        self._owners = {}  # socket inode -> pid
+        self._last_rescan = 0
+
+    def _forget(self, pid, inodes):
+        for inode in inodes:
+            if inode is not None and self._owners.get(inode) == pid:
+                del self._owners[inode]
+
+    def _drop(self, pid):
+        self._forget(pid, self._fds.pop(pid, {}).values())
+        self._fd_counts.pop(pid, None)
+        self._names.pop(pid, None)
+
+    def _scan(self, pid, full):
+        path = f"{self.proc}/{pid}/fd"
+        # procfs reports the open fd count as the size of the fd directory
+        # on recent kernels; 0 means unknown, so the directory is listed
+        count = os.stat(path).st_size
+        if not full and count and self._fd_counts.get(pid) == count:
+            return
+        known = {} if full else self._fds.get(pid, {})
+        fds = {}
+        for fd in os.listdir(path):
+            if fd in known:
+                fds[fd] = known[fd]
+                continue
+            try:
+                target = os.readlink(f"{path}/{fd}")
+            except OSError:
+                continue  # Closed since the listing
+            fds[fd] = target[8:-1] if target.startswith("socket:[") else None
+
+        previous = self._fds.get(pid, {})
+        self._forget(pid, (inode for fd, inode in previous.items() if fds.get(fd) != inode))
+        for inode in fds.values():
+            if inode is not None:
+                self._owners[inode] = pid
+        self._fds[pid] = fds
+        self._fd_counts[pid] = count
+        if pid not in self._names:
+            try:
+                with open(f"{self.proc}/{pid}/comm") as f:
+                    self._names[pid] = f.read().strip()
+            except OSError:
+                self._names[pid] = None
+
+    def refresh(self, inodes=()):
+        """
+        Bring the index up to date with the running processes.
+        :param inodes: Socket inodes that should be resolved; any that are
+                       still unowned may trigger a full rescan.
+        """
+        with self._lock:
+            try:
+                pids = {int(entry) for entry in os.listdir(self.proc) if entry.isdigit()}
+            except OSError:
+                return
+            for pid in self._fds.keys() - pids:
+                self._drop(pid)
+
+            now = time.monotonic()
+            full = False
+            for attempt in range(2):
+                for pid in pids:
+                    try:
+                        self._scan(pid, full)
+                    except OSError:
+                        # Gone, or owned by another user without privileges
+                        self._drop(pid)
+                if full or now - self._last_rescan < self.rescan_interval:
+                    break
+                # Timed-out sockets such as TIME_WAIT have inode 0 and no owner
+                if all(inode == "0" or inode in self._owners for inode in inodes):
+                    break
+                full = True
+                self._last_rescan = now
+
+    def pid(self, inode):
+        """
+        :return: PID of the process holding a socket, or None.
+        """
+        return self._owners.get(inode)
+
+    def name(self, pid):
+        """
+        :return: Name of an indexed process, or None.
+        """
+        return self._names.get(pid)
+
+
+class ConnectionListing:
+    """
+    One listing of the active connections. On Linux the rows keep the raw
+    hex fields of /proc/net, and addresses are only decoded for the rows
+    that are filtered on, counted in a summary or displayed, so a host with
+    100k sockets never builds 100k dictionaries.
+    """
+
+    def __init__(self, rows, raw, owners=None):
+        """
+        :param rows: List of (type, family, local, remote, status, inode, pid).
+        :param raw: Whether addresses are still hex strings from /proc/net.
+        :param owners: SocketOwnerIndex resolving the owner of raw rows.
+        """
+        self.rows = rows
+        self.raw = raw
+        self.owners = owners
+        self._summary = {}
+
+    @classmethod
+    def read(cls, owners=None):
+        """
+        List the active connections from /proc/net, or through psutil where
+        /proc/net is not available.
+        :param owners: SocketOwnerIndex to refresh and resolve owners with.
+        :return: ConnectionListing.
+        """
+        rows = _read_proc_net()
+        if rows is None:
+            return cls(_read_psutil(), raw=False)
+        if owners is not None:
+            owners.refresh([row[ROW_INODE] for row in rows])
+        return cls(rows, raw=True, owners=owners)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def address(self, row, field):
+        """
+        :return: (ip, port) of the local or remote address of a row, or None.
+        """
+        address = row[field]
+        if self.raw and address is not None:
+            return _decode_address(address, row[ROW_FAMILY])
+        return address
+
+    def owner(self, row):
+        """
+        :return: Tuple of (pid, process name) holding a row's socket, or None.
+        """
+        pid = self._pid(row)
+        return None if pid is None else (pid, self._name(pid))
+
+    def _pid(self, row):
+        if not self.raw:
+            return row[ROW_PID]
+        return None if self.owners is None else self.owners.pid(row[ROW_INODE])
+
+    def _name(self, pid):
+        if self.owners is not None:
+            return self.owners.name(pid)
+        try:
+            return ps.Process(pid).name()
+        except ps.Error:
+            return None
+
+    def value(self, row, column):
+        """
+        Get the value of a table column for a row.
+        :param row: Connection row.
+        :param column: "local_address", "remote_address", "local_port",
+                       "remote_port", "status", "type", "pid" or "process".
+        :return: Column value, None if the row has none.
+        """
+        if column in ("pid", "process"):
+            owner = self.owner(row)
+            return owner and owner[0 if column == "pid" else 1]
+        if column == "status":
+            return row[ROW_STATUS]
+        if column == "type":
+            return row[ROW_TYPE]
+        field = ROW_LOCAL if column.startswith("local") else ROW_REMOTE
+        address = self.address(row, field)
+        if column.endswith("_port"):
+            return address[1] if address else None
+        return _format_address(address)
+
+    def to_dict(self, row):
+        """
+        Decode a row into the dictionary shown in the connections table.
+        """
+        return {
+            "local_address": self.value(row, "local_address"),
+            "remote_address": self.value(row, "remote_address"),
+            "status": row[ROW_STATUS],
+            "type": row[ROW_TYPE],
+            "pid": self.value(row, "pid"),
+            "process": self.value(row, "process"),
+        }
+
+    def summary(self, top=SUMMARY_TOP):
+        """
+        Count the connections by state, remote host, local port and owning
+        process. Counting runs on the raw fields; only the top entries are
+        decoded.
+        :param top: Number of remote hosts, local ports and processes to list.
+        :return: Dictionary with the "total", the counts "by_state", and
+                 "remote_hosts", "local_ports" and "processes" as (value,
+                 count) lists, busiest first. Processes are "name (pid)".
+        """
+        if top in self._summary:
+            return self._summary[top]
+
+        states = Counter(row[ROW_STATUS] for row in self.rows)
+        if self.raw:
+            # Keyed on (family, hex host) so equal hosts are decoded once
+            hosts = Counter(
+                (row[ROW_FAMILY], row[ROW_REMOTE].rpartition(":")[0])
+                for row in self.rows
+                if row[ROW_STATUS] != "LISTEN"
+            )
+            ports = Counter(
+                row[ROW_LOCAL].rpartition(":")[2]
+                for row in self.rows
+                if row[ROW_STATUS] == "LISTEN" or row[ROW_TYPE] == "UDP"
+            )
+            remote_hosts = [
+                (_decode_host(host, family), count)
+                for (family, host), count in heapq.nlargest(top, hosts.items(), key=_count)
+            ]
+            local_ports = [
+                (int(port, 16), count)
+                for port, count in heapq.nlargest(top, ports.items(), key=_count)
+            ]
+        else:
+            hosts = Counter(
+                row[ROW_REMOTE][0] for row in self.rows if row[ROW_REMOTE] is not None
+            )
+            ports = Counter(
+                row[ROW_LOCAL][1]
+                for row in self.rows
+                if row[ROW_LOCAL] is not None
+                and (row[ROW_STATUS] == "LISTEN" or row[ROW_TYPE] == "UDP")
+            )
+            remote_hosts = heapq.nlargest(top, hosts.items(), key=_count)
+            local_ports = heapq.nlargest(top, ports.items(), key=_count)
+
+        pids = Counter(self._pid(row) for row in self.rows)
+        pids.pop(None, None)
+        processes = [
+            (f"{self._name(pid)} ({pid})", count)
+            for pid, count in heapq.nlargest(top, pids.items(), key=_count)
+        ]
+
+        self._summary[top] = {
+            "total": len(self.rows),
+            "by_state": dict(states),
+            "remote_hosts": remote_hosts,
+            "local_ports": local_ports,
+            "processes": processes,
+        }
+        return self._summary[top]
+
+
+_owner_index = SocketOwnerIndex()
+
+
+def get_connection_listing():
+    """
+    Get the active connections without decoding them, with the process
+    holding each socket.
+    :return: ConnectionListing.
+    """
+    return ConnectionListing.read(_owner_index)
@@ -0,0 +1,223 @@
+import fnmatch
+import math
+import os
+from datetime import datetime, timezone
+from urllib.parse import unquote
+import numpy as np
+import pandas as pd
+from modules.fleet import HOSTS_DIR, host_path, is_valid_host
+from modules.storage import DiskStore
+from modules.timeseries import ROLLUP_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional; CSV is always available
+    pa = pq = None
+
+
+# Content type of each export format
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Rows gathered before a chunk is written, bounding the memory of an export
+CHUNK_ROWS = 256 * 1024
+# One row per stored point; raw samples have a resolution of 0 and the same
+# value in every rollup column
+EXPORT_COLUMNS = ("time", "host", "metric", "resolution") + ROLLUP_COLUMNS
+
+
+class ExportError(Exception):
+    """
+    Raised when an export cannot be made.
+    """
+
+
+def parse_time(value):
+    """
+    Parse the bound of an export range.
+    :param value: Seconds since the epoch, an ISO 8601 date or time (UTC
+                  unless it has an offset), or None.
+    :return: Seconds since the epoch, or None.
+    :raise ExportError: If the value is neither, or is not finite.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        if not math.isfinite(seconds):
+            raise ExportError(f"{value!r} is not a finite number of seconds")
+        return seconds
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"{value!r} is neither seconds since the epoch nor an ISO 8601 time")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def open_stores(path, local_host):
+    """
+    Open the history of every host kept in a data directory for reading.
+    :param path: Data directory of the dashboard.
+    :param local_host: Name of the host the dashboard runs on, whose
+                       history is at the top of the directory.
+    :return: Dictionary of host to DiskStore.
+    """
+    stores = {local_host: DiskStore(path)}
+    try:
+        entries = os.listdir(os.path.join(path, HOSTS_DIR))
+    except OSError:
+        entries = []
+    for entry in sorted(entries):
+        host = unquote(entry)
+        store_path = os.path.join(path, HOSTS_DIR, entry)
+        # Skip stray files and anything host_path() would not have made
+        if (
+            is_valid_host(host)
+            and host_path(path, host) == store_path
+            and os.path.isdir(store_path)
+        ):
+            stores[host] = DiskStore(store_path)
+    return stores
+
+
+def _match(patterns):
+    # Metric name predicate of shell-style patterns, None matching everything
+    if not patterns:
+        return None
+    return lambda name: any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def _frame(parts):
+    times = np.concatenate([times for _, _, _, times, _ in parts])
+    values = np.concatenate([values for _, _, _, _, values in parts])
+    counts = [len(times) for _, _, _, times, _ in parts]
+    frame = {
+        "time": pd.to_datetime(times, unit="s", utc=True),
+        "host": np.repeat([host for host, _, _, _, _ in parts], counts),
+        "metric": np.repeat([name for _, _, name, _, _ in parts], counts),
+        "resolution": np.repeat([resolution for _, resolution, _, _, _ in parts], counts),
+    }
+    frame.update({column: values[:, i] for i, column in enumerate(ROLLUP_COLUMNS)})
+    return pd.DataFrame(frame, columns=EXPORT_COLUMNS)
+
+
+def iter_frames(stores, metrics=None, hosts=None, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """
+    Read the stored history as DataFrames of about chunk_rows rows, one
+    segment at a time, filtering before anything is converted.
+    :param stores: Dictionary of host to DiskStore.
+    :param metrics: Shell-style patterns of the metrics to export (e.g.
+                    "cpu.*"), or None for every metric.
+    :param hosts: Hosts to export, or None for every host.
+    :param start: Earliest timestamp, or None for the oldest sample.
+    :param end: Latest timestamp, or None for the newest sample.
+    :param chunk_rows: Rows gathered before a DataFrame is yielded.
+    :return: Generator of DataFrames with the EXPORT_COLUMNS.
+    """
+    match = _match(metrics)
+    parts = []
+    rows = 0
+    for host, store in stores.items():
+        if hosts and host not in hosts:
+            continue
+        for resolution, name, times, values in store.read_segments(match, start, end):
+            parts.append((host, resolution, name, times, values))
+            rows += len(times)
+            if rows >= chunk_rows:
+                yield _frame(parts)
+                parts, rows = [], 0
+    if parts:
+        yield _frame(parts)
+
+
+def iter_csv(frames):
+    """
+    Encode DataFrames as one CSV document.
+    :param frames: Iterable of DataFrames with the EXPORT_COLUMNS.
+    :return: Generator of bytes, the header first.
+    """
+    yield (",".join(EXPORT_COLUMNS) + "\n").encode()
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False, date_format="%Y-%m-%dT%H:%M:%S.%fZ").encode()
+
+
+class _Drain:
+    # Write-only file whose content is taken out after every row group, so
+    # a Parquet file can be sent while it is written
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(frames):
+    """
+    Encode DataFrames as one Parquet file, one row group per DataFrame.
+    :param frames: Iterable of DataFrames with the EXPORT_COLUMNS.
+    :return: Generator of bytes.
+    :raise ExportError: If pyarrow is not installed.
+    """
+    if pq is None:
+        raise ExportError("Parquet export needs pyarrow, install it or export to CSV")
+    schema = pa.schema(
+        [
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("host", pa.string()),
+            ("metric", pa.string()),
+            ("resolution", pa.int64()),
+        ]
+        + [(column, pa.float64()) for column in ROLLUP_COLUMNS]
+    )
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            yield sink.take()
+    yield sink.take()
+
+
+def iter_export(stores, format, metrics=None, hosts=None, start=None, end=None):
+    """
+    Export the stored history in chunks.
+    :param stores: Dictionary of host to DiskStore.
+    :param format: Key of EXPORT_FORMATS.
+    :param metrics: Shell-style patterns of the metrics, or None for all.
+    :param hosts: Hosts to export, or None for all.
+    :param start: Earliest timestamp, or None for the oldest sample.
+    :param end: Latest timestamp, or None for the newest sample.
+    :return: Generator of the bytes of the exported file.
+    :raise ExportError: If the format is unknown or not available.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format {format!r}, use one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and pq is None:
+        raise ExportError("Parquet export needs pyarrow, install it or export to CSV")
+    frames = iter_frames(stores, metrics, hosts, start, end)
+    return iter_parquet(frames) if format == "parquet" else iter_csv(frames)
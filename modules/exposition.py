@@ -0,0 +1,144 @@
+import math
+import re
+import threading
+from modules.collectors import DISK_IO_RATES, INTERFACE_RATES, snapshot_metrics
+
+
+PREFIX = "desert_eagle_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metrics whose name carries a label, as (pattern, family, help). The
+# family may use the pattern's groups; the other groups become labels.
+LABELLED_FAMILIES = (
+    (r"cpu\.(?P<core>\d+)\.percent", "cpu_core_percent", "CPU usage of one core in percent."),
+    (
+        r"pressure\.(?P<resource>\w+)\.(?P<kind>some|full)",
+        "pressure_avg10",
+        "Share of the last 10 seconds stalled on a resource, in percent.",
+    ),
+    (
+        r"network\.(?P<interface>.+)\.(?P<rate>" + "|".join(INTERFACE_RATES) + ")",
+        "network_interface_{rate}",
+        "Per-interface network rate.",
+    ),
+    (r"partition\.(?P<mountpoint>.+)\.percent", "partition_percent", "Partition usage in percent."),
+    (
+        r"disk\.io\.(?P<device>.+)\.(?P<rate>" + "|".join(DISK_IO_RATES) + ")",
+        "disk_io_{rate}",
+        "Per-disk I/O rate.",
+    ),
+)
+LABELLED_FAMILIES = [
+    (re.compile(pattern + "$"), family, help) for pattern, family, help in LABELLED_FAMILIES
+]
+# Metrics that only ever grow; every other metric is a gauge
+COUNTERS = {"network.bytes_sent", "network.bytes_received"}
+
+
+def _sanitize(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _describe(name):
+    # Family, type, help and sample prefix of one metric name
+    for pattern, template, help in LABELLED_FAMILIES:
+        match = pattern.match(name)
+        if match is None:
+            continue
+        groups = match.groupdict()
+        family = PREFIX + _sanitize(template.format(**groups))
+        labels = ",".join(
+            f'{label}="{_escape(value)}"'
+            for label, value in groups.items()
+            if "{" + label + "}" not in template
+        )
+        return family, "gauge", help, f"{family}{{{labels}}} "
+    if name in COUNTERS:
+        family = PREFIX + _sanitize(name) + "_total"
+        return family, "counter", None, family + " "
+    family = PREFIX + _sanitize(name)
+    return family, "gauge", None, family + " "
+
+
+class MetricsExposition:
+    """
+    Render every sampler snapshot in the Prometheus text exposition format.
+
+    The page is rendered once per sample when the snapshot is published, so
+    a scrape only returns the cached bytes and never collects anything.
+    The family, labels and sample prefix of each metric name are worked out
+    the first time the name is seen and reused afterwards, so rendering a
+    sample only formats the values. Names missing from a snapshot, such as
+    removed interfaces or mounts, are forgotten.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._body = b""
+
+    def publish(self, snapshot, timestamp):
+        """
+        Render a snapshot. Meant to be used as a sampler listener.
+        :param snapshot: Dictionary returned by the sampler.
+        :param timestamp: Sample time in seconds since the epoch.
+        """
+        families = {}
+        known, self._series = self._series, {}
+        for name, value in snapshot_metrics(snapshot).items():
+            series = known.get(name)
+            if series is None:
+                series = _describe(name)
+            self._series[name] = series
+            if value is None:
+                continue
+            family, kind, help, prefix = series
+            lines = families.get(family)
+            if lines is None:
+                lines = families[family] = []
+                if help:
+                    lines.append(f"# HELP {family} {help}")
+                lines.append(f"# TYPE {family} {kind}")
+            lines.append(prefix + _format_value(value))
+
+        stale = snapshot.get("stale") or ()
+        lines = [
+            f"# HELP {PREFIX}collector_stale Whether a collector missed its deadline and reports its last value.",
+            f"# TYPE {PREFIX}collector_stale gauge",
+        ]
+        for collector in snapshot:
+            if collector != "stale":
+                lines.append(
+                    f'{PREFIX}collector_stale{{collector="{_escape(collector)}"}} {int(collector in stale)}'
+                )
+        lines += [
+            f"# TYPE {PREFIX}sample_timestamp_seconds gauge",
+            f"{PREFIX}sample_timestamp_seconds {_format_value(timestamp)}",
+        ]
+        families["collectors"] = lines
+
+        body = "\n".join(line for lines in families.values() for line in lines) + "\n"
+        with self._lock:
+            self._body = body.encode()
+
+    def body(self):
+        """
+        :return: Bytes of the page rendered from the latest snapshot, empty
+                 before the first one.
+        """
+        with self._lock:
+            return self._body
@@ -0,0 +1,266 @@
+import os
+import socketserver
+import threading
+import warnings
+from urllib.parse import quote
+import numpy as np
+from modules.storage import DiskStore
+from modules.timeseries import MAX_POINTS, ROLLUP_COLUMNS, TimeSeriesStore, query_result
+from modules.wire import SnapshotDecoder, WireError
+
+
+AGENT_PORT = 7071  # Default TCP port the dashboard accepts agents on
+HOST_HISTORY = 10 * 60  # Raw samples kept per metric of a remote host
+# Rollups kept per metric of a remote host: 6 hours of 1m buckets. Far less
+# than the local history, so a dashboard can hold a few hundred hosts.
+HOST_ROLLUP_TIERS = ((60, 6 * 60),)
+# Hosts whose history is kept, each with its own stores and open files
+MAX_HOSTS = 500
+RECEIVE_SIZE = 64 * 1024
+HOSTS_DIR = "hosts"  # Directory of the data directory holding one DiskStore per host
+MAX_HOST_LENGTH = 255
+
+# Metrics compared across hosts, one column each of the fleet matrix
+FLEET_COLUMNS = (
+    "cpu.percent",
+    "memory.percent",
+    "disk.percent",
+    "network.upload_speed",
+    "network.download_speed",
+)
+FLEET_PERCENTILES = (50, 90, 99)
+
+
+class FleetStore:
+    """
+    Metric history of every host reporting to this dashboard, with one
+    bounded TimeSeriesStore per host and the latest snapshot of each. Given
+    a data directory, the history of each host is also kept on disk.
+
+    The latest values of FLEET_COLUMNS are also kept in a host x metric
+    matrix updated in place on every snapshot, so fleet-wide views sort and
+    aggregate whole columns with NumPy instead of walking every host.
+    """
+
+    def __init__(
+        self,
+        capacity=HOST_HISTORY,
+        tiers=HOST_ROLLUP_TIERS,
+        columns=FLEET_COLUMNS,
+        path=None,
+        max_hosts=MAX_HOSTS,
+    ):
+        """
+        :param capacity: Raw samples kept per metric of each host.
+        :param tiers: Rollup tiers kept per metric of each host.
+        :param columns: Metrics kept in the fleet matrix.
+        :param path: Data directory the history of each host is written to
+                     (see host_path()), or None to keep it in memory only.
+        :param max_hosts: Hosts whose history is kept.
+        """
+        self.capacity = capacity
+        self.tiers = tiers
+        self.columns = columns
+        self.path = path
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        self._stores = {}
+        self._disk_stores = {}
+        self._latest = {}
+        self._hosts = []  # Host of each matrix row
+        self._rows = {}  # Matrix row of each host
+        self._matrix = np.full((0, len(columns)), np.nan)
+        self._times = np.empty(0)
+
+    def _row(self, host):
+        # Must be called with the lock held
+        row = self._rows.get(host)
+        if row is None:
+            row = self._rows[host] = len(self._hosts)
+            self._hosts.append(host)
+            if row == len(self._matrix):
+                size = max(2 * row, 16)
+                matrix = np.full((size, len(self.columns)), np.nan)
+                matrix[:row] = self._matrix
+                times = np.full(size, np.nan)
+                times[:row] = self._times
+                self._matrix, self._times = matrix, times
+        return row
+
+    def record(self, host, timestamp, metrics, history=True):
+        """
+        Add one snapshot of a host.
+        :param host: Host name.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param metrics: Dictionary of metric name to value.
+        :param history: Also keep the snapshot in the host's history; off
+                        for a host whose history is stored elsewhere.
+        :raise ValueError: If the history of max_hosts hosts is already kept.
+        """
+        with self._lock:
+            if history and host not in self._stores and len(self._stores) >= self.max_hosts:
+                raise ValueError(f"More than {self.max_hosts} hosts")
+            row = self._row(host)
+            self._matrix[row] = [
+                np.nan if metrics.get(name) is None else metrics[name] for name in self.columns
+            ]
+            self._times[row] = timestamp
+            self._latest[host] = (timestamp, metrics)
+            store = self._stores.get(host)
+            if store is None and history:
+                store = self._stores[host] = TimeSeriesStore(self.capacity, self.tiers)
+                if self.path is not None:
+                    self._disk_stores[host] = DiskStore(host_path(self.path, host))
+            disk_store = self._disk_stores.get(host)
+        if history:
+            store.record(timestamp, metrics)
+        if disk_store is not None:
+            disk_store.record(timestamp, metrics)
+
+    def hosts(self):
+        """
+        :return: Sorted list of the hosts that have reported.
+        """
+        with self._lock:
+            return sorted(self._rows)
+
+    def matrix(self):
+        """
+        Get the latest fleet-wide readings.
+        :return: Tuple of (hosts, timestamps, matrix): the host of each row,
+                 the time of each host's latest snapshot, and a copy of the
+                 host x FLEET_COLUMNS matrix with NaN for missing readings.
+        """
+        with self._lock:
+            count = len(self._hosts)
+            return (
+                np.array(self._hosts, dtype=str),
+                self._times[:count].copy(),
+                self._matrix[:count].copy(),
+            )
+
+    def latest(self):
+        """
+        :return: Dictionary of host to (timestamp, metrics) of its latest
+                 snapshot.
+        """
+        with self._lock:
+            return dict(self._latest)
+
+    def disk_stores(self):
+        """
+        :return: Dictionary of host to the DiskStore of its history.
+        """
+        with self._lock:
+            return dict(self._disk_stores)
+
+    def close(self):
+        """
+        Write out the buffered samples of every host.
+        """
+        for disk_store in self.disk_stores().values():
+            disk_store.close()
+
+    def query(self, host, name, start=None, end=None, max_points=MAX_POINTS, closed=False):
+        """
+        Get a metric of one host over a time range, like
+        TimeSeriesStore.query(). An unknown host has no data.
+        """
+        with self._lock:
+            store = self._stores.get(host)
+        if store is None:
+            return query_result(1, np.empty(0), np.empty((0, len(ROLLUP_COLUMNS))))
+        return store.query(name, start, end, max_points, closed)
+
+
+def summarize(matrix, percentiles=FLEET_PERCENTILES):
+    """
+    Compute fleet-wide percentiles of every column of the fleet matrix.
+    :param matrix: Host x metric matrix from FleetStore.matrix().
+    :param percentiles: Percentiles to compute.
+    :return: Array with one row per percentile followed by the maximum, and
+             one column per metric; NaN where no host reports the metric.
+    """
+    if not len(matrix):
+        return np.full((len(percentiles) + 1, matrix.shape[1]), np.nan)
+    with warnings.catch_warnings():
+        # Columns no host reports are NaN, which is the expected result
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.vstack(
+            [np.nanpercentile(matrix, percentiles, axis=0), np.nanmax(matrix, axis=0)]
+        )
+
+
+def is_valid_host(host):
+    """
+    Check a host name sent by an agent before anything is stored under it.
+    :param host: Host name.
+    :return: True if the name is 1 to MAX_HOST_LENGTH printable characters.
+    """
+    return 0 < len(host) <= MAX_HOST_LENGTH and host.isprintable()
+
+
+def host_path(path, host):
+    """
+    :param path: Data directory.
+    :param host: Host name.
+    :return: Directory of the DiskStore holding the history of a host.
+    :raise ValueError: If the host name is not valid.
+    """
+    if not is_valid_host(host):
+        raise ValueError(f"Invalid host name {host!r}")
+    # Dots are escaped too, so "." and ".." stay inside HOSTS_DIR
+    return os.path.join(path, HOSTS_DIR, quote(host, safe="").replace(".", "%2E"))
+
+
+class _AgentHandler(socketserver.BaseRequestHandler):
+    # One connection from one agent, decoded until it closes
+    def handle(self):
+        decoder = SnapshotDecoder()
+        try:
+            while True:
+                data = self.request.recv(RECEIVE_SIZE)
+                if not data:
+                    return
+                for host, timestamp, metrics in decoder.feed(data):
+                    if not is_valid_host(host) or host == self.server.local_host:
+                        print(f"Error reading agent {self.client_address[0]}: invalid host name {host!r}")
+                        return
+                    self.server.fleet.record(host, timestamp, metrics)
+        except (OSError, ValueError, WireError, UnicodeDecodeError) as e:
+            print(f"Error reading agent {self.client_address[0]}: {e}")
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server receiving the snapshots pushed by headless agents into a
+    FleetStore, one thread per connected agent.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fleet, local_host=None):
+        """
+        :param address: (host, port) to listen on. Agents are not
+                        authenticated, so only listen where they are trusted.
+        :param fleet: FleetStore receiving the snapshots.
+        :param local_host: Name of the dashboard's own host, which no agent
+                           may report under.
+        """
+        super().__init__(address, _AgentHandler)
+        self.fleet = fleet
+        self.local_host = local_host
+        self._thread = None
+
+    def start(self):
+        """
+        Serve agents from a background thread.
+        :return: The server itself.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="desert-eagle-agents", daemon=True
+        )
+        self._thread.start()
+        return self
+
@@ -3,6 +3,9 @@ import socket
 import time
 import platform
 import subprocess
+import threading
+from modules.connection_stats import get_connection_listing
+from modules.system_stats import MIN_INTERVAL
 
 
 def get_network_io():
@@ -20,24 +23,112 @@ def get_network_io():
     }
 
 
-def get_network_speed(interval=1):
+class NetworkSpeedMeter:
     """
-    Calculate network upload and download speeds.
-    :param interval: Time interval in seconds to measure speed.
-    :return: Dictionary with upload and download speeds in bytes/sec.
+    Compute network throughput from the delta between two counter samples,
+    so a reading returns instantly instead of sleeping for an interval.
     """
 
-    net_io_1 = ps.net_io_counters()
-    time.sleep(interval)
-    net_io_2 = ps.net_io_counters()
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.net_io_counters()
+        self._last_time = time.monotonic()
 
-    upload_speed = (net_io_2.bytes_sent - net_io_1.bytes_sent) / interval
-    download_speed = (net_io_2.bytes_recv - net_io_1.bytes_recv) / interval
+    def read(self):
+        """
+        Get the upload and download speeds since the previous reading.
+        :return: Dictionary with upload and download speeds in bytes/sec,
+                 both None if the previous reading is less than
+                 MIN_INTERVAL old.
+        """
+        net_io = ps.net_io_counters()
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return {"upload_speed": None, "download_speed": None}
+            last, self._last = self._last, net_io
+            elapsed, self._last_time = now - self._last_time, now
 
-    return {
-        "upload_speed": upload_speed,  # Bytes uploaded per second
-        "download_speed": download_speed,  # Bytes downloaded per second
-    }
+        return {
+            # Bytes uploaded per second
+            "upload_speed": max(net_io.bytes_sent - last.bytes_sent, 0) / elapsed,
+            # Bytes downloaded per second
+            "download_speed": max(net_io.bytes_recv - last.bytes_recv, 0) / elapsed,
+        }
+
+
+_speed_meter = NetworkSpeedMeter()
+
+
+def get_network_speed():
+    """
+    Calculate network upload and download speeds since the previous call.
+    :return: Dictionary with upload and download speeds in bytes/sec, both
+             None right after the previous call.
+    """
+    return _speed_meter.read()
+
+
+class InterfaceRateMeter:
+    """
+    Compute per-interface rates from the delta between two samples of the
+    per-NIC counters. Interfaces that appear between two readings (e.g. new
+    veths) are reported from their second reading on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.net_io_counters(pernic=True)
+        self._last_time = time.monotonic()
+
+    def read(self):
+        """
+        Get the rates of every interface since the previous reading.
+        :return: Dictionary of interface name to a dictionary with
+                 "sent_bps" and "recv_bps" in bits/sec, "sent_pps" and
+                 "recv_pps" in packets/sec, and "errors" and "drops" per
+                 second in both directions; None if the previous reading is
+                 less than MIN_INTERVAL old.
+        """
+        counters = ps.net_io_counters(pernic=True)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return None
+            last, self._last = self._last, counters
+            elapsed, self._last_time = now - self._last_time, now
+
+        def rate(current, previous):
+            # Counters restart from zero when an interface is recreated
+            return max(current - previous, 0) / elapsed
+
+        rates = {}
+        for name, io in counters.items():
+            prev = last.get(name)
+            if prev is None:
+                continue
+            rates[name] = {
+                "sent_bps": rate(io.bytes_sent, prev.bytes_sent) * 8,
+                "recv_bps": rate(io.bytes_recv, prev.bytes_recv) * 8,
+                "sent_pps": rate(io.packets_sent, prev.packets_sent),
+                "recv_pps": rate(io.packets_recv, prev.packets_recv),
+                "errors": rate(io.errin + io.errout, prev.errin + prev.errout),
+                "drops": rate(io.dropin + io.dropout, prev.dropin + prev.dropout),
+            }
+        return rates
+
+
+_interface_meter = InterfaceRateMeter()
+
+
+def get_interface_rates():
+    """
+    Calculate the throughput, packet, error and drop rates of every network
+    interface since the previous call.
+    :return: Dictionary of interface name to its rates, or None right after
+             the previous call.
+    """
+    return _interface_meter.read()
 
 
 def get_active_connections():
@@ -45,21 +136,8 @@ def get_active_connections():
     Get details of active network connections.
     :return: List of dictionaries containing connection details.
     """
-    connections = ps.net_connections(kind="inet")  # Limit to internet connections (TCP/UDP)
-    return [
-        {
-            "local_address": (
-                f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else None
-            ),
-            "remote_address": (
-                f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else None
-            ),
-            "status": conn.status,
-            "type": "TCP" if conn.type == socket.SOCK_STREAM else "UDP",
-        }
-        for conn in connections
-        if conn.status not in {"NONE"}  # Exclude irrelevant connections
-    ]
+    listing = get_connection_listing()
+    return [listing.to_dict(row) for row in listing.rows]
 
 
 def get_private_ip():
@@ -84,15 +162,9 @@ def get_system_model():
             )
             return model.stdout.split("\n")[2].strip()
         elif platform.system() == "Linux":
-            # Linux: Read from the DMI data
-            # manufacturer = subprocess.run("cat /sys/class/dmi/id/sys_vendor", shell=True, capture_output=True, text=True)
-            model = subprocess.run(
-                "cat /sys/class/dmi/id/product_name",
-                shell=True,
-                capture_output=True,
-                text=True,
-            )
-            return model.stdout.split("\n")[2].strip()
+            # Linux: Read the DMI data directly instead of forking a shell
+            with open("/sys/class/dmi/id/product_name") as f:
+                return f.read().strip()
         elif platform.system() == "Darwin":
             # macOS: Use system_profiler for details
             model = subprocess.check_output(
@@ -106,44 +178,112 @@ def get_system_model():
         return "Unknown"
 
 
-def get_device_info():
-    # Device Name
-    device_name = socket.gethostname()
+IP_ADDRESS_TTL = 300  # Seconds before the private IP is looked up again
 
-    # Battery Percentage
-    battery = ps.sensors_battery()
-    battery_percent = battery.percent if battery else None
 
-    # IP Address
-    private_ip = get_private_ip()
+def _get_interface_signature():
+    """
+    Summarise the IPv4 addresses of every interface, so a change in the
+    network configuration can be noticed without opening a socket.
+    """
+    return frozenset(
+        (name, addr.address)
+        for name, addrs in ps.net_if_addrs().items()
+        for addr in addrs
+        if addr.family == socket.AF_INET
+    )
+
 
-    # cpu frequency
+def _get_cpu_frequency():
     freq = ps.cpu_freq()
+    if freq is None:
+        return "N/A"
     max = f"{freq.max / 1000:.2f}"
     current = f"{freq.current / 1000:.2f}"
-    cpu_used = f"{current}/{max} GHz"
+    return f"{current}/{max} GHz"
 
-    # Get system model and OS information
-    system_arch = platform.uname().machine  # For general architecture (e.g., x86_64)
-    system_name = platform.uname().system  # OS name
-    os_release = platform.release()
-    system_model = get_system_model()
 
-    return {
-        "model": system_model,
-        "device_name": device_name,
-        "ip_address": private_ip,
-        "battery_percentage": battery_percent,
-        "os_name": f"{system_name} {os_release}",
-        "os_arch": system_arch,
-        "cpu_used": cpu_used,
-    }
+def _get_battery_percentage():
+    battery = ps.sensors_battery()
+    return battery.percent if battery else None
+
+
+class DeviceInfoCache:
+    """
+    Serve device information with a refresh policy per kind of fact:
+    static facts are probed once, the private IP is refreshed when the
+    interfaces change or its TTL expires, and live facts on every read.
+    """
+
+    def __init__(self, ip_ttl=IP_ADDRESS_TTL):
+        """
+        :param ip_ttl: Time in seconds before the private IP is refreshed.
+        """
+        self.ip_ttl = ip_ttl
+        self._lock = threading.Lock()
+        self._static = None
+        self._ip_address = None
+        self._ip_signature = None
+        self._ip_expires = 0
+
+    def _get_static_info(self):
+        if self._static is None:
+            uname = platform.uname()
+            self._static = {
+                "model": get_system_model(),
+                "device_name": socket.gethostname(),
+                "os_name": f"{uname.system} {uname.release}",
+                "os_arch": uname.machine,  # For general architecture (e.g., x86_64)
+            }
+        return self._static
+
+    def _get_ip_address(self):
+        signature = _get_interface_signature()
+        now = time.monotonic()
+        if signature != self._ip_signature or now >= self._ip_expires:
+            self._ip_address = get_private_ip()
+            self._ip_signature = signature
+            self._ip_expires = now + self.ip_ttl
+        return self._ip_address
+
+    def read(self):
+        """
+        Get the device information, probing only what is due.
+        :return: Dictionary with device, OS, network and power details.
+        """
+        with self._lock:
+            info = dict(self._get_static_info())
+            info["ip_address"] = self._get_ip_address()
+
+        info["battery_percentage"] = _get_battery_percentage()
+        info["cpu_used"] = _get_cpu_frequency()
+        return info
+
+    def invalidate(self):
+        """
+        Drop every cached fact so the next read probes them again.
+        """
+        with self._lock:
+            self._static = None
+            self._ip_signature = None
+            self._ip_expires = 0
+
+
+_device_info = DeviceInfoCache()
+
+
+def get_device_info():
+    """
+    Get the device information from the shared cache.
+    :return: Dictionary with device, OS, network and power details.
+    """
+    return _device_info.read()
 
 
 # if __name__ == "__main__":
 #     # Test the functions
 #     print("Network I/O:", get_network_io())
-#     print("Network Speed (1s interval):", get_network_speed(interval=1))
+#     print("Network Speed:", get_network_speed())
 #     print("Active Connections:")
 #     for conn in get_active_connections():
 #         print(conn)
@@ -1,4 +1,9 @@
+import heapq
+import threading
+import time
+from operator import attrgetter
 import psutil as ps
+from modules.timeseries import RingBuffer
 
 
 def get_all_processes():
@@ -19,6 +24,329 @@ def get_all_processes():
 
     return processes
 
+
+# Process history columns, in the order they are stored
+PROCESS_HISTORY_COLUMNS = ("cpu_percent", "rss", "read_rate", "write_rate", "num_threads")
+PROCESS_HISTORY_SIZE = 720  # Samples kept per process (an hour at 5s)
+PROCESS_HISTORY_TOP = 10  # Processes with the highest CPU usage recorded each sample
+PROCESS_HISTORY_MAX = 50  # Processes with history kept at most
+SPARKLINE_POINTS = 20  # Recent CPU samples returned with each top process
+
+
+class ProcessRecord:
+    """
+    Compact per-PID state kept by ProcessTracker between samples.
+    """
+
+    __slots__ = (
+        "pid",
+        "process",
+        "create_time",
+        "name",
+        "username",
+        "status",
+        "cpu_time",
+        "sampled_at",
+        "cpu_percent",
+        "rss",
+        "memory_percent",
+        "num_threads",
+        "io",
+        "read_rate",
+        "write_rate",
+        "history",
+        "history_seen",
+    )
+
+    def __init__(self, process, create_time):
+        self.pid = process.pid
+        self.process = process
+        self.create_time = create_time
+        # Name and user are read once, when the process is first seen
+        self.name = process.name()
+        try:
+            self.username = process.username()
+        except (KeyError, ps.AccessDenied):
+            self.username = "Unknown"
+        self.status = None
+        self.cpu_time = None
+        self.sampled_at = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.memory_percent = 0.0
+        self.num_threads = 0
+        self.io = None  # (read bytes, write bytes, time) of the last IO read
+        self.read_rate = 0.0
+        self.write_rate = 0.0
+        self.history = None  # RingBuffer of PROCESS_HISTORY_COLUMNS
+        self.history_seen = 0
+
+    def to_dict(self):
+        info = {
+            "pid": self.pid,
+            "name": self.name,
+            "username": self.username,
+            "status": self.status,
+            "cpu_percent": self.cpu_percent,
+            "memory_percent": self.memory_percent,
+        }
+        if self.history is not None:
+            _, values = self.history.window()
+            info["cpu_trend"] = values[-SPARKLINE_POINTS:, 0].tolist()
+        return info
+
+
+class ProcessTracker:
+    """
+    Track every process across samples and compute CPU usage from its own
+    cpu_times deltas, so a process gets a meaningful CPU% from its first
+    sample on. Processes that are gone are evicted, and only new PIDs are
+    fully described; known ones keep their Process and only have their CPU
+    times and memory read, from /proc/<pid>/stat and statm on Linux.
+    """
+
+    def __init__(
+        self,
+        history_size=PROCESS_HISTORY_SIZE,
+        history_top=PROCESS_HISTORY_TOP,
+        history_max=PROCESS_HISTORY_MAX,
+    ):
+        """
+        :param history_size: Samples of history kept per process.
+        :param history_top: Processes with the highest CPU usage whose
+                            history is recorded on each sample.
+        :param history_max: Processes with history kept at most.
+        """
+        self.history_size = history_size
+        self.history_top = history_top
+        self.history_max = history_max
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()  # One sample at a time
+        self._records = {}
+        self._pinned = set()
+        self._total_memory = ps.virtual_memory().total
+
+    def sample(self):
+        """
+        Refresh the usage of every tracked process and pick up new ones.
+        """
+        with self._sample_lock:
+            with self._lock:
+                previous = dict(self._records)
+
+            # /proc is scanned without the lock, so readers only wait for
+            # the new records to be swapped in; processes that exited since
+            # the previous sample are left out
+            records = {}
+            for pid in ps.pids():
+                record = previous.get(pid)
+                try:
+                    process = ps.Process(pid) if record is None else record.process
+                    with process.oneshot():
+                        # Read from the same stat file as the CPU times
+                        create_time = process.create_time()
+                        if record is None or record.create_time != create_time:
+                            # A new process, or a PID that was reused
+                            record = ProcessRecord(process, create_time)
+                        self._update(record)
+                    records[pid] = record
+                except (ps.NoSuchProcess, ps.AccessDenied, ps.ZombieProcess):
+                    continue
+
+            with self._lock:
+                self._records = records
+                self._record_history()
+
+    def _update(self, record):
+        # Only what the process table shows; the rest is read for the
+        # processes whose history is recorded
+        process = record.process
+        now = time.time()
+        times = process.cpu_times()
+        cpu_time = times.user + times.system
+
+        if record.cpu_time is None:
+            # First sample: average usage since the process started
+            elapsed = now - record.create_time
+            used = cpu_time
+        else:
+            elapsed = now - record.sampled_at
+            used = cpu_time - record.cpu_time
+        record.cpu_percent = max(used, 0) / elapsed * 100 if elapsed > 0 else 0.0
+        record.cpu_time = cpu_time
+        record.sampled_at = now
+
+        record.status = process.status()
+        record.rss = process.memory_info().rss
+        record.memory_percent = record.rss / self._total_memory * 100
+
+    def _update_io(self, record):
+        # IO counters and threads are only read for processes whose history
+        # is recorded
+        try:
+            record.num_threads = record.process.num_threads()
+            io = record.process.io_counters()
+        except (ps.NoSuchProcess, ps.AccessDenied, AttributeError):
+            return
+        now = time.time()
+        if record.io is not None and now > record.io[2]:
+            elapsed = now - record.io[2]
+            record.read_rate = max(io.read_bytes - record.io[0], 0) / elapsed
+            record.write_rate = max(io.write_bytes - record.io[1], 0) / elapsed
+        record.io = (io.read_bytes, io.write_bytes, now)
+
+    def _record_history(self):
+        # Record the busiest processes and the pinned ones
+        selected = heapq.nlargest(
+            self.history_top, self._records.values(), key=attrgetter("cpu_percent")
+        )
+        selected += [
+            self._records[pid] for pid in self._pinned
+            if pid in self._records and self._records[pid] not in selected
+        ]
+        for record in selected:
+            self._update_io(record)
+            if record.history is None:
+                record.history = RingBuffer(
+                    self.history_size, width=len(PROCESS_HISTORY_COLUMNS)
+                )
+            record.history.append(
+                record.sampled_at,
+                [
+                    record.cpu_percent,
+                    record.rss,
+                    record.read_rate,
+                    record.write_rate,
+                    record.num_threads,
+                ],
+            )
+            record.history_seen = record.sampled_at
+
+        # Keep the memory bounded by dropping the least recently recorded
+        with_history = [r for r in self._records.values() if r.history is not None]
+        for record in heapq.nsmallest(
+            len(with_history) - self.history_max,
+            with_history,
+            key=attrgetter("history_seen"),
+        ):
+            if record.pid not in self._pinned:
+                record.history = None
+
+    def query(self, select):
+        """
+        Run a selection over the tracked processes without copying them.
+        :param select: Callable taking an iterable of ProcessRecord and
+                       returning (records, total), e.g. a page of a table.
+        :return: Tuple of (process dictionaries, total).
+        """
+        with self._lock:
+            records, total = select(self._records.values())
+            return [record.to_dict() for record in records], total
+
+    def history(self, pid):
+        """
+        Get the recorded history of a process.
+        :param pid: Process ID.
+        :return: Dictionary with the process name, "time" and one array per
+                 entry of PROCESS_HISTORY_COLUMNS, or None if there is none.
+        """
+        with self._lock:
+            record = self._records.get(pid)
+            if record is None or record.history is None:
+                return None
+            times, values = record.history.window()
+            result = {"pid": pid, "name": record.name, "time": times}
+            result.update(
+                {column: values[:, i] for i, column in enumerate(PROCESS_HISTORY_COLUMNS)}
+            )
+            return result
+
+    def pin(self, pid):
+        """
+        Record the history of a process on every sample, busy or not.
+        :param pid: Process ID.
+        """
+        with self._lock:
+            self._pinned.add(pid)
+
+    def unpin(self, pid):
+        """
+        :param pid: Process ID to stop recording unless it is busy.
+        """
+        with self._lock:
+            self._pinned.discard(pid)
+
+    def is_pinned(self, pid):
+        with self._lock:
+            return pid in self._pinned
+
+    def top(self, n=15, key="cpu_percent"):
+        """
+        Get the top tracked processes, selected with a bounded heap.
+        :param n: Number of processes to return.
+        :param key: Sort key, either "cpu_percent" or "memory_percent".
+        :return: List of dictionaries containing process details, highest first.
+        """
+        with self._lock:
+            records = heapq.nlargest(n, self._records.values(), key=attrgetter(key))
+            return [record.to_dict() for record in records]
+
+
+_tracker = ProcessTracker()
+
+
+def get_top_processes(n=15, key="cpu_percent"):
+    """
+    Get the top processes by CPU or memory usage from the shared tracker,
+    without building or sorting a list of every process.
+    :param n: Number of processes to return.
+    :param key: Sort key, either "cpu_percent" or "memory_percent".
+    :return: List of dictionaries containing process details, highest first.
+             Processes with history include their recent "cpu_trend".
+    """
+    _tracker.sample()
+    return _tracker.top(n, key)
+
+
+def query_processes(select):
+    """
+    Select processes from the shared tracker, e.g. to page a table.
+    :param select: Callable taking an iterable of ProcessRecord and
+                   returning (records, total).
+    :return: Tuple of (process dictionaries, total).
+    """
+    return _tracker.query(select)
+
+
+def get_process_history(pid):
+    """
+    Get the CPU, memory, IO and thread history of a process.
+    :param pid: Process ID.
+    :return: Dictionary of history arrays, or None if none was recorded.
+    """
+    return _tracker.history(pid)
+
+
+def pin_process(pid, pinned=True):
+    """
+    Pin or unpin a process so its history is recorded on every sample.
+    :param pid: Process ID.
+    :param pinned: Whether the process should be pinned.
+    """
+    if pinned:
+        _tracker.pin(pid)
+    else:
+        _tracker.unpin(pid)
+
+
+def is_process_pinned(pid):
+    """
+    :param pid: Process ID.
+    :return: True if the process history is pinned.
+    """
+    return _tracker.is_pinned(pid)
+
+
 def kill_process(pid):
     """
     Kill a process by its PID.
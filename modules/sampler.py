@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class Sampler:
+    """
+    Collect system metrics on a fixed cadence in a background thread.
+    Every reader shares the latest snapshot, so collection cost stays the
+    same no matter how many dashboards are open.
+    """
+
+    def __init__(self, collect, interval=5, listeners=()):
+        """
+        :param collect: Callable returning the metrics to publish.
+        :param interval: Time in seconds between the start of two samples.
+        :param listeners: Callables invoked with (snapshot, timestamp) after
+                          every sample, e.g. to record history.
+        """
+        self.collect = collect
+        self.interval = interval
+        self.listeners = list(listeners)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self._timestamp = None
+
+    def start(self):
+        """
+        Start the sampling thread if it is not already running.
+        :return: The sampler itself.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="desert-eagle-sampler", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Ask the sampling thread to exit and wait for it.
+        :param timeout: Maximum time in seconds to wait for the thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample(self):
+        """
+        Collect one snapshot and publish it to readers.
+        :return: The freshly collected snapshot.
+        """
+        data = self.collect()
+        timestamp = time.time()
+        with self._lock:
+            self._snapshot = data
+            self._timestamp = timestamp
+        self._ready.set()
+
+        for listener in self.listeners:
+            try:
+                listener(data, timestamp)
+            except Exception as e:
+                print(f"Error in sample listener: {e}")
+        return data
+
+    def get_snapshot(self, timeout=None):
+        """
+        Get the latest published snapshot without triggering collection.
+        :param timeout: Maximum time in seconds to wait for the first sample.
+        :return: Tuple of (snapshot, timestamp), both None if nothing is ready.
+        """
+        self._ready.wait(timeout)
+        with self._lock:
+            return self._snapshot, self._timestamp
+
+    def _run(self):
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling data: {e}")
+            next_run += self.interval
+            delay = next_run - time.monotonic()
+            if delay < 0:
+                # Collection overran the cadence; skip the missed slots
+                next_run = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+
+class CollectorPool:
+    """
+    Run a set of collectors concurrently with a deadline for each one.
+    A collector that fails or misses its deadline reports its last known
+    value and is flagged as stale instead of holding up the others.
+    Each collector can have its own refresh interval, or run only on demand.
+    """
+
+    def __init__(self, collectors, timeout=2, defaults=None, timeouts=None, intervals=None):
+        """
+        :param collectors: Dictionary of name to collector callable.
+        :param timeout: Default deadline in seconds for every collector.
+        :param defaults: Dictionary of values used before a first success.
+        :param timeouts: Dictionary of per-collector deadlines in seconds.
+        :param intervals: Dictionary of per-collector refresh intervals in
+                          seconds; None means the collector only runs through
+                          refresh(). Collectors not listed run every time.
+        """
+        self.collectors = dict(collectors)
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.intervals = dict(intervals or {})
+        # Reentrant because a done callback may run while collect() holds it
+        self._lock = threading.RLock()
+        self._last = dict(defaults or {})
+        self._updated = {}
+        self._started = {}
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.collectors), thread_name_prefix="desert-eagle-collector"
+        )
+
+    def _record(self, name, future):
+        # Keep results that arrive after their deadline for the next round
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self._last[name] = future.result()
+            self._updated[name] = time.monotonic()
+
+    def _submit(self, name):
+        # Must be called with the lock held
+        future = self._pending.get(name)
+        # Never queue a collector again while it is still running
+        if future is None or future.done():
+            future = self._executor.submit(self.collectors[name])
+            future.add_done_callback(lambda f, name=name: self._record(name, f))
+            self._pending[name] = future
+            self._started[name] = time.monotonic()
+        return future
+
+    def _is_due(self, name, now):
+        interval = self.intervals.get(name, 0)
+        if interval is None:
+            return False
+        started = self._started.get(name)
+        return started is None or now - started >= interval
+
+    def _wait(self, name, future, start):
+        # Wait for a collector until its deadline, raising on failure
+        deadline = start + self.timeouts.get(name, self.timeout)
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+
+    def collect(self):
+        """
+        Run every collector that is due and wait for each one up to its
+        deadline. Collectors that are not due report their last value.
+        :return: Dictionary of name to value, plus a "stale" set naming the
+                 collectors that failed or timed out.
+        """
+        start = time.monotonic()
+        futures = {}
+        with self._lock:
+            for name in self.collectors:
+                if self._is_due(name, start):
+                    futures[name] = self._submit(name)
+
+        data = {}
+        stale = set()
+        for name, future in futures.items():
+            try:
+                data[name] = self._wait(name, future, start)
+            except FutureTimeout:
+                stale.add(name)
+            except Exception as e:
+                print(f"Error fetching {name}: {e}")
+                stale.add(name)
+
+        with self._lock:
+            for name in self.collectors:
+                if name not in data:
+                    data[name] = self._last.get(name)
+        data["stale"] = stale
+        return data
+
+    def refresh(self, name, max_age=0):
+        """
+        Run one collector now unless its last value is recent enough.
+        Concurrent callers share a single run.
+        :param name: Collector name.
+        :param max_age: Age in seconds under which the last value is reused.
+        :return: The collected value, or the last known value on failure.
+        """
+        start = time.monotonic()
+        with self._lock:
+            updated = self._updated.get(name)
+            if updated is not None and start - updated <= max_age:
+                return self._last.get(name)
+            future = self._submit(name)
+        try:
+            return self._wait(name, future, start)
+        except FutureTimeout:
+            pass
+        except Exception as e:
+            print(f"Error fetching {name}: {e}")
+        with self._lock:
+            return self._last.get(name)
+
+    def shutdown(self):
+        """
+        Stop accepting work and release the worker threads.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
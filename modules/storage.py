@@ -0,0 +1,470 @@
+import math
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote, unquote
+import numpy as np
+from modules.timeseries import (
+    MAX_POINTS,
+    ROLLUP_COLUMNS,
+    downsample,
+    query_result,
+    rollup_samples,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; assume a single writer there
+    fcntl = None
+
+
+SEGMENT_SECONDS = 60 * 60  # Each raw segment holds one hour of samples
+ROLLUP_SEGMENT_SECONDS = 24 * 60 * 60  # Each rollup segment holds one day
+ROLLUP_RESOLUTION = 60  # Raw segments are compacted into 1m buckets
+RAW_RETENTION = 24 * 60 * 60  # Raw segments older than this are compacted
+ROLLUP_RETENTION = 365 * 24 * 60 * 60  # Rollup segments older than this are dropped
+FLUSH_INTERVAL = 10  # Seconds of samples buffered in memory before a write
+
+TIMESTAMPS_FILE = "timestamps.bin"
+COLUMN_SUFFIX = ".f64"
+
+
+def _column_file(name):
+    return quote(name, safe="") + COLUMN_SUFFIX
+
+
+def _rows(path, width=1):
+    # Number of complete rows in a fixed-width float64 file
+    try:
+        return os.path.getsize(path) // (8 * width)
+    except OSError:
+        return 0
+
+
+def _read_column(path, name, start, end, width):
+    """
+    Memory-map one column of a segment and copy out the rows in a range.
+    :return: Tuple of (timestamps, values), empty if the segment has no data.
+    """
+    times_path = os.path.join(path, TIMESTAMPS_FILE)
+    column_path = os.path.join(path, _column_file(name))
+    shape = (0,) if width == 1 else (0, width)
+    rows = min(_rows(times_path), _rows(column_path, width))
+    if rows == 0:
+        return np.empty(0), np.empty(shape)
+
+    times = np.memmap(times_path, dtype=np.float64, mode="r", shape=(rows,))
+    lo = 0 if start is None else np.searchsorted(times, start, "left")
+    hi = rows if end is None else np.searchsorted(times, end, "right")
+    if lo >= hi:
+        return np.empty(0), np.empty(shape)
+
+    values = np.memmap(
+        column_path, dtype=np.float64, mode="r", shape=(rows,) if width == 1 else (rows, width)
+    )
+    # Copy the slice so the maps are released as soon as we return
+    return np.array(times[lo:hi]), np.array(values[lo:hi])
+
+
+def _segment_names(path):
+    # Metrics that have a column in a segment
+    return [
+        unquote(entry[: -len(COLUMN_SUFFIX)])
+        for entry in os.listdir(path)
+        if entry.endswith(COLUMN_SUFFIX)
+    ]
+
+
+class DiskStore:
+    """
+    Append-only metric history on disk, with no database required.
+
+    Samples are written to hourly raw segments, one fixed-width float64 file
+    per metric next to a shared timestamps file. Once older than
+    RAW_RETENTION, raw segments are compacted into daily segments of 1m
+    min/max/avg/last buckets. Reads memory-map only the segments a query
+    touches, so week-long ranges never load everything into RAM.
+    """
+
+    def __init__(
+        self,
+        path,
+        segment_seconds=SEGMENT_SECONDS,
+        flush_interval=FLUSH_INTERVAL,
+        raw_retention=RAW_RETENTION,
+        rollup_retention=ROLLUP_RETENTION,
+    ):
+        """
+        :param path: Directory holding the segments.
+        :param segment_seconds: Time span of a raw segment in seconds.
+        :param flush_interval: Seconds of samples buffered before a write.
+        :param raw_retention: Age in seconds at which raw data is compacted.
+        :param rollup_retention: Age in seconds at which rollups are dropped.
+        """
+        self.path = path
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.raw_retention = raw_retention
+        self.rollup_retention = rollup_retention
+        self._raw_path = os.path.join(path, "raw")
+        self._rollup_path = os.path.join(path, f"{ROLLUP_RESOLUTION}s")
+        os.makedirs(self._raw_path, exist_ok=True)
+        os.makedirs(self._rollup_path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # One compaction at a time
+        self._compactor = None
+        self._pending = []
+        self._segment = None  # (path, segment start, rows, metric names)
+        self._writable = None
+        self._lock_file = None
+        self._last_compaction = 0
+
+    def _acquire_writer(self):
+        # Several server workers may share a directory; only one writes
+        if self._writable is None:
+            self._lock_file = open(os.path.join(self.path, "writer.lock"), "a")
+            if fcntl is None:
+                self._writable = True
+            else:
+                try:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._writable = True
+                except OSError:
+                    self._writable = False
+        return self._writable
+
+    def record(self, timestamp, metrics):
+        """
+        Buffer one sample for several metrics and write it out once the
+        buffer covers FLUSH_INTERVAL seconds.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param metrics: Dictionary of metric name to value; None is skipped.
+        """
+        with self._lock:
+            if not self._acquire_writer():
+                return
+            self._pending.append(
+                (timestamp, {name: value for name, value in metrics.items() if value is not None})
+            )
+            if timestamp - self._pending[0][0] >= self.flush_interval:
+                self.flush()
+                if timestamp - self._last_compaction >= self.segment_seconds:
+                    self._last_compaction = timestamp
+                    self._start_compaction(timestamp)
+
+    def _start_compaction(self, now):
+        # Compaction rewrites whole segments, so it runs on its own thread
+        # instead of delaying the sample that triggered it
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self._run_compaction, args=(now,), name="desert-eagle-compaction", daemon=True
+        )
+        self._compactor.start()
+
+    def _run_compaction(self, now):
+        try:
+            self.compact(now)
+        except OSError as e:
+            print(f"Error compacting {self.path}: {e}")
+
+    def flush(self):
+        """
+        Append the buffered samples to their raw segments.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            batch = []
+            for timestamp, metrics in pending:
+                segment_start = timestamp - timestamp % self.segment_seconds
+                if batch and segment_start != batch_start:
+                    self._write_rows(batch_start, batch)
+                    batch = []
+                batch_start = segment_start
+                batch.append((timestamp, metrics))
+            if batch:
+                self._write_rows(batch_start, batch)
+
+    def _write_rows(self, segment_start, rows):
+        if self._segment is None or self._segment[1] != segment_start:
+            # Segments are named after their first sample so a restart within
+            # the hour starts a new segment instead of reopening a torn one
+            path = os.path.join(self._raw_path, f"{rows[0][0]:.3f}")
+            os.makedirs(path, exist_ok=True)
+            self._segment = (path, segment_start, 0, set())
+        path, _, count, names = self._segment
+
+        new_names = set().union(*(metrics.keys() for _, metrics in rows)) - names
+        for name in new_names:
+            # Pad a metric that first shows up mid-segment to the row count
+            with open(os.path.join(path, _column_file(name)), "ab") as f:
+                f.write(np.full(count, np.nan).tobytes())
+        names |= new_names
+
+        for name in names:
+            column = np.array([metrics.get(name, np.nan) for _, metrics in rows], dtype=np.float64)
+            with open(os.path.join(path, _column_file(name)), "ab") as f:
+                f.write(column.tobytes())
+        # The timestamps go last, so readers never see rows without values
+        with open(os.path.join(path, TIMESTAMPS_FILE), "ab") as f:
+            f.write(np.array([t for t, _ in rows], dtype=np.float64).tobytes())
+        self._segment = (path, segment_start, count + len(rows), names)
+
+    def _segments(self, root):
+        # Segment directories in chronological order as (start, path)
+        try:
+            entries = os.listdir(root)
+        except OSError:
+            return []
+        return sorted((float(entry), os.path.join(root, entry)) for entry in entries)
+
+    def _overlapping(self, root, seconds, start, end):
+        # Segments of a root holding `seconds` each that overlap a range
+        return [
+            (s, p) for s, p in self._segments(root)
+            if (end is None or s <= end) and (start is None or s + seconds > start)
+        ]
+
+    def compact(self, now=None):
+        """
+        Fold raw segments older than the raw retention into 1m rollup
+        segments and drop rollup segments older than the rollup retention.
+        :param now: Current time in seconds since the epoch.
+        """
+        now = time.time() if now is None else now
+        with self._compact_lock:
+            # The store lock is only held to pick segments and to take them
+            # out of the listing, so samples and queries go on meanwhile
+            with self._lock:
+                if not self._acquire_writer():
+                    return
+                self._last_compaction = now
+                current = self._segment[0] if self._segment else None
+                raw = [
+                    path for start, path in self._segments(self._raw_path)
+                    if path != current and start + self.segment_seconds <= now - self.raw_retention
+                ]
+                expired = [
+                    path for start, path in self._segments(self._rollup_path)
+                    if start + ROLLUP_SEGMENT_SECONDS <= now - self.rollup_retention
+                ]
+            for path in raw:
+                # Queries prefer raw segments where they begin, so the data
+                # is never read twice while it is in both places
+                self._compact_segment(path)
+                self._discard(path)
+            for path in expired:
+                self._discard(path)
+
+    def _discard(self, path):
+        # Move a segment out of the listing under the lock, so no query is
+        # reading it, then delete it without holding the lock
+        trash = os.path.join(self.path, "trash")
+        os.makedirs(trash, exist_ok=True)
+        target = os.path.join(
+            trash, f"{os.path.basename(os.path.dirname(path))}-{os.path.basename(path)}"
+        )
+        shutil.rmtree(target, ignore_errors=True)
+        with self._lock:
+            os.rename(path, target)
+        shutil.rmtree(target, ignore_errors=True)
+
+    def _compact_segment(self, path):
+        names = _segment_names(path)
+        buckets = {}
+        for name in names:
+            times, values = _read_column(path, name, None, None, 1)
+            buckets[name] = rollup_samples(times, values, ROLLUP_RESOLUTION)
+
+        # Align every metric on the union of bucket times of the segment
+        all_times = np.unique(np.concatenate([b[0] for b in buckets.values()] or [[]]))
+        if not len(all_times):
+            return
+        day = all_times[0] - all_times[0] % ROLLUP_SEGMENT_SECONDS
+        target = os.path.join(self._rollup_path, f"{day:.3f}")
+        os.makedirs(target, exist_ok=True)
+        count = _rows(os.path.join(target, TIMESTAMPS_FILE))
+
+        width = len(ROLLUP_COLUMNS)
+        for name, (times, values) in buckets.items():
+            column = np.full((len(all_times), width), np.nan)
+            column[np.searchsorted(all_times, times)] = values
+            column_path = os.path.join(target, _column_file(name))
+            existing = _rows(column_path, width)
+            with open(column_path, "ab") as f:
+                f.write(np.full((count - existing, width), np.nan).tobytes())
+                f.write(column.tobytes())
+        with open(os.path.join(target, TIMESTAMPS_FILE), "ab") as f:
+            f.write(all_times.tobytes())
+
+    def query(self, name, start=None, end=None, max_points=MAX_POINTS, closed=False):
+        """
+        Get a metric over a time range from the segments on disk.
+        :param name: Metric name.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :param max_points: Upper bound on the number of points returned.
+        :param closed: Leave out a bucket that may still receive samples.
+        :return: Dictionary with "resolution", "time" and one array per
+                 entry of ROLLUP_COLUMNS, like TimeSeriesStore.query().
+        """
+        width = len(ROLLUP_COLUMNS)
+        with self._lock:
+            raw = self._overlapping(self._raw_path, self.segment_seconds, start, end)
+            rollups = self._overlapping(self._rollup_path, ROLLUP_SEGMENT_SECONDS, start, end)
+            raw_start = raw[0][0] if raw else None
+            span_start = start if start is not None else (rollups or raw or [(0, None)])[0][0]
+            span_end = end if end is not None else time.time()
+            resolution = 1 if span_end - span_start <= max_points else ROLLUP_RESOLUTION
+
+            parts = []
+            read_rollups = False
+            for _, path in rollups:
+                times, values = _read_column(path, name, start, end, width)
+                # Raw segments take over where they begin
+                if raw_start is not None:
+                    keep = times < raw_start
+                    times, values = times[keep], values[keep]
+                read_rollups |= bool(np.any(~np.isnan(values[:, 0])))
+                parts.append((times, values))
+            for _, path in raw:
+                times, values = _read_column(path, name, start, end, 1)
+                if resolution == 1:
+                    keep = ~np.isnan(values)
+                    times, values = times[keep], np.repeat(values[keep, None], width, axis=1)
+                else:
+                    times, values = rollup_samples(times, values, resolution)
+                    if closed:
+                        keep = times + resolution <= span_end
+                        times, values = times[keep], values[keep]
+                parts.append((times, values))
+
+        if read_rollups:
+            # Compacted segments only hold 1m buckets, whatever the span
+            resolution = ROLLUP_RESOLUTION
+        if not parts:
+            return query_result(resolution, np.empty(0), np.empty((0, width)))
+        times = np.concatenate([p[0] for p in parts])
+        values = np.concatenate([p[1] for p in parts])
+        keep = ~np.isnan(values[:, 0])
+        times, values = times[keep], values[keep]
+        if len(times) > max_points:
+            resolution *= math.ceil(len(times) / max_points)
+            times, values = downsample(times, values, max_points)
+        return query_result(resolution, times, values)
+
+    def read_segments(self, match=None, start=None, end=None):
+        """
+        Read the stored samples one segment at a time, oldest first, so a
+        long range can be streamed without holding all of it in memory.
+        :param match: Callable telling whether to read a metric name, or
+                      None for every metric.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :return: Generator of (resolution, name, times, values), values
+                 having one column per entry of ROLLUP_COLUMNS; raw samples,
+                 including those still buffered, have a resolution of 0 and
+                 the same value in every column.
+        """
+        width = len(ROLLUP_COLUMNS)
+        with self._lock:
+            raw = self._overlapping(self._raw_path, self.segment_seconds, start, end)
+            rollups = self._overlapping(self._rollup_path, ROLLUP_SEGMENT_SECONDS, start, end)
+        raw_start = raw[0][0] if raw else None
+
+        for resolution, segments in ((ROLLUP_RESOLUTION, rollups), (0, raw)):
+            for _, path in segments:
+                try:
+                    names = [name for name in _segment_names(path) if match is None or match(name)]
+                    columns = [
+                        (name, _read_column(path, name, start, end, width if resolution else 1))
+                        for name in names
+                    ]
+                except OSError:
+                    # Compacted while we read; its rollup was already passed
+                    continue
+                for name, (times, values) in columns:
+                    if resolution:
+                        # Raw segments take over where they begin
+                        keep = ~np.isnan(values[:, 0])
+                        if raw_start is not None:
+                            keep &= times < raw_start
+                        times, values = times[keep], values[keep]
+                    else:
+                        keep = ~np.isnan(values)
+                        times, values = times[keep], np.repeat(values[keep, None], width, axis=1)
+                    if len(times):
+                        yield resolution, name, times, values
+
+        # Samples not flushed yet come last; taken only now so none of them
+        # can also have been read from a segment above
+        with self._lock:
+            pending = list(self._pending)
+        columns = {}
+        for timestamp, metrics in pending:
+            if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                continue
+            for name, value in metrics.items():
+                if match is None or match(name):
+                    columns.setdefault(name, []).append((timestamp, value))
+        for name, samples in columns.items():
+            times, values = np.array(samples, dtype=np.float64).T
+            yield 0, name, times, np.repeat(values[:, None], width, axis=1)
+
+    def close(self):
+        """
+        Write out buffered samples, wait for a running compaction and
+        release the writer lock.
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._writable:
+                self.flush()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+                self._writable = None
+
+
+def query_stores(memory, disk, name, start, end, max_points=MAX_POINTS, closed=False):
+    """
+    Get a metric over a time range from the in-memory history, reading only
+    the part before its first sample from disk. The disk store lags the
+    samples by up to its flush interval, so the recent end always comes
+    from memory, e.g. for a range longer than the time since a restart.
+    :param memory: TimeSeriesStore of the recent samples.
+    :param disk: DiskStore of the older samples.
+    :param name: Metric name.
+    :param start: Earliest timestamp.
+    :param end: Latest timestamp.
+    :param max_points: Upper bound on the number of points returned, shared
+                       between both stores in proportion to their spans.
+    :param closed: Leave out the rollup bucket that is still open.
+    :return: Dictionary with "resolution", "time" and one array per entry
+             of ROLLUP_COLUMNS. The resolution is the one of the in-memory
+             part, which every later point shares.
+    """
+    first = memory.first_time(name)
+    if first is None or end < first:
+        return disk.query(name, start, end, max_points, closed)
+    if first <= start:
+        return memory.query(name, start, end, max_points, closed)
+
+    span = max(end - start, 1e-9)
+    disk_points = min(max(round(max_points * (first - start) / span), 1), max_points - 1)
+    # Buckets still open at the first in-memory sample would overlap it
+    older = disk.query(name, start, first, max(disk_points, 1), closed=True)
+    keep = older["time"] < first
+    recent = memory.query(name, first, end, max(max_points - disk_points, 1), closed)
+    values = np.concatenate(
+        [
+            np.column_stack([older[column][keep] for column in ROLLUP_COLUMNS]),
+            np.column_stack([recent[column] for column in ROLLUP_COLUMNS]),
+        ]
+    ).reshape(-1, len(ROLLUP_COLUMNS))
+    times = np.concatenate([older["time"][keep], recent["time"]])
+    return query_result(recent["resolution"], times, values)
+
@@ -0,0 +1,86 @@
+import json
+import threading
+
+
+KEEPALIVE_INTERVAL = 15  # Seconds between comments that keep idle streams open
+# Each open stream holds a server thread for as long as it is connected, so
+# the number of streams must stay below the threads of a worker (see the
+# Procfile) to leave threads for callbacks and the HTTP endpoints
+MAX_CLIENTS = 24
+
+
+class SnapshotStream:
+    """
+    Broadcast every sampler snapshot to any number of clients as
+    Server-Sent Events. Each snapshot is encoded once when it is published,
+    and every client is sent the same bytes, so the server cost per sample
+    does not grow with the number of viewers.
+
+    Every client still holds a server thread, so at most max_clients are
+    streamed to at a time; the others are turned away and poll instead.
+    """
+
+    def __init__(self, encode, keepalive=KEEPALIVE_INTERVAL, max_clients=MAX_CLIENTS):
+        """
+        :param encode: Callable turning (snapshot, timestamp) into a
+                       JSON-serialisable payload.
+        :param keepalive: Seconds of silence after which a comment is sent.
+        :param max_clients: Number of clients streamed to at the same time.
+        """
+        self.encode = encode
+        self.keepalive = keepalive
+        self.max_clients = max_clients
+        self._condition = threading.Condition()
+        self._message = None
+        self._sequence = 0
+        self._clients = 0
+
+    def acquire(self):
+        """
+        Reserve a place for one more client.
+        :return: True if the client may stream, False if max_clients are
+                 already connected. Every True must be paired with release().
+        """
+        with self._condition:
+            if self._clients >= self.max_clients:
+                return False
+            self._clients += 1
+            return True
+
+    def release(self):
+        """
+        Free the place of a client that disconnected.
+        """
+        with self._condition:
+            self._clients -= 1
+
+    def publish(self, snapshot, timestamp):
+        """
+        Encode a snapshot and wake every connected client. Meant to be used
+        as a sampler listener.
+        :param snapshot: Dictionary returned by the sampler.
+        :param timestamp: Sample time in seconds since the epoch.
+        """
+        data = json.dumps(self.encode(snapshot, timestamp), separators=(",", ":"))
+        with self._condition:
+            self._sequence += 1
+            self._message = f"id: {self._sequence}\ndata: {data}\n\n".encode()
+            self._condition.notify_all()
+
+    def events(self):
+        """
+        Yield the encoded events for one client, starting with the latest
+        snapshot. Clients that fall behind skip straight to the newest one.
+        """
+        sent = 0
+        while True:
+            with self._condition:
+                fresh = self._condition.wait_for(
+                    lambda: self._sequence != sent, timeout=self.keepalive
+                )
+                message, sequence = self._message, self._sequence
+            if not fresh or message is None:
+                yield b": keepalive\n\n"
+                continue
+            sent = sequence
+            yield message
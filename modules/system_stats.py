@@ -1,26 +1,151 @@
+import select
+import threading
+import time
 import psutil as ps
 
 
+# Seconds a delta reading must span. The meters take their first sample at
+# import, so a reading right after it would cover a few jiffies of noise;
+# such readings report None and keep the older baseline instead.
+MIN_INTERVAL = 0.5
+
+
+def _cpu_total_time(times):
+    """
+    Sum all CPU times, leaving out guest time which Linux already counts
+    in user and nice.
+    """
+    total = sum(times)
+    total -= getattr(times, "guest", 0)
+    total -= getattr(times, "guest_nice", 0)
+    return total
+
+
+def _cpu_busy_time(times):
+    return _cpu_total_time(times) - times.idle - getattr(times, "iowait", 0)
+
+
+class CpuUsageMeter:
+    """
+    Compute CPU usage from the delta between two cpu_times samples, so a
+    reading returns instantly instead of sleeping for a measuring interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.cpu_times()
+        self._last_time = time.monotonic()
+
+    def read(self):
+        """
+        Get the CPU usage since the previous reading.
+        :return: CPU usage as a percentage, or None if the previous reading
+                 is less than MIN_INTERVAL old.
+        """
+        times = ps.cpu_times()
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return None
+            last, self._last = self._last, times
+            self._last_time = now
+
+        total = _cpu_total_time(times) - _cpu_total_time(last)
+        busy = _cpu_busy_time(times) - _cpu_busy_time(last)
+        if total <= 0:
+            return 0.0
+        return round(min(max(busy / total * 100, 0.0), 100.0), 1)
+
+
+_cpu_meter = CpuUsageMeter()
+
+
 def get_cpu_usage():
     """
-    Get the percentage of CPU usage.
-    :return: CPU usage as a percentage.
+    Get the percentage of CPU usage since the previous call.
+    :return: CPU usage as a percentage, or None right after the previous
+             call.
     """
-    return ps.cpu_percent(interval=1)
+    return _cpu_meter.read()
+
+
+# Breakdown of CPU time reported per core, as (name, cpu_times fields)
+CPU_TIME_BREAKDOWN = (
+    ("user", ("user", "nice")),
+    ("system", ("system",)),
+    ("iowait", ("iowait",)),
+    ("steal", ("steal",)),
+    ("irq", ("irq", "softirq")),
+)
+
+
+def _percent(part, total):
+    if total <= 0:
+        return 0.0
+    return round(min(max(part / total * 100, 0.0), 100.0), 1)
+
+
+class PerCpuUsageMeter:
+    """
+    Compute the usage of every core, and how its time splits between user,
+    system, iowait, steal and interrupt handling, from the delta between two
+    cpu_times samples. Fields a platform does not report count as zero.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.cpu_times(percpu=True)
+        self._last_time = time.monotonic()
+
+    def read(self):
+        """
+        Get the per-core usage since the previous reading.
+        :return: List with one dictionary per core holding "percent" and one
+                 percentage per entry of CPU_TIME_BREAKDOWN, or None if the
+                 previous reading is less than MIN_INTERVAL old.
+        """
+        times = ps.cpu_times(percpu=True)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return None
+            last, self._last = self._last, times
+            self._last_time = now
+
+        cores = []
+        for current, previous in zip(times, last):
+            total = _cpu_total_time(current) - _cpu_total_time(previous)
+            busy = _cpu_busy_time(current) - _cpu_busy_time(previous)
+            core = {"percent": _percent(busy, total)}
+            for name, fields in CPU_TIME_BREAKDOWN:
+                spent = sum(
+                    getattr(current, field, 0) - getattr(previous, field, 0) for field in fields
+                )
+                core[name] = _percent(spent, total)
+            cores.append(core)
+        return cores
+
+
+_per_cpu_meter = PerCpuUsageMeter()
 
 
 def get_per_cpu_usage():
     """
-    Get CPU usage per core.
-    :return: List of CPU usage percentages for each core.
+    Get the usage of each core since the previous call, without blocking.
+    :return: List with one dictionary per core holding its usage "percent"
+             and its user, system, iowait, steal and irq percentages, or
+             None right after the previous call.
     """
-    return ps.cpu_percent(interval=1, percpu=True)
+    return _per_cpu_meter.read()
 
 
 def get_memory_usage():
     """
-    Get memory usage details.
-    :return: Dictionary with total, used, and percentage of memory usage.
+    Get memory usage details. Cached and buffer memory is reclaimable, so
+    "available" rather than "free" tells how much memory is left.
+    :return: Dictionary with total, used, free, available, cached, buffers
+             and slab bytes, and the percentage of memory usage. Fields a
+             platform does not report are 0.
     """
 
     memory = ps.virtual_memory()
@@ -29,22 +154,93 @@ def get_memory_usage():
         "free": memory.free,
         "total": memory.total,
         "percent": memory.percent,
+        "available": memory.available,
+        "cached": getattr(memory, "cached", 0),
+        "buffers": getattr(memory, "buffers", 0),
+        "slab": getattr(memory, "slab", 0),
     }
 
 
+class SwapMeter:
+    """
+    Read swap usage along with the swap in/out rates computed from the
+    delta between two samples of the cumulative swap counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.swap_memory()
+        self._last_time = time.monotonic()
+
+    def read(self):
+        """
+        Get the swap usage and the swap activity since the previous reading.
+        :return: Dictionary with total, used, and percentage of swap usage,
+                 and "swap_in" and "swap_out" in bytes/sec, both None if the
+                 previous reading is less than MIN_INTERVAL old.
+        """
+        swap = ps.swap_memory()
+        now = time.monotonic()
+        usage = {
+            "used": swap.used,
+            "free": swap.free,
+            "total": swap.total,
+            "percent": swap.percent,
+            "swap_in": None,
+            "swap_out": None,
+        }
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return usage
+            last, self._last = self._last, swap
+            elapsed, self._last_time = now - self._last_time, now
+
+        usage["swap_in"] = max(swap.sin - last.sin, 0) / elapsed
+        usage["swap_out"] = max(swap.sout - last.sout, 0) / elapsed
+        return usage
+
+
+_swap_meter = SwapMeter()
+
+
 def get_swap_usage():
     """
-    Get swap memory usage details.
-    :return: Dictionary with total, used, and percentage of swap usage.
+    Get swap memory usage details and swap activity since the previous call.
+    :return: Dictionary with total, used, and percentage of swap usage, and
+             the swap in/out rates in bytes/sec.
     """
+    return _swap_meter.read()
 
-    swap = ps.swap_memory()
-    return {
-        "used": swap.used,
-        "free": swap.free,
-        "total": swap.total,
-        "percent": swap.percent,
-    }
+
+PRESSURE_PATH = "/proc/pressure"
+PRESSURE_RESOURCES = ("cpu", "memory", "io")
+
+
+def get_pressure(path=PRESSURE_PATH):
+    """
+    Get the Linux pressure stall information (PSI): the share of time some
+    or all runnable tasks were stalled waiting for CPU, memory or IO.
+    :param path: Directory holding the PSI files.
+    :return: Dictionary of resource to {"some": ..., "full": ...}, each a
+             dictionary of "avg10", "avg60" and "avg300" percentages. Empty
+             where PSI is not available.
+    """
+    pressure = {}
+    for resource in PRESSURE_RESOURCES:
+        try:
+            with open(f"{path}/{resource}") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue  # Not Linux, or a kernel without PSI
+        stalls = {}
+        for line in lines:
+            kind, *fields = line.split()
+            values = dict(field.split("=", 1) for field in fields)
+            stalls[kind] = {
+                window: float(values[window]) for window in ("avg10", "avg60", "avg300")
+            }
+        pressure[resource] = stalls
+    return pressure
 
 
 def get_disk_usage(partition="/"):
@@ -73,6 +269,154 @@ def get_disk_io_stats():
     return {"read_bytes": disk_io.read_bytes, "write_bytes": disk_io.write_bytes}
 
 
+MOUNT_TABLE = "/proc/self/mounts"
+PARTITION_REFRESH_INTERVAL = 60  # Seconds between re-enumerations without mount events
+
+
+class PartitionCache:
+    """
+    Keep the list of mounted partitions between readings and enumerate it
+    again only when the mount table changes. On Linux the kernel flags
+    /proc/self/mounts as readable-with-priority on every mount or unmount,
+    so checking for a change is a single non-blocking poll; elsewhere the
+    list is refreshed every PARTITION_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, mount_table=MOUNT_TABLE, refresh_interval=PARTITION_REFRESH_INTERVAL):
+        """
+        :param mount_table: File whose changes signal a mount or unmount.
+        :param refresh_interval: Seconds between refreshes without poll().
+        """
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._partitions = None
+        self._enumerated = 0
+        self._poll = None
+        try:
+            self._mounts = open(mount_table)
+            self._mounts.read()  # Reading arms the change notification
+            self._poll = select.poll()
+            self._poll.register(self._mounts, select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            self._mounts = None
+
+    def _changed(self):
+        if self._poll is None:
+            return time.monotonic() - self._enumerated >= self.refresh_interval
+        if not self._poll.poll(0):
+            return False
+        self._mounts.seek(0)
+        self._mounts.read()
+        return True
+
+    def get(self):
+        """
+        :return: List of psutil partitions, enumerated again only after the
+                 mount table changed.
+        """
+        with self._lock:
+            if self._partitions is None or self._changed():
+                self._partitions = ps.disk_partitions(all=False)
+                self._enumerated = time.monotonic()
+            return self._partitions
+
+
+_partitions = PartitionCache()
+
+
+def get_partition_usage():
+    """
+    Get disk usage details for every mounted partition.
+    :return: List of dictionaries with the device, mount point, file system
+             type, and used, free, total and percentage of disk usage.
+    """
+    partitions = []
+    for partition in _partitions.get():
+        try:
+            disk = ps.disk_usage(partition.mountpoint)
+        except OSError:
+            continue  # Unmounted since the enumeration, or not accessible
+        partitions.append(
+            {
+                "device": partition.device,
+                "mountpoint": partition.mountpoint,
+                "fstype": partition.fstype,
+                "used": disk.used,
+                "free": disk.free,
+                "total": disk.total,
+                "percent": disk.percent,
+            }
+        )
+    return partitions
+
+
+class DiskIoMeter:
+    """
+    Compute per-device disk rates from the delta between two samples of the
+    per-disk counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = ps.disk_io_counters(perdisk=True) or {}
+        self._last_time = time.monotonic()
+
+    def read(self):
+        """
+        Get the rates of every disk since the previous reading.
+        :return: Dictionary of device name to a dictionary with "read_bps"
+                 and "write_bps" in bytes/sec, "read_iops" and "write_iops",
+                 "read_latency" and "write_latency" as the average time per
+                 completed request in milliseconds, and "busy_percent" where
+                 the platform reports busy time; None if the previous
+                 reading is less than MIN_INTERVAL old.
+        """
+        counters = ps.disk_io_counters(perdisk=True) or {}
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < MIN_INTERVAL:
+                return None
+            last, self._last = self._last, counters
+            elapsed, self._last_time = now - self._last_time, now
+
+        rates = {}
+        for name, io in counters.items():
+            prev = last.get(name)
+            if prev is None:
+                continue
+            reads = max(io.read_count - prev.read_count, 0)
+            writes = max(io.write_count - prev.write_count, 0)
+            disk = {
+                "read_bps": max(io.read_bytes - prev.read_bytes, 0) / elapsed,
+                "write_bps": max(io.write_bytes - prev.write_bytes, 0) / elapsed,
+                "read_iops": reads / elapsed,
+                "write_iops": writes / elapsed,
+                # Time spent on requests divided by the requests completed
+                "read_latency": max(io.read_time - prev.read_time, 0) / reads if reads else 0.0,
+                "write_latency": (
+                    max(io.write_time - prev.write_time, 0) / writes if writes else 0.0
+                ),
+            }
+            if hasattr(io, "busy_time"):
+                busy = max(io.busy_time - prev.busy_time, 0) / 1000
+                disk["busy_percent"] = min(busy / elapsed * 100, 100.0)
+            rates[name] = disk
+        return rates
+
+
+_disk_io_meter = DiskIoMeter()
+
+
+def get_disk_io_rates():
+    """
+    Calculate the throughput, IOPS and latency of every disk since the
+    previous call.
+    :return: Dictionary of device name to its rates, or None right after
+             the previous call.
+    """
+    return _disk_io_meter.read()
+
+
 # if __name__ == "__main__":
 #     # Test the functions
 #     print("CPU Usage:", get_cpu_usage(), "%")
@@ -0,0 +1,491 @@
+import fnmatch
+import math
+import threading
+import numpy as np
+
+
+HISTORY_SECONDS = 24 * 60 * 60  # Keep a day of history at 1s resolution
+INITIAL_CAPACITY = 1024  # Buffers grow up to their capacity as samples arrive
+MAX_POINTS = 2000  # Default upper bound on the points returned by a query
+
+# Rollup tiers as (bucket size in seconds, number of buckets kept). They
+# span the same day as the raw samples, so charts of up to a day are drawn
+# from a few thousand buckets; older history is read from the disk store.
+ROLLUP_TIERS = (
+    (10, 24 * 60 * 6),  # 10s buckets for a day
+    (60, 24 * 60),  # 1m buckets for a day
+)
+ROLLUP_COLUMNS = ("min", "max", "avg", "last")
+EVICT_INTERVAL = 10 * 60  # Seconds of samples between two sweeps for idle metrics
+
+
+class RingBuffer:
+    """
+    Fixed-capacity time series backed by two NumPy arrays, one for the
+    timestamps and one for the values. Appending is O(1) and once full the
+    oldest sample is overwritten.
+    """
+
+    def __init__(self, capacity=HISTORY_SECONDS, width=1):
+        """
+        :param capacity: Maximum number of samples kept.
+        :param width: Number of values stored with each timestamp.
+        """
+        self.capacity = capacity
+        self.width = width
+        size = min(capacity, INITIAL_CAPACITY)
+        self._times = np.empty(size, dtype=np.float64)
+        self._values = np.empty(self._shape(size), dtype=np.float64)
+        self._head = 0  # Index of the next write
+        self._count = 0
+
+    def _shape(self, size):
+        return (size,) if self.width == 1 else (size, self.width)
+
+    def __len__(self):
+        return self._count
+
+    def _grow(self):
+        size = min(len(self._times) * 2, self.capacity)
+        times = np.empty(size, dtype=np.float64)
+        values = np.empty(self._shape(size), dtype=np.float64)
+        times[: self._count] = self._times
+        values[: self._count] = self._values
+        self._times, self._values = times, values
+        # Growth only happens before the first wrap, so samples are in order
+        self._head = self._count
+
+    def append(self, timestamp, value):
+        """
+        Add a sample, dropping the oldest one when the buffer is full.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param value: Sample value, or a sequence of `width` values.
+        """
+        if self._count == len(self._times) and self._count < self.capacity:
+            self._grow()
+        self._times[self._head] = timestamp
+        self._values[self._head] = value
+        self._head = (self._head + 1) % len(self._times)
+        self._count = min(self._count + 1, len(self._times))
+
+    def _segments(self):
+        # The samples in chronological order as at most two contiguous slices
+        if self._count < len(self._times):
+            return [slice(0, self._count)]
+        return [slice(self._head, len(self._times)), slice(0, self._head)]
+
+    def window(self, start=None, end=None):
+        """
+        Get the samples between two timestamps, both bounds included.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :return: Tuple of (timestamps, values) NumPy arrays.
+        """
+        times = []
+        values = []
+        for segment in self._segments():
+            seg_times = self._times[segment]
+            lo = 0 if start is None else np.searchsorted(seg_times, start, "left")
+            hi = len(seg_times) if end is None else np.searchsorted(seg_times, end, "right")
+            if lo < hi:
+                times.append(seg_times[lo:hi])
+                values.append(self._values[segment][lo:hi])
+
+        if not times:
+            return np.empty(0), np.empty(self._shape(0))
+        return np.concatenate(times), np.concatenate(values)
+
+    def first_time(self):
+        """
+        :return: Timestamp of the oldest sample, or None if the buffer is empty.
+        """
+        if self._count == 0:
+            return None
+        return float(self._times[self._segments()[0].start])
+
+    def last(self):
+        """
+        Get the newest sample.
+        :return: Tuple of (timestamp, value), or None if the buffer is empty.
+        """
+        if self._count == 0:
+            return None
+        index = self._head - 1
+        value = self._values[index]
+        return float(self._times[index]), (float(value) if self.width == 1 else value.copy())
+
+
+class Rollup:
+    """
+    Aggregate samples into fixed-size time buckets keeping the min, max,
+    average and last value of each bucket.
+    """
+
+    def __init__(self, resolution, capacity):
+        """
+        :param resolution: Bucket size in seconds.
+        :param capacity: Number of completed buckets kept.
+        """
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity, width=len(ROLLUP_COLUMNS))
+        self._bucket = None
+        self._min = self._max = self._sum = self._last = 0.0
+        self._count = 0
+
+    def add(self, timestamp, value):
+        """
+        Fold a sample into its bucket, closing the previous bucket if needed.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param value: Sample value.
+        """
+        bucket = timestamp - timestamp % self.resolution
+        if bucket != self._bucket:
+            self._flush()
+            self._bucket = bucket
+            self._min = self._max = value
+            self._sum = 0.0
+            self._count = 0
+        else:
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+        self._sum += value
+        self._last = value
+        self._count += 1
+
+    def _flush(self):
+        if self._count:
+            self.buffer.append(self._bucket, self.pending())
+
+    def first_time(self):
+        """
+        :return: Start of the oldest bucket, or None if nothing was added.
+        """
+        first = self.buffer.first_time()
+        return self._bucket if first is None else first
+
+    def pending(self):
+        """
+        :return: The still open bucket as [min, max, avg, last], or None.
+        """
+        if not self._count:
+            return None
+        return [self._min, self._max, self._sum / self._count, self._last]
+
+    def window(self, start=None, end=None, closed=False):
+        """
+        Get the buckets between two timestamps.
+        :param closed: Leave out the bucket that is still open.
+        :return: Tuple of (bucket start times, values with one column per
+                 entry of ROLLUP_COLUMNS).
+        """
+        times, values = self.buffer.window(start, end)
+        if (
+            not closed
+            and self._count
+            and (start is None or self._bucket + self.resolution > start)
+            and (end is None or self._bucket <= end)
+        ):
+            times = np.append(times, self._bucket)
+            values = np.vstack([values, self.pending()])
+        return times, values
+
+
+def downsample(times, values, max_points):
+    """
+    Merge neighbouring buckets so at most max_points remain.
+    :param times: Bucket start times.
+    :param values: Array with one column per entry of ROLLUP_COLUMNS.
+    :param max_points: Maximum number of buckets to keep.
+    :return: Tuple of (bucket start times, values).
+    """
+    step = math.ceil(len(times) / max_points)
+    starts = np.arange(0, len(times), step)
+    ends = np.minimum(starts + step, len(times)) - 1
+    merged = np.column_stack(
+        [
+            np.minimum.reduceat(values[:, 0], starts),
+            np.maximum.reduceat(values[:, 1], starts),
+            np.add.reduceat(values[:, 2], starts) / (ends - starts + 1),
+            values[ends, 3],
+        ]
+    )
+    return times[starts], merged
+
+
+def rollup_samples(times, values, resolution):
+    """
+    Aggregate raw samples into buckets of a fixed size.
+    :param times: Sorted sample times.
+    :param values: Sample values; NaN samples are ignored.
+    :param resolution: Bucket size in seconds.
+    :return: Tuple of (bucket start times, values with one column per
+             entry of ROLLUP_COLUMNS).
+    """
+    keep = ~np.isnan(values)
+    times, values = times[keep], values[keep]
+    if not len(times):
+        return np.empty(0), np.empty((0, len(ROLLUP_COLUMNS)))
+
+    buckets = times - times % resolution
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.append(starts[1:], len(times))
+    aggregated = np.column_stack(
+        [
+            np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts),
+            np.add.reduceat(values, starts) / (ends - starts),
+            values[ends - 1],
+        ]
+    )
+    return buckets[starts], aggregated
+
+
+def query_result(resolution, times, values):
+    """
+    Build the result of a history query.
+    :param resolution: Bucket size in seconds of the returned points.
+    :param times: Bucket start times.
+    :param values: Array with one column per entry of ROLLUP_COLUMNS.
+    :return: Dictionary with "resolution", "time" and one array per
+             entry of ROLLUP_COLUMNS.
+    """
+    result = {"resolution": resolution, "time": times}
+    result.update({column: values[:, i] for i, column in enumerate(ROLLUP_COLUMNS)})
+    return result
+
+
+class MetricSeries:
+    """
+    History of one metric: raw samples plus a rollup per tier, so a query
+    over any time span can be answered from a bounded number of points.
+    """
+
+    def __init__(self, capacity=HISTORY_SECONDS, tiers=ROLLUP_TIERS):
+        """
+        :param capacity: Number of raw samples kept.
+        :param tiers: Sequence of (bucket size, bucket count) from fine to coarse.
+        """
+        self.raw = RingBuffer(capacity)
+        self.rollups = [Rollup(resolution, count) for resolution, count in tiers]
+        self.started = None  # Timestamp of the first sample ever added
+        self.updated = None  # Timestamp of the newest sample
+        # Seconds the history reaches back, counting raw samples as 1s apart
+        self.retention = max([capacity] + [resolution * count for resolution, count in tiers])
+
+    def __len__(self):
+        return len(self.raw)
+
+    def append(self, timestamp, value):
+        if self.started is None:
+            self.started = timestamp
+        self.updated = timestamp
+        self.raw.append(timestamp, value)
+        for rollup in self.rollups:
+            rollup.add(timestamp, value)
+
+    def window(self, start=None, end=None):
+        return self.raw.window(start, end)
+
+    def last(self):
+        return self.raw.last()
+
+    def first_time(self):
+        """
+        :return: Timestamp of the oldest sample still covered by the raw
+                 samples or a rollup tier, or None if there is none.
+        """
+        firsts = [self.raw.first_time()] + [rollup.first_time() for rollup in self.rollups]
+        firsts = [first for first in firsts if first is not None]
+        if not firsts:
+            return None
+        return max(min(firsts), self.started)
+
+    def query(self, start=None, end=None, max_points=MAX_POINTS, closed=False):
+        """
+        Get the metric over a time range at the finest resolution whose
+        point count fits in max_points and whose retention covers the range.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :param max_points: Upper bound on the number of points returned.
+        :param closed: Leave out the rollup bucket that is still open, so
+                       every point returned is final.
+        :return: Dictionary with "resolution", "time" and one array per
+                 entry of ROLLUP_COLUMNS.
+        """
+        newest = self.raw.last()
+        if newest is None:
+            return query_result(1, np.empty(0), np.empty((0, len(ROLLUP_COLUMNS))))
+
+        span_end = newest[0] if end is None else end
+        span_start = self.raw.first_time() if start is None else start
+        span = max(span_end - span_start, 0)
+
+        # Raw samples have no fixed period, so estimate it from the buffer
+        raw_oldest = self.raw.first_time()
+        raw_period = max((newest[0] - raw_oldest) / max(len(self.raw) - 1, 1), 1e-9)
+        candidates = [(raw_period, None)] + [(r.resolution, r) for r in self.rollups]
+        coarsest = candidates[-1]
+
+        # A tier covers the range if it reaches back to its start, or to the
+        # first sample ever taken when the range starts before it
+        covered_from = max(span_start, self.started)
+        source = coarsest
+        for resolution, rollup in candidates:
+            oldest = raw_oldest if rollup is None else rollup.first_time()
+            covers = oldest <= covered_from
+            if span / resolution <= max_points and (covers or rollup is coarsest[1]):
+                source = (resolution, rollup)
+                break
+
+        resolution, rollup = source
+        if rollup is None:
+            times, values = self.raw.window(start, end)
+            values = np.repeat(values[:, None], len(ROLLUP_COLUMNS), axis=1)
+        else:
+            times, values = rollup.window(start, end, closed)
+        if len(times) > max_points:
+            resolution *= math.ceil(len(times) / max_points)
+            times, values = downsample(times, values, max_points)
+        return query_result(resolution, times, values)
+
+
+class TimeSeriesStore:
+    """
+    Thread-safe collection of metric histories, one per metric name.
+    """
+
+    def __init__(self, capacity=HISTORY_SECONDS, tiers=ROLLUP_TIERS):
+        """
+        :param capacity: Default number of samples kept for each metric.
+        :param tiers: Rollup tiers of every metric, as (bucket size, bucket
+                      count) from fine to coarse.
+        """
+        self.capacity = capacity
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._series = {}
+        self._capacities = {}
+        self._retentions = []
+        self._swept = None
+
+    def set_capacity(self, name, capacity):
+        """
+        Override the capacity of a metric before its first sample.
+        :param name: Metric name.
+        :param capacity: Number of samples kept for this metric.
+        """
+        with self._lock:
+            self._capacities[name] = capacity
+
+    def set_retention(self, pattern, capacity, tiers):
+        """
+        Override the capacity and rollup tiers of the metrics matching a
+        pattern before their first sample, e.g. to keep little in memory
+        for per-device metrics whose longer history is read from disk.
+        :param pattern: Shell-style pattern of metric names.
+        :param capacity: Number of samples kept for these metrics.
+        :param tiers: Rollup tiers of these metrics.
+        """
+        with self._lock:
+            self._retentions.append((pattern, capacity, tiers))
+
+    def append(self, name, timestamp, value):
+        """
+        Add a sample to a metric, creating its buffer on first use.
+        :param name: Metric name.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param value: Sample value.
+        """
+        with self._lock:
+            self._append(name, timestamp, value)
+
+    def _append(self, name, timestamp, value):
+        series = self._series.get(name)
+        if series is None:
+            capacity, tiers = self._capacities.get(name, self.capacity), self.tiers
+            for pattern, pattern_capacity, pattern_tiers in self._retentions:
+                if fnmatch.fnmatchcase(name, pattern):
+                    capacity, tiers = pattern_capacity, pattern_tiers
+                    break
+            series = self._series[name] = MetricSeries(capacity, tiers)
+        series.append(timestamp, value)
+
+    def _sweep(self, now):
+        # Drop the metrics not written for longer than they are kept, e.g.
+        # of network interfaces or disks that went away
+        self._swept = now
+        for name in [
+            name for name, series in self._series.items() if now - series.updated > series.retention
+        ]:
+            del self._series[name]
+
+    def record(self, timestamp, metrics):
+        """
+        Add one sample for several metrics taken at the same time.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param metrics: Dictionary of metric name to value; None is skipped.
+        """
+        with self._lock:
+            for name, value in metrics.items():
+                if value is not None:
+                    self._append(name, timestamp, value)
+            if self._swept is None or timestamp - self._swept >= EVICT_INTERVAL:
+                self._sweep(timestamp)
+
+    def window(self, name, start=None, end=None):
+        """
+        Get the samples of a metric between two timestamps.
+        :param name: Metric name.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :return: Tuple of (timestamps, values) NumPy arrays.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                return np.empty(0), np.empty(0)
+            return series.window(start, end)
+
+    def query(self, name, start=None, end=None, max_points=MAX_POINTS, closed=False):
+        """
+        Get a metric over a time range from the best fitting rollup tier.
+        :param name: Metric name.
+        :param start: Earliest timestamp, or None for the oldest sample.
+        :param end: Latest timestamp, or None for the newest sample.
+        :param max_points: Upper bound on the number of points returned.
+        :param closed: Leave out the rollup bucket that is still open.
+        :return: Dictionary with "resolution", "time" and one array per
+                 entry of ROLLUP_COLUMNS.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = MetricSeries(0, tiers=())
+            return series.query(start, end, max_points, closed)
+
+    def first_time(self, name):
+        """
+        :param name: Metric name.
+        :return: Timestamp of the oldest sample of a metric still held in
+                 memory, or None.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            return series.first_time() if series is not None else None
+
+    def last(self, name):
+        """
+        Get the newest sample of a metric.
+        :param name: Metric name.
+        :return: Tuple of (timestamp, value), or None if there is none.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            return series.last() if series is not None else None
+
+    def metrics(self):
+        """
+        :return: Sorted list of the metric names in the store.
+        """
+        with self._lock:
+            return sorted(self._series)
@@ -0,0 +1,237 @@
+import math
+import struct
+
+
+# Every frame starts with the magic, the format version, the frame type and
+# the length of the payload that follows
+FRAME_HEADER = struct.Struct("!2sBBI")
+MAGIC = b"DE"
+VERSION = 1
+MAX_PAYLOAD = 16 * 1024 * 1024  # Larger frames mean a corrupt stream
+# Metric names one connection may introduce, bounding what a single agent
+# adds to the history; a host reports a few hundred
+MAX_NAMES = 4096
+
+FRAME_HELLO = 1  # Payload: host name in UTF-8
+FRAME_NAMES = 2  # Payload: metric names introduced before their first use
+FRAME_SNAPSHOT = 3  # Payload: the metrics that changed since the previous one
+
+# Snapshot values are either a zigzag varint delta from the previous value
+# when both are integers, or a raw IEEE 754 double
+VALUE_DOUBLE = struct.Struct("!d")
+MAX_EXACT_INT = 2 ** 53  # Largest integer a double holds exactly
+
+
+class WireError(Exception):
+    """
+    Raised when a stream does not follow the wire format.
+    """
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise WireError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _as_int(value):
+    # The value as an int if it is an exactly representable integer
+    if isinstance(value, int):
+        return value if abs(value) < MAX_EXACT_INT else None
+    if value.is_integer() and abs(value) < MAX_EXACT_INT:
+        return int(value)
+    return None
+
+
+def _frame(frame_type, payload):
+    return FRAME_HEADER.pack(MAGIC, VERSION, frame_type, len(payload)) + bytes(payload)
+
+
+class SnapshotEncoder:
+    """
+    Encode the metric snapshots of one host for one connection.
+
+    Metric names are sent once and then referred to by number. A snapshot
+    only carries the metrics whose value changed since the previous one,
+    and integer counters such as byte totals are sent as the difference
+    from their previous value, so a steady host costs a few bytes per
+    metric that moves. A new connection needs a new encoder.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = {}
+        self._time = 0
+
+    def hello(self, host):
+        """
+        :param host: Name the dashboard files this host's metrics under.
+        :return: Bytes of the frame opening a connection.
+        """
+        return _frame(FRAME_HELLO, host.encode())
+
+    def encode(self, timestamp, metrics):
+        """
+        Encode one snapshot.
+        :param timestamp: Sample time in seconds since the epoch.
+        :param metrics: Dictionary of metric name to value; None, and
+                        metrics missing since the previous snapshot, are
+                        sent as removed.
+        :return: Bytes of the frames to send.
+        """
+        frames = b""
+        metrics = {name: value for name, value in metrics.items() if value is not None}
+
+        new = [name for name in metrics if name not in self._ids]
+        if new:
+            payload = bytearray()
+            _write_varint(payload, len(new))
+            for name in new:
+                self._ids[name] = len(self._ids)
+                encoded = name.encode()
+                _write_varint(payload, len(encoded))
+                payload += encoded
+            frames += _frame(FRAME_NAMES, payload)
+
+        changes = []
+        for name, value in metrics.items():
+            previous = self._values.get(name)
+            if previous is None or previous != value:
+                changes.append((self._ids[name], value, previous))
+                self._values[name] = value
+        for name in self._values.keys() - metrics.keys():
+            changes.append((self._ids[name], math.nan, None))
+            del self._values[name]
+        changes.sort(key=lambda change: change[0])
+
+        milliseconds = round(timestamp * 1000)
+        payload = bytearray()
+        _write_varint(payload, _zigzag(milliseconds - self._time))
+        self._time = milliseconds
+        _write_varint(payload, len(changes))
+        last_id = -1
+        for metric_id, value, previous in changes:
+            current = _as_int(value) if not math.isnan(value) else None
+            base = _as_int(previous) if previous is not None else None
+            is_delta = current is not None and base is not None
+            # The id gap and the value encoding share one varint
+            _write_varint(payload, (metric_id - last_id - 1) << 1 | is_delta)
+            last_id = metric_id
+            if is_delta:
+                _write_varint(payload, _zigzag(current - base))
+            else:
+                payload += VALUE_DOUBLE.pack(value)
+        return frames + _frame(FRAME_SNAPSHOT, payload)
+
+
+class SnapshotDecoder:
+    """
+    Decode the frames sent by one SnapshotEncoder back into full snapshots.
+    """
+
+    def __init__(self, max_names=MAX_NAMES):
+        """
+        :param max_names: Metric names the stream may introduce.
+        """
+        self.max_names = max_names
+        self.host = None
+        self._buffer = bytearray()
+        self._names = []
+        self._values = {}
+        self._time = 0
+
+    def feed(self, data):
+        """
+        Add received bytes and decode every complete frame.
+        :param data: Bytes read from the connection.
+        :return: List of (host, timestamp, metrics) for every snapshot
+                 completed, with every metric the host currently reports.
+        :raise WireError: If the stream is not in the wire format.
+        """
+        self._buffer += data
+        snapshots = []
+        while len(self._buffer) >= FRAME_HEADER.size:
+            magic, version, frame_type, length = FRAME_HEADER.unpack_from(self._buffer)
+            if magic != MAGIC or version != VERSION:
+                raise WireError("Not a Desert Eagle agent stream")
+            if length > MAX_PAYLOAD:
+                raise WireError(f"Frame of {length} bytes is too large")
+            end = FRAME_HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            payload = bytes(self._buffer[FRAME_HEADER.size : end])
+            del self._buffer[:end]
+
+            if frame_type == FRAME_HELLO:
+                host = payload.decode()
+                if self.host is not None and host != self.host:
+                    raise WireError(f"Host changed from {self.host!r} to {host!r}")
+                self.host = host
+            elif frame_type == FRAME_NAMES:
+                self._read_names(payload)
+            elif frame_type == FRAME_SNAPSHOT:
+                if self.host is None:
+                    raise WireError("Snapshot before hello")
+                snapshots.append((self.host,) + self._read_snapshot(payload))
+            else:
+                raise WireError(f"Unknown frame type {frame_type}")
+        return snapshots
+
+    def _read_names(self, payload):
+        count, offset = _read_varint(payload, 0)
+        if len(self._names) + count > self.max_names:
+            raise WireError(f"More than {self.max_names} metric names")
+        for _ in range(count):
+            length, offset = _read_varint(payload, offset)
+            self._names.append(payload[offset : offset + length].decode())
+            offset += length
+
+    def _read_snapshot(self, payload):
+        delta, offset = _read_varint(payload, 0)
+        self._time += _unzigzag(delta)
+        count, offset = _read_varint(payload, offset)
+        metric_id = -1
+        for _ in range(count):
+            tag, offset = _read_varint(payload, offset)
+            metric_id += (tag >> 1) + 1
+            if metric_id >= len(self._names):
+                raise WireError(f"Unknown metric {metric_id}")
+            name = self._names[metric_id]
+            if tag & 1:
+                change, offset = _read_varint(payload, offset)
+                if name not in self._values:
+                    raise WireError("Delta for unknown value")
+                self._values[name] = int(self._values[name]) + _unzigzag(change)
+                continue
+            if offset + VALUE_DOUBLE.size > len(payload):
+                raise WireError("Truncated value")
+            (value,) = VALUE_DOUBLE.unpack_from(payload, offset)
+            offset += VALUE_DOUBLE.size
+            if math.isnan(value):
+                self._values.pop(name, None)
+            else:
+                self._values[name] = value
+        return self._time / 1000, dict(self._values)
@@ -10,17 +10,10 @@ if __name__ == '__main__':
     start_time = time.perf_counter()  # Start the timer
 
     # Your code block
-    (
-        device,
-        cpu_usage,
-        memory_data,
-        disk_data,
-        network_speed,
-        network_io,
-        connections,
-        processes,
-
-    ) = fetch_all_data()
+    data = fetch_all_data()
+    cpu_usage = data["cpu_usage"]
+    memory_data = data["memory"]
+    disk_data = data["disk"]
 
     end_time = time.perf_counter()  # End the timer
 
@@ -29,3 +22,4 @@ if __name__ == '__main__':
     print(f"cpu: {cpu_usage}")
     print(f"memory: {memory_data}")
     print(f"disk: {disk_data}")
+    print(f"stale: {data['stale']}")
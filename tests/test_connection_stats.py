@@ -0,0 +1,111 @@
+import os
+import sys
+import pytest
+from modules.connection_stats import (
+    ROW_INODE,
+    ROW_LOCAL,
+    ROW_REMOTE,
+    ConnectionListing,
+    SocketOwnerIndex,
+    _read_proc_net,
+)
+
+# Sample tables as written by a little-endian kernel
+TCP = """\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 0100007F:0CEA 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1001 1 0000000000000000 100 0 0 10 0
+   1: 0F02000A:C350 2207C8C0:01BB 01 00000000:00000000 00:00000000 00000000  1000        0 1002 1 0000000000000000 20 4 30 10 -1
+"""
+TCP6 = """\
+  sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000000000000000000001000000:0016 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1003 1 0000000000000000 100 0 0 10 0
+   1: B80D0120000000000000000001000000:1F90 B80D0120000000000000000002000000:D431 06 00000000:00000000 03:00000E5A 00000000     0        0 0 3 0000000000000000
+"""
+UDP = """\
+   sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode ref pointer drops
+  0: 00000000:0044 00000000:0000 07 00000000:00000000 00:00000000 00000000     0        0 1004 2 0000000000000000 0
+  1: 0F02000A:A1B2 08080808:0035 01 00000000:00000000 00:00000000 00000000  1000        0 1005 2 0000000000000000 0
+"""
+
+little_endian = pytest.mark.skipif(
+    sys.byteorder != "little", reason="sample tables are from a little-endian kernel"
+)
+
+
+def _write_tables(path, **tables):
+    net = path / "net"
+    net.mkdir()
+    for name, content in tables.items():
+        (net / name).write_text(content)
+    return str(net)
+
+
+def test_proc_net_rows_keep_connections_only(tmp_path):
+    rows = _read_proc_net(_write_tables(tmp_path, tcp=TCP, tcp6=TCP6, udp=UDP))
+
+    assert [(row[0], row[4], row[ROW_INODE]) for row in rows] == [
+        ("TCP", "LISTEN", "1001"),
+        ("TCP", "ESTABLISHED", "1002"),
+        ("TCP", "LISTEN", "1003"),
+        ("TCP", "TIME_WAIT", "0"),
+        # The unconnected UDP socket in state 07 is left out
+        ("UDP", "ESTABLISHED", "1005"),
+    ]
+
+
+def test_proc_net_is_none_without_any_table(tmp_path):
+    assert _read_proc_net(str(tmp_path)) is None
+
+
+@little_endian
+def test_proc_net_addresses_decode_in_network_order(tmp_path):
+    listing = ConnectionListing(
+        _read_proc_net(_write_tables(tmp_path, tcp=TCP, tcp6=TCP6, udp=UDP)), raw=True
+    )
+    tcp_listen, tcp_established, tcp6_listen, tcp6_time_wait, udp = listing.rows
+
+    assert listing.address(tcp_listen, ROW_LOCAL) == ("127.0.0.1", 3306)
+    assert listing.address(tcp_listen, ROW_REMOTE) is None
+    assert listing.address(tcp_established, ROW_LOCAL) == ("10.0.2.15", 50000)
+    assert listing.address(tcp_established, ROW_REMOTE) == ("192.200.7.34", 443)
+    assert listing.address(tcp6_listen, ROW_LOCAL) == ("::1", 22)
+    assert listing.value(tcp6_time_wait, "local_address") == "[2001:db8::1]:8080"
+    assert listing.value(tcp6_time_wait, "remote_port") == 54321
+    assert listing.value(udp, "remote_address") == "8.8.8.8:53"
+
+
+@little_endian
+def test_summary_counts_raw_rows(tmp_path):
+    listing = ConnectionListing(_read_proc_net(_write_tables(tmp_path, tcp=TCP, udp=UDP)), raw=True)
+
+    summary = listing.summary()
+
+    assert summary["total"] == 3
+    assert summary["by_state"] == {"LISTEN": 1, "ESTABLISHED": 2}
+    assert sorted(summary["remote_hosts"]) == [("192.200.7.34", 1), ("8.8.8.8", 1)]
+    assert sorted(summary["local_ports"]) == [(3306, 1), (41394, 1)]
+
+
+def test_owner_index_maps_socket_inodes_to_processes(tmp_path):
+    fd = tmp_path / "123" / "fd"
+    fd.mkdir(parents=True)
+    (tmp_path / "123" / "comm").write_text("nginx\n")
+    os.symlink("socket:[1002]", fd / "3")
+    os.symlink("/dev/null", fd / "4")
+    owners = SocketOwnerIndex(proc=str(tmp_path))
+
+    owners.refresh(["1002"])
+    assert owners.pid("1002") == 123 and owners.name(123) == "nginx"
+
+    os.unlink(fd / "3")
+    os.symlink("socket:[1006]", fd / "5")
+    owners.refresh(["1006"])
+    assert owners.pid("1002") is None and owners.pid("1006") == 123
+
+    for link in fd.iterdir():
+        link.unlink()
+    fd.rmdir()
+    (tmp_path / "123" / "comm").unlink()
+    (tmp_path / "123").rmdir()
+    owners.refresh()
+    assert owners.pid("1006") is None and owners.name(123) is None
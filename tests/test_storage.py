@@ -0,0 +1,96 @@
+import os
+import numpy as np
+from modules.storage import DiskStore, query_stores
+from modules.timeseries import TimeSeriesStore
+
+
+def test_query_stores_joins_disk_and_memory_after_restart(tmp_path):
+    # Ten minutes on disk from before the restart, the last two minutes in
+    # memory since; the newest samples are not flushed to disk yet
+    now = 1_000_000.0
+    disk = DiskStore(str(tmp_path), flush_interval=10)
+    for t in np.arange(now - 600, now - 120):
+        disk.record(t, {"cpu.percent": 10.0})
+    disk.flush()
+    memory = TimeSeriesStore()
+    for t in np.arange(now - 120, now + 1):
+        memory.record(t, {"cpu.percent": 90.0})
+        disk.record(t, {"cpu.percent": 90.0})
+
+    result = query_stores(memory, disk, "cpu.percent", now - 300, now, max_points=1000)
+
+    assert result["time"][-1] == now
+    assert np.all(np.diff(result["time"]) > 0)
+    before = result["time"] < now - 120
+    assert before.any() and np.all(result["avg"][before] == 10.0)
+    assert np.all(result["avg"][~before] == 90.0)
+    assert len(result["time"]) <= 1000
+
+
+def test_query_stores_keeps_a_range_before_memory_within_its_end(tmp_path):
+    now = 1_000_000.0
+    disk = DiskStore(str(tmp_path))
+    for t in np.arange(now - 600, now - 120):
+        disk.record(t, {"m": 1.0})
+    disk.flush()
+    memory = TimeSeriesStore()
+    for t in np.arange(now - 120, now + 1):
+        memory.record(t, {"m": 2.0})
+
+    result = query_stores(memory, disk, "m", now - 600, now - 500)
+
+    assert result["time"][0] == now - 600 and result["time"][-1] == now - 500
+
+
+def test_query_stores_uses_memory_alone_when_it_covers_the_range(tmp_path):
+    disk = DiskStore(str(tmp_path))
+    memory = TimeSeriesStore()
+    for t in range(100):
+        memory.record(float(t), {"m": float(t)})
+
+    result = query_stores(memory, disk, "m", 50, 99)
+
+    assert result["time"][0] == 50 and result["time"][-1] == 99
+
+
+def test_disk_query_reports_the_resolution_of_compacted_segments(tmp_path):
+    # A short range older than the compaction horizon is only in 1m buckets
+    now = 1_000_000.0
+    disk = DiskStore(str(tmp_path), segment_seconds=600, raw_retention=600)
+    for t in np.arange(now - 3600, now):
+        disk.record(t, {"m": 1.0})
+    disk.flush()
+    disk.compact(now)
+
+    result = disk.query("m", now - 3000, now - 2400)
+
+    assert result["resolution"] == 60
+    assert np.all(np.diff(result["time"]) == 60)
+
+
+def test_compaction_triggered_by_record_runs_in_the_background(tmp_path):
+    now = 1_000_000.0
+    disk = DiskStore(str(tmp_path), segment_seconds=600, raw_retention=600)
+    for t in np.arange(now - 3600, now):
+        disk.record(t, {"m": 1.0})
+    assert disk._compactor is not None
+    disk.close()
+    disk.compact(now)
+
+    # Every sample is read exactly once, from rollups or raw segments
+    result = disk.query("m", now - 3600, now, max_points=10**6)
+    assert result["time"][0] < now - 3000 and result["time"][-1] == now - 1
+    assert np.all(np.diff(result["time"]) > 0)
+    assert not os.listdir(os.path.join(str(tmp_path), "trash"))
+
+
+def test_read_segments_includes_samples_not_flushed_yet(tmp_path):
+    disk = DiskStore(str(tmp_path), flush_interval=10)
+    for t in range(25):
+        disk.record(float(t), {"m": float(t), "other": 0.0})
+
+    parts = list(disk.read_segments(lambda name: name == "m", 5, None))
+
+    times = np.concatenate([times for _, _, times, _ in parts])
+    assert {name for _, name, _, _ in parts} == {"m"}
+    assert np.array_equal(times, np.arange(5, 25))
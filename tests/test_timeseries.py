@@ -0,0 +1,23 @@
+from modules.timeseries import EVICT_INTERVAL, TimeSeriesStore
+
+
+def test_set_retention_keeps_short_history_for_matching_metrics():
+    store = TimeSeriesStore(capacity=1000, tiers=((10, 1000),))
+    store.set_retention("cpu.*.percent", 60, ((10, 6),))
+    for t in range(600):
+        store.record(float(t), {"cpu.0.percent": 1.0, "cpu.percent": 1.0})
+
+    # The per-core series reaches back a minute, so older ranges go to disk
+    assert store.first_time("cpu.0.percent") >= 530
+    assert store.first_time("cpu.percent") == 0
+
+
+def test_record_evicts_metrics_idle_for_longer_than_their_retention():
+    store = TimeSeriesStore(capacity=100, tiers=())
+    store.set_retention("network.*.*", 10, ())
+    store.record(0.0, {"network.veth1.recv_bps": 1.0, "cpu.percent": 1.0})
+    for t in range(1, 2 * EVICT_INTERVAL):
+        store.record(float(t), {"cpu.percent": 1.0})
+
+    assert store.metrics() == ["cpu.percent"]
+    assert store.first_time("network.veth1.recv_bps") is None
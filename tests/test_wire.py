@@ -0,0 +1,87 @@
+import math
+import pytest
+from modules.wire import (
+    FRAME_HEADER,
+    FRAME_NAMES,
+    FRAME_SNAPSHOT,
+    MAGIC,
+    MAX_PAYLOAD,
+    VERSION,
+    SnapshotDecoder,
+    SnapshotEncoder,
+    WireError,
+    _frame,
+)
+
+
+def test_snapshots_survive_a_round_trip():
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    snapshots = [
+        (1000.0, {"bytes": 2 ** 40, "percent": 12.5, "gone": 1.0}),
+        (1001.0, {"bytes": 2 ** 40 - 3, "percent": 12.5, "gone": None}),
+        (1002.5, {"bytes": 2 ** 40 + 5, "percent": math.pi, "new": -7}),
+    ]
+    data = encoder.hello("web-01")
+    for timestamp, metrics in snapshots:
+        data += encoder.encode(timestamp, metrics)
+
+    decoded = decoder.feed(data)
+
+    assert decoded == [
+        ("web-01", 1000.0, {"bytes": 2 ** 40, "percent": 12.5, "gone": 1.0}),
+        ("web-01", 1001.0, {"bytes": 2 ** 40 - 3, "percent": 12.5}),
+        ("web-01", 1002.5, {"bytes": 2 ** 40 + 5, "percent": math.pi, "new": -7}),
+    ]
+
+
+def test_a_frame_split_across_reads_is_decoded_once_complete():
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    data = encoder.hello("web-01") + encoder.encode(1000.0, {"m": 1.5})
+
+    decoded = [decoder.feed(data[i : i + 3]) for i in range(0, len(data), 3)]
+
+    assert sum(decoded, []) == [("web-01", 1000.0, {"m": 1.5})]
+    assert all(not part for part in decoded[:-1])
+
+
+def test_an_oversize_frame_is_rejected_from_its_header():
+    header = FRAME_HEADER.pack(MAGIC, VERSION, FRAME_SNAPSHOT, MAX_PAYLOAD + 1)
+    with pytest.raises(WireError):
+        SnapshotDecoder().feed(header)
+
+
+def test_an_unknown_frame_type_is_rejected():
+    with pytest.raises(WireError):
+        SnapshotDecoder().feed(_frame(99, b""))
+
+
+def test_a_snapshot_before_hello_is_rejected():
+    encoder = SnapshotEncoder()
+    encoder.hello("web-01")
+    with pytest.raises(WireError):
+        SnapshotDecoder().feed(encoder.encode(1000.0, {"m": 1.0}))
+
+
+def test_a_delta_for_a_metric_without_a_value_is_rejected():
+    encoder = SnapshotEncoder()
+    data = encoder.hello("web-01")
+    names = _frame(FRAME_NAMES, b"\x01\x01m")
+    # Time delta 0, one change, metric 0 tagged as an integer delta of +1
+    snapshot = _frame(FRAME_SNAPSHOT, b"\x00\x01\x01\x02")
+    with pytest.raises(WireError):
+        SnapshotDecoder().feed(data + names + snapshot)
+
+
+def test_a_connection_cannot_change_its_host():
+    encoder = SnapshotEncoder()
+    with pytest.raises(WireError):
+        SnapshotDecoder().feed(encoder.hello("web-01") + encoder.hello("web-02"))
+
+
+def test_a_connection_cannot_introduce_too_many_names():
+    encoder = SnapshotEncoder()
+    data = encoder.hello("web-01") + encoder.encode(1000.0, {f"m{i}": 1.0 for i in range(11)})
+    with pytest.raises(WireError):
+        SnapshotDecoder(max_names=10).feed(data)
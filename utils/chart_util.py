@@ -0,0 +1,184 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def create_chart(chart_type, title=None, labels=None, values=None, x=None, y=None):
+    colors = ["#FFA500", "#0d6efd", "#20C997"]
+
+    if chart_type == "pie":
+        return px.pie(
+            names=labels,
+            values=values,
+            title=title,
+            color=labels,
+            color_discrete_map={label: color for label, color in zip(labels, colors)},
+        )
+    elif chart_type == "bar":
+        return px.bar(
+            x=x,
+            y=y,
+            labels=labels,
+            title=title,
+            color=x,
+            color_discrete_map={label: color for label, color in zip(x, colors)},
+        )
+    else:
+        raise ValueError("Unsupported chart type")
+
+
+def _history_traces(data):
+    # Max band edge, min band edge and average line of one series
+    x = data["time"] * 1000  # Plotly takes epoch milliseconds for date axes
+    return x, [data["max"], data["min"], data["avg"]]
+
+
+def create_history_chart(title, series, y_title):
+    """
+    Create a line chart of metric history with a min/max band per line.
+    Every series always gets the same three traces, so later points can be
+    appended with get_history_extension().
+    :param title: Title of the chart.
+    :param series: List of (label, color, query result) tuples, where the
+                   query result comes from TimeSeriesStore.query().
+    :param y_title: Title of the y axis.
+    :return: The plotly figure object.
+    """
+    fig = go.Figure()
+    for label, color, data in series:
+        x, (upper, lower, avg) = _history_traces(data)
+        fig.add_trace(
+            go.Scatter(
+                x=x, y=upper, mode="lines", line=dict(width=0),
+                hoverinfo="skip", showlegend=False,
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=x, y=lower, mode="lines", line=dict(width=0),
+                fill="tonexty", fillcolor=color, opacity=0.3,
+                hoverinfo="skip", showlegend=False,
+            )
+        )
+        fig.add_trace(
+            go.Scatter(x=x, y=avg, mode="lines", name=label, line=dict(color=color))
+        )
+    fig.update_layout(title=title, xaxis_type="date", yaxis_title=y_title)
+    return fig
+
+
+def get_history_extension(series, max_points, after=None):
+    """
+    Build the dcc.Graph extendData value that appends new points to a chart
+    made by create_history_chart().
+    :param series: List of query results, in the order of the chart's series.
+    :param max_points: Number of points each trace keeps once extended.
+    :param after: Timestamp of the newest point the chart already has.
+    :return: The extendData value, or None if there is nothing to append.
+    """
+    xs, ys = [], []
+    for data in series:
+        x, traces = _history_traces(data)
+        new = slice(None) if after is None else data["time"] > after
+        xs.extend([x[new].tolist()] * len(traces))
+        ys.extend(trace[new].tolist() for trace in traces)
+    if not any(xs):
+        return None
+    return [{"x": xs, "y": ys}, list(range(len(xs))), max_points]
+
+
+def create_heatmap_chart(title, times, labels, z, z_title):
+    """
+    Create a heatmap of several metrics over time, one row per metric.
+    :param title: Title of the chart.
+    :param times: Timestamps of the columns, in seconds since the epoch.
+    :param labels: Label of each row.
+    :param z: 2D array of values with one row per label and one column per
+              timestamp; NaN leaves a cell empty.
+    :param z_title: Title of the color scale.
+    :return: The plotly figure object, without traces if there is no data.
+    """
+    if not len(times):
+        return go.Figure(layout=dict(title=title))
+    fig = go.Figure(
+        go.Heatmap(
+            x=times * 1000,  # Plotly takes epoch milliseconds for date axes
+            y=labels,
+            z=z,
+            zmin=0,
+            zmax=100,
+            colorscale="Turbo",
+            colorbar=dict(title=z_title),
+        )
+    )
+    fig.update_layout(title=title, xaxis_type="date")
+    return fig
+
+
+def create_matrix_heatmap(title, columns, labels, z, z_title):
+    """
+    Create a heatmap of several metrics of several hosts, one row per host.
+    :param title: Title of the chart.
+    :param columns: Label of each metric column.
+    :param labels: Label of each row.
+    :param z: 2D array of percentages with one row per label and one column
+              per metric; NaN leaves a cell empty.
+    :param z_title: Title of the color scale.
+    :return: The plotly figure object, without traces if there are no rows.
+    """
+    if not len(labels):
+        return go.Figure(layout=dict(title=title))
+    fig = go.Figure(
+        go.Heatmap(
+            x=columns,
+            y=labels,
+            z=z,
+            zmin=0,
+            zmax=100,
+            colorscale="Turbo",
+            colorbar=dict(title=z_title),
+        )
+    )
+    fig.update_layout(title=title, yaxis_autorange="reversed")
+    return fig
+
+
+# Update graph layout to ensure dark theme even when empty
+def update_dark_theme_graph(fig, showlegend=False):
+    """
+    Update the graph's layout to match the dark theme, including empty state.
+    :param fig: The plotly figure object.
+    :return: The updated figure object with dark theme settings.
+    """
+    fig.update_layout(
+        paper_bgcolor="#303030",  # Dark background for the paper
+        plot_bgcolor="#222222",  # Dark plot background
+        title_font_color="white",  # White title color
+        font=dict(color="white"),  # White font color for labels and text
+        xaxis=dict(
+            title_font=dict(color="white"),  # X-axis title font color
+            tickfont=dict(color="white"),  # X-axis tick color
+        ),
+        yaxis=dict(
+            title_font=dict(color="white"),  # Y-axis title font color
+            tickfont=dict(color="white"),  # Y-axis tick color
+        ),
+        # Handle empty state
+        showlegend=showlegend,  # Optional: hide legend if not needed
+        margin=dict(l=0, r=0, t=30, b=30),  # Tighten margins
+        # In case of empty data, make sure background remains dark
+        annotations=(
+            [
+                {
+                    "text": "No Data Available",
+                    "xref": "paper",
+                    "yref": "paper",
+                    "showarrow": False,
+                    "font": {"size": 20, "color": "white"},
+                    "align": "center",
+                }
+            ]
+            if not fig.data
+            else []
+        ),
+    )
+    return fig
@@ -0,0 +1,127 @@
+from dash import html
+import dash_bootstrap_components as dbc
+from utils.network_util import create_chart_card, create_table_card
+from utils.system_util import create_card
+from utils.table_util import create_data_table
+
+# Fleet-wide cards, in the shape of CARD_DATA
+FLEET_CARD_DATA = [
+    {
+        "title": "HOSTS",
+        "id": "fleet-hosts",
+        "sub_id": "fleet-stale",
+        "icon_name": "bi bi-hdd-network",
+        "sub_label": "Stale",
+    },
+    {
+        "title": "CPU p50",
+        "id": "fleet-cpu",
+        "sub_id": "fleet-cpu-tail",
+        "icon_name": "bi bi-cpu",
+        "sub_label": "p90 / p99",
+    },
+    {
+        "title": "MEMORY p50",
+        "id": "fleet-memory",
+        "sub_id": "fleet-memory-tail",
+        "icon_name": "bi bi-memory",
+        "sub_label": "p90 / p99",
+    },
+    {
+        "title": "DISK p50",
+        "id": "fleet-disk",
+        "sub_id": "fleet-disk-tail",
+        "icon_name": "bi bi-hdd",
+        "sub_label": "p90 / p99",
+    },
+]
+
+FLEET_TABLE_COLUMNS = [
+    ("host", "Host"),
+    ("cpu", "CPU"),
+    ("memory", "Memory"),
+    ("disk", "Disk"),
+    ("upload", "Upload"),
+    ("download", "Download"),
+    ("age", "Last Seen"),
+]
+
+
+def create_fleet_cards():
+    """
+    Create the row of fleet-wide cards.
+    :return: dbc.Row of cards.
+    """
+    return dbc.Row(
+        [create_card(**card) for card in FLEET_CARD_DATA],
+        style={"paddingBottom": "2rem"},
+    )
+
+
+def create_fleet_table(page_size=25):
+    """
+    Create a table for displaying the latest readings of every host.
+    :param page_size: Number of rows per table page.
+    :return: dash_table.DataTable component for hosts.
+    """
+    return create_data_table(
+        "fleet-table",
+        FLEET_TABLE_COLUMNS,
+        page_size,
+        sort_by=[{"column_id": "cpu", "direction": "desc"}],
+    )
+
+
+def create_percentile_table(labels, headers, rows):
+    """
+    Create a table of fleet-wide percentiles.
+    :param labels: Label of each metric.
+    :param headers: Header of each statistic column.
+    :param rows: One list of formatted statistics per metric.
+    :return: dbc.Table component.
+    """
+    return dbc.Table(
+        [
+            html.Thead(html.Tr([html.Th("Metric")] + [html.Th(header) for header in headers])),
+            html.Tbody(
+                [
+                    html.Tr([html.Td(label)] + [html.Td(value) for value in values])
+                    for label, values in zip(labels, rows)
+                ]
+            ),
+        ],
+        bordered=False,
+        hover=True,
+        responsive=True,
+        striped=True,
+        color="dark",
+    )
+
+
+def generate_fleet_section(page_size=25):
+    """
+    Create the fleet overview: fleet-wide cards, the percentiles and the
+    heatmap of every host, and the table of every host.
+    :param page_size: Number of rows per page of the host table.
+    :return: html.Div containing the fleet view.
+    """
+    return html.Div(
+        [
+            create_fleet_cards(),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        create_table_card("Percentiles", html.Div(id="fleet-percentiles")),
+                        width=5,
+                    ),
+                    create_chart_card("fleet-heatmap"),
+                ],
+                className="g-4",
+            ),
+            html.Div(
+                create_table_card("Hosts", create_fleet_table(page_size)),
+                style={"marginTop": "2rem"},
+            ),
+        ],
+        style={"marginTop": "2rem"},
+    )
@@ -1,5 +1,6 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from utils.table_util import create_data_table
 
 CARD_STYLE = {
     "textAlign": "start",
@@ -13,21 +14,25 @@ TABLE_HEADER_STYLE = {
     "color": "#ADD8E6",  # Light blue header text
 }
 
-def create_chart_card(chart_id):
+def create_chart_card(chart_id, figure=None):
     """
     Create a reusable card component for displaying charts.
     :param chart_id: ID for the chart's dcc.Graph component.
-    :param title: Title of the chart.
+    :param figure: Initial figure of the chart, if any.
     :return: dbc.Col containing the chart card.
     """
+    graph = dcc.Graph(
+        id=chart_id,
+        style={"height": "300px"},
+    )
+    if figure is not None:
+        graph.figure = figure
+
     return dbc.Col(
         dbc.Card(
             dbc.CardBody(
                 [
-                    dcc.Graph(
-                        id=chart_id,
-                        style={"height": "300px"},
-                    ),
+                    graph,
                 ]
             ),
             class_name="shadow-lg border-0",
@@ -36,39 +41,204 @@ def create_chart_card(chart_id):
     )
 
 
-def generate_chart_section():
+def generate_chart_section(figures=None):
     """
     Create a row of chart components.
+    :param figures: Dictionary of chart ID to its initial figure.
     :return: dbc.Row containing chart cards.
     """
+    figures = figures or {}
     return dbc.Row(
         [
-            create_chart_card("network-speed"),
-            create_chart_card("network-io"),
-            create_chart_card("memory-pie"),
-            create_chart_card("disk-pie"),
+            create_chart_card(chart_id, figures.get(chart_id))
+            for chart_id in ["network-speed", "network-io", "memory-pie", "disk-pie"]
         ],
     )
 
 
-def create_connection_table():
+# History ranges offered by the range selector, in seconds
+HISTORY_RANGES = [
+    {"label": "5m", "value": 5 * 60},
+    {"label": "1h", "value": 60 * 60},
+    {"label": "24h", "value": 24 * 60 * 60},
+    {"label": "7d", "value": 7 * 24 * 60 * 60},
+]
+
+
+def generate_history_section():
+    """
+    Create rows of history charts with a shared time range selector, and
+    network interface and disk selectors for the per-device charts, followed
+    by the usage of every partition.
+    :return: html.Div containing the selectors, chart cards and partitions.
+    """
+    return html.Div(
+        [
+            # What each history chart already shows, so ticks only send new points
+            dcc.Store(id="history-cursor"),
+            dbc.RadioItems(
+                id="history-range",
+                options=HISTORY_RANGES,
+                value=HISTORY_RANGES[0]["value"],
+                inline=True,
+                style={"color": "#ADD8E6"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("cpu-history"),
+                    create_chart_card("network-history"),
+                ],
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("cpu-breakdown-history"),
+                    create_chart_card("cpu-heatmap"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("memory-breakdown-history"),
+                    create_chart_card("swap-history"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("pressure-history"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            # Interface whose rates the per-interface charts show
+            dcc.Dropdown(
+                id="history-interface",
+                clearable=False,
+                placeholder="Network interface",
+                style={"marginTop": "1rem", "width": "20rem", "color": "#000000"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("interface-history"),
+                    create_chart_card("interface-errors"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            # Disk whose rates the per-disk charts show
+            dcc.Dropdown(
+                id="history-disk",
+                clearable=False,
+                placeholder="Disk",
+                style={"marginTop": "1rem", "width": "20rem", "color": "#000000"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("disk-throughput-history"),
+                    create_chart_card("disk-iops-history"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            dbc.Row(
+                [
+                    create_chart_card("disk-latency-history"),
+                    create_chart_card("disk-busy-history"),
+                ],
+                style={"marginTop": "1rem"},
+            ),
+            html.Div(
+                create_table_card("Partitions", create_partition_table()),
+                style={"marginTop": "1rem"},
+            ),
+        ],
+        style={"marginTop": "2rem"},
+    )
+
+
+# Columns of the process and connection tables as (column ID, header)
+PROCESS_COLUMNS = [
+    ("pid", "PID"),
+    ("name", "Name"),
+    ("username", "User"),
+    ("status", "Status"),
+    ("cpu_percent", "CPU %"),
+    ("memory_percent", "Memory %"),
+    ("cpu_trend", "Trend"),
+]
+CONNECTION_COLUMNS = [
+    ("local_address", "Local Address"),
+    ("remote_address", "Foreign Address"),
+    ("status", "Status"),
+    ("type", "Type"),
+    ("pid", "PID"),
+    ("process", "Process"),
+]
+
+
+def create_connection_table(page_size=15):
     """
     Create a table for displaying network connections.
-    :return: dbc.Table component for connections.
+    :param page_size: Number of connections per page.
+    :return: DataTable component for connections.
+    """
+    return create_data_table("connection-table", CONNECTION_COLUMNS, page_size)
+
+
+def create_connection_summary(summary):
+    """
+    Describe the connection counts by state, remote host, local port and
+    owning process.
+    :param summary: Dictionary returned by ConnectionListing.summary().
+    :return: List of html.Div lines.
+    """
+    states = sorted(summary["by_state"].items(), key=lambda item: -item[1])
+    lines = [
+        ("Total", [f"{summary['total']} sockets"] + [f"{state} {count}" for state, count in states]),
+        ("Remote hosts", [f"{host} ({count})" for host, count in summary["remote_hosts"]]),
+        ("Listening ports", [f"{port} ({count})" for port, count in summary["local_ports"]]),
+        ("Processes", [f"{name}: {count}" for name, count in summary["processes"]]),
+    ]
+    return [
+        html.Div(
+            [html.Span(f"{label}: ", style=TABLE_HEADER_STYLE), " · ".join(values)],
+            style={"fontSize": "0.85rem"},
+        )
+        for label, values in lines
+        if values
+    ]
+
+
+def create_process_table(page_size=15):
+    """
+    Create a table for displaying process details, sorted by CPU usage.
+    :param page_size: Number of processes per page.
+    :return: DataTable component for processes.
+    """
+    return create_data_table(
+        "process-table",
+        PROCESS_COLUMNS,
+        page_size,
+        sort_by=[{"column_id": "cpu_percent", "direction": "desc"}],
+    )
+
+
+def create_partition_table():
+    """
+    Create a table for displaying the usage of every mounted partition.
+    :return: dbc.Table component for partitions.
     """
     return dbc.Table(
         [
             html.Thead(
                 html.Tr(
                     [
-                        html.Th("Local Address"),
-                        html.Th("Foreign Address"),
-                        html.Th("Status"),
+                        html.Th("Mount Point"),
+                        html.Th("Device"),
                         html.Th("Type"),
+                        html.Th("Used"),
+                        html.Th("Usage"),
                     ]
                 )
             ),
-            html.Tbody(id="connection-table"),
+            html.Tbody(id="partition-table"),
         ],
         bordered=True,
         hover=True,
@@ -77,47 +247,119 @@ def create_connection_table():
     )
 
 
-def create_process_table():
+def create_partition_rows(partitions):
     """
-    Create a table for displaying process details.
-    :return: dbc.Table component for processes.
+    Create the rows of the partition table.
+    :param partitions: List of dictionaries from get_partition_usage().
+    :return: List of html.Tr rows.
     """
-    return dbc.Table(
+    gb = 1024 * 1024 * 1024
+    return [
+        html.Tr(
+            [
+                html.Td(partition["mountpoint"]),
+                html.Td(partition["device"]),
+                html.Td(partition["fstype"]),
+                html.Td(f"{partition['used'] / gb:.2f}/{partition['total'] / gb:.2f} GB"),
+                html.Td(
+                    dbc.Progress(
+                        value=partition["percent"],
+                        label=f"{partition['percent']}%",
+                        color="danger" if partition["percent"] >= 90 else "info",
+                    )
+                ),
+            ]
+        )
+        for partition in partitions
+    ]
+
+
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def create_sparkline(values):
+    """
+    Render recent values as a one-line text sparkline.
+    :param values: Sequence of numbers, oldest first.
+    :return: String with one block character per value.
+    """
+    if not values:
+        return ""
+    top = max(max(values), 1e-9)
+    last = len(SPARKLINE_BLOCKS) - 1
+    return "".join(
+        SPARKLINE_BLOCKS[min(int(value / top * last), last)] for value in values
+    )
+
+
+def create_process_modal():
+    """
+    Create the drill-down view shown when a process row is clicked.
+    :return: html.Div containing the selected process store and the modal.
+    """
+    return html.Div(
         [
-            html.Thead(
-                html.Tr(
-                    [
-                        html.Th("PID"),
-                        html.Th("Name"),
-                        html.Th("User"),
-                        html.Th("Status"),
-                        html.Th("CPU %"),
-                        html.Th("Memory %"),
-                    ]
-                )
+            dcc.Store(id="selected-process"),
+            dbc.Modal(
+                [
+                    dbc.ModalHeader(dbc.ModalTitle(id="process-modal-title")),
+                    dbc.ModalBody(
+                        [
+                            dbc.Button(
+                                id="process-pin",
+                                color="secondary",
+                                size="sm",
+                                outline=True,
+                            ),
+                            dbc.Row(
+                                [
+                                    create_chart_card("process-cpu-chart"),
+                                    create_chart_card("process-memory-chart"),
+                                ],
+                                style={"marginTop": "1rem"},
+                            ),
+                            dbc.Row(
+                                [
+                                    create_chart_card("process-io-chart"),
+                                    create_chart_card("process-threads-chart"),
+                                ],
+                                style={"marginTop": "1rem"},
+                            ),
+                        ]
+                    ),
+                ],
+                id="process-modal",
+                size="xl",
+                is_open=False,
             ),
-            html.Tbody(id="process-table"),
-        ],
-        bordered=True,
-        hover=True,
-        striped=True,
-        responsive=True,
+        ]
     )
 
 
-def create_table_card(title, content):
+def create_table_card(title, content, action=None):
     """
     Create a reusable card component for tables.
     :param title: Title of the card.
     :param content: Content to display inside the card.
+    :param action: Optional component shown next to the title.
     :return: dbc.Card containing the table.
     """
     return dbc.Card(
         dbc.CardBody(
             [
-                html.H3(
-                    title,
-                    style=CHART_TITLE_STYLE
+                html.Div(
+                    [
+                        html.H3(
+                            title,
+                            style=CHART_TITLE_STYLE
+                        ),
+                        action,
+                    ],
+                    style={
+                        "display": "flex",
+                        "justifyContent": "space-between",
+                        "alignItems": "center",
+                    },
                 ),
                 html.Div(
                     content,
@@ -134,22 +376,35 @@ def create_table_card(title, content):
     )
 
 
-def generate_table_section():
+def generate_table_section(page_size=15):
     """
     Create a section containing the process and connection tables.
+    :param page_size: Number of rows per table page.
     :return: html.Div containing table cards.
     """
     return html.Div(
         [
             html.Div(
-                create_table_card("Processes", create_process_table()),
+                create_table_card("Processes", create_process_table(page_size)),
                 style={
                     "flex": "1.5",
                     "marginRight": "1rem",
                 },
             ),
             html.Div(
-                create_table_card("Connections", create_connection_table()),
+                create_table_card(
+                    "Connections",
+                    [
+                        html.Div(id="connection-summary", style={"marginBottom": "0.5rem"}),
+                        create_connection_table(page_size),
+                    ],
+                    dbc.Button(
+                        html.I(className="bi bi-arrow-clockwise"),
+                        id="connection-refresh",
+                        color="link",
+                        size="sm",
+                    ),
+                ),
                 style={
                     "flex": "1",
                 },
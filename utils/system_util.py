@@ -29,7 +29,20 @@ CARD_DATA = [
 
 
 # App Bar Component
-def create_app_bar():
+def create_update_mode_toggle(value="poll"):
+    return dbc.RadioItems(
+        id="update-mode",
+        options=[
+            {"label": "Polling", "value": "poll"},
+            {"label": "Streaming", "value": "stream"},
+        ],
+        value=value,
+        inline=True,
+        style={"color": "#969696"},
+    )
+
+
+def create_app_bar(update_mode="poll"):
     return dbc.Row(
         [
             dbc.Col(
@@ -63,6 +76,10 @@ def create_app_bar():
                     },
                 ),
             ),
+            dbc.Col(
+                create_update_mode_toggle(update_mode),
+                width="auto",
+            ),
         ],
         justify="between",
         style={"padding": "1rem 2rem"},
@@ -85,7 +102,7 @@ def create_card_item(id, label):
     )
 
 
-def create_card(title, id, sub_id, icon_name):
+def create_card(title, id, sub_id, icon_name, sub_label="Used"):
     return dbc.Col(
         dbc.Card(
             dbc.CardBody(
@@ -118,7 +135,7 @@ def create_card(title, id, sub_id, icon_name):
                             "fontWeight": "bold",
                         },
                     ),
-                    create_card_item(sub_id, "Used"),
+                    create_card_item(sub_id, sub_label),
                 ]
             ),
             className="border-0 shadow-lg",
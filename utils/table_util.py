@@ -0,0 +1,217 @@
+import heapq
+import math
+import operator
+import re
+import numpy as np
+from dash import dash_table
+
+# One `{column} operator value` term of a DataTable filter query. The
+# operator may carry the table's i (insensitive) or s (sensitive) prefix.
+FILTER_TERM = re.compile(
+    r"\{(?P<column>[^}]+)\}\s+"
+    r"(?P<case>[is]?)(?P<operator>contains|datestartswith|eq|ne|lt|le|gt|ge|!=|<=|>=|=|<|>)\s+"
+    r"(?P<value>.+)"
+)
+OPERATORS = {
+    "eq": "=", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">=",
+}
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+DATA_TABLE_HEADER_STYLE = {
+    "backgroundColor": "#303030",
+    "color": "#ADD8E6",  # Light blue header text
+    "fontWeight": "bold",
+}
+DATA_TABLE_CELL_STYLE = {
+    "backgroundColor": "#222222",
+    "color": "#FFFFFF",
+    "border": "1px solid #444444",
+    "textAlign": "left",
+    "padding": "0.5rem",
+}
+
+
+def create_data_table(table_id, columns, page_size, sort_by=None):
+    """
+    Create a DataTable whose paging, sorting and filtering are done by a
+    server-side callback, so only the visible page is sent to the browser.
+    :param table_id: ID of the DataTable.
+    :param columns: List of (column ID, header) tuples.
+    :param page_size: Number of rows per page.
+    :param sort_by: Initial DataTable sort_by value.
+    :return: dash_table.DataTable component.
+    """
+    return dash_table.DataTable(
+        id=table_id,
+        columns=[{"id": column, "name": name} for column, name in columns],
+        data=[],
+        page_action="custom",
+        page_current=0,
+        page_size=page_size,
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=sort_by or [],
+        filter_action="custom",
+        filter_query="",
+        style_header=DATA_TABLE_HEADER_STYLE,
+        style_cell=DATA_TABLE_CELL_STYLE,
+        style_filter={"backgroundColor": "#303030", "color": "#FFFFFF"},
+        style_table={"overflowX": "auto"},
+    )
+
+
+def _parse_value(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+        return value[1:-1]
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_filter_query(filter_query):
+    """
+    Split a DataTable filter query into its terms.
+    :param filter_query: Query such as '{name} contains py && {cpu} > 5'.
+    :return: List of (column, operator, value, case sensitive) tuples.
+    """
+    terms = []
+    for part in (filter_query or "").split(" && "):
+        match = FILTER_TERM.match(part.strip())
+        if match is None:
+            continue
+        operator = OPERATORS.get(match["operator"], match["operator"])
+        terms.append(
+            (match["column"], operator, _parse_value(match["value"]), match["case"] != "i")
+        )
+    return terms
+
+
+def _matches(actual, operator, expected, case_sensitive):
+    if actual is None:
+        return False
+    if operator in ("contains", "datestartswith"):
+        actual, expected = str(actual), str(expected)
+        if not case_sensitive:
+            actual, expected = actual.lower(), expected.lower()
+        return expected in actual if operator == "contains" else actual.startswith(expected)
+
+    if isinstance(expected, float) and not isinstance(actual, (int, float)):
+        try:
+            actual = float(actual)
+        except (TypeError, ValueError):
+            return False
+    elif not isinstance(expected, float):
+        actual, expected = str(actual), str(expected)
+        if not case_sensitive:
+            actual, expected = actual.lower(), expected.lower()
+    try:
+        return COMPARISONS[operator](actual, expected)
+    except TypeError:
+        return False
+
+
+def build_filter(filter_query, get):
+    """
+    Build a predicate for the rows matching a DataTable filter query.
+    :param filter_query: DataTable filter_query value.
+    :param get: Callable returning the value of a column for a row, as
+                get(row, column).
+    :return: Predicate taking a row, or None if the query has no terms.
+    """
+    terms = parse_filter_query(filter_query)
+    if not terms:
+        return None
+    return lambda row: all(
+        _matches(get(row, column), operator, value, case_sensitive)
+        for column, operator, value, case_sensitive in terms
+    )
+
+
+def _column_mask(values, operator, expected, case_sensitive):
+    if values.dtype.kind in "fiu":
+        if operator in ("contains", "datestartswith") or not isinstance(expected, float):
+            return np.zeros(len(values), dtype=bool)
+        # Missing readings are NaN and never match, like None in _matches()
+        return COMPARISONS[operator](values, expected) & ~np.isnan(values)
+
+    expected = str(expected)
+    if not case_sensitive:
+        values, expected = np.char.lower(values), expected.lower()
+    if operator == "contains":
+        return np.char.find(values, expected) >= 0
+    if operator == "datestartswith":
+        return np.char.startswith(values, expected)
+    return COMPARISONS[operator](values, expected)
+
+
+def build_mask(filter_query, columns):
+    """
+    Match a DataTable filter query against whole columns at once, the
+    vectorized counterpart of build_filter().
+    :param filter_query: DataTable filter_query value.
+    :param columns: Dictionary of column ID to a NumPy array, all of the
+                    same length; numeric columns use NaN for missing values.
+    :return: Boolean array of the matching rows, or None if the query has
+             no terms.
+    """
+    terms = parse_filter_query(filter_query)
+    if not terms:
+        return None
+    size = len(next(iter(columns.values())))
+    mask = np.ones(size, dtype=bool)
+    for column, operator, expected, case_sensitive in terms:
+        values = columns.get(column)
+        if values is None:
+            return np.zeros(size, dtype=bool)
+        mask &= _column_mask(values, operator, expected, case_sensitive)
+    return mask
+
+
+def sort_key(value):
+    """
+    Order values of mixed types: numbers first, then missing values, then
+    everything else as text.
+    """
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    if value is None:
+        return (1, 0, "")
+    return (2, 0, str(value))
+
+
+def get_page_count(total, page_size):
+    """
+    :return: Number of pages needed for `total` rows, at least one.
+    """
+    return max(math.ceil(total / page_size), 1)
+
+
+def select_page(rows, predicate=None, key=None, descending=False, offset=0, limit=15):
+    """
+    Filter, sort and page rows, selecting only as many rows as the page
+    needs with a bounded heap instead of sorting everything.
+    :param rows: Iterable of rows.
+    :param predicate: Optional filter from build_filter().
+    :param key: Optional sort key for a row.
+    :param descending: Sort from highest to lowest.
+    :param offset: Index of the first row of the page.
+    :param limit: Number of rows in the page.
+    :return: Tuple of (rows of the page, total number of matching rows).
+    """
+    if predicate is not None:
+        rows = [row for row in rows if predicate(row)]
+    else:
+        rows = list(rows)
+    if key is None:
+        return rows[offset : offset + limit], len(rows)
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(offset + limit, rows, key=key)[offset:], len(rows)